@@ -1,134 +1,876 @@
 """
-Tento skript slouží ke zpracování XML souborů uložených v zadané složce. Extrahuje informace
-o číslech žádostí, datu podání a klasifikaci IPCR (MPT) a ukládá je do CSV souboru.
+Tento skript slouží ke zpracování XML souborů (ST96) uložených v zadané složce. Extrahuje informace
+o číslech žádostí, datu podání a klasifikaci IPCR (MPT) a ukládá je do CSV souboru. Stejným průchodem
+umí vytvořit i další bibliografické tabulky (údaje o zveřejnění, přihlašovatelé).
 Funkce skriptu krok za krokem:
 
 1. Načtení seznamu platných Application Numbers z Excelového souboru `faktovka.xlsx`.
    - Excel soubor musí obsahovat sloupec `Application_number`.
-   - Používají se pouze ty záznamy z XML, které odpovídají číslům z Excelového souboru.
+   - Používají se pouze ty záznamy z XML, které odpovídají číslům z Excelového souboru
+     (platí pro tabulky s `filtr_seznam`, tj. `mpt`).
 
 2. Zpracování XML souborů:
    - Iteruje přes všechny XML soubory ve složce zadané v `folder_path`.
-   - Z každého souboru extrahuje:
-     - Číslo žádosti (`Application Number`) pomocí namespace `pat` a `com`.
-     - Datum podání (`Filing Date`).
-       - Přeskočí soubory s datem podání <= 2012.
-     - Klasifikaci IPCR (`MPT`).
-       - Zabezpečí, že nedojde k duplikaci IPCR klasifikací.
+   - Co se z dokumentu čte, je popsáno deklarativně:
+     - `POLE_DOKUMENTU`: pole dokumentu a jejich cesty (podmnožina XPath: `.//a/b`, `a//b`),
+       bere se první výskyt, text bez okrajových mezer.
+     - `ZAZNAMY`: opakující se záznamy (IPCR klasifikace, přihlašovatelé), cesta záznamu
+       a jeho pole (první výskyt uvnitř záznamu).
+     - `TABULKY`: výstupní tabulky, jejich hlavička, potřebná pole a záznamy a funkce, která z nich sestaví řádky.
+   - Tabulky (přepínač `--tabulky`, výchozí `mpt`):
+     - `mpt`: číslo žádosti, klasifikace MPT (bez duplicit), datum podání, název souboru,
+     - `patent_data`: údaje o zveřejnění (jako `patent_data_updated2cast.csv`),
+     - `applicants`: přihlašovatelé (jako `APPLICANTBAG.PY`).
+   - Všechny požadované tabulky vzniknou jedním průchodem každého dokumentu. Přidání tabulky
+     znamená jen nový záznam v `TABULKY`, ne další čtení celého korpusu.
+   - Přeskočí soubory s datem podání <= 2012 (pro všechny tabulky).
+   - K dispozici jsou dva způsoby čtení XML (přepínač `--engine`):
+     - `stream` (výchozí): `extrahuj_stream` čte soubor postupně přes `iterparse`, všechny údaje
+       získá jedním průchodem a hotové elementy průběžně maže, takže paměť na soubor zůstává konstantní.
+       Pokud je nainstalováno `lxml`, použije se jeho rychlejší `iterparse`.
+     - `tree`: `extrahuj_strom` načte celý strom přes `ET.parse` a hledá v něm pomocí `find` (původní postup).
+   - Oba způsoby dávají stejný výstup.
+   - Předfiltr: čtení souboru skončí, jakmile je z bloku `ApplicationIdentification` jasné, že dokument
+     neprojde (číslo mimo Excel u všech požadovaných tabulek, datum <= 2012 nebo ve špatném formátu).
+     V režimu `tree` se celý strom načte jen u souborů, které předfiltrem projdou.
+     Na konci se vypíše počet přeskočených souborů podle pravidel.
 
 3. Uložení výsledků do CSV:
-   - Výstupní soubor je uložen na cestě definované `output_csv`.
-   - Každý záznam obsahuje:
+   - Každá tabulka se ukládá do svého souboru podle `vystupy` (tabulka `mpt` do `output_csv`).
+   - Přepínač `--format parquet|arrow` uloží tabulky místo CSV do typovaného sloupcového formátu
+     (modul `zapis_vystupu`, MPT kódy jako kategorie, data jako datumy), přípona se upraví podle formátu.
+   - `--format sqlite` zapíše tabulky do místní databáze `patenty.sqlite` ve složce výstupu (`databaze.py`),
+     tabulka `applicants` do typované tabulky `Applicants` s primárním klíčem.
+   - Tabulka `mpt` obsahuje:
      - Číslo žádosti (`Application Number`),
      - Klasifikaci MPT (`MPT`),
      - Datum podání (`Filing Date`),
      - Název zpracovaného souboru (`File Name`).
 
 4. Ošetření chyb:
-   - Pokud dojde k chybě při zpracování XML souboru nebo jeho částí, zobrazí se odpovídající chybová zpráva.
-   - Pokud datum podání není ve správném formátu, soubor se přeskočí.
+   - Chyby při zpracování XML souborů se nevypisují průběžně, ale sbírají se do seznamu
+     (`File Name`, `Typ`, `Chyba`), který se na konci uloží vedle výstupu jako `<output_csv>_chyby.csv`.
+   - Pokud datum podání není ve správném formátu, soubor se přeskočí a zapíše se do seznamu chyb.
+   - Dokument bez data podání se zapíše s datem podání předchozího dokumentu (v pořadí souborů, jako
+     původní skript). Předchozí datum má každá tabulka vlastní, z dokumentů, které prošly jejím seznamem
+     čísel, takže tabulka vytvořená spolu s dalšími je stejná jako samotná. Tabulka bez předchozího data
+     řádky dokumentu nedostane a dokument se zapíše do seznamu chyb. Přepínač `--preskocit-bez-data`
+     takové dokumenty přeskočí vždy.
+
+   Paralelní zpracování:
+   - S přepínačem `--workers N` se soubory rozdělí mezi N procesů (`ProcessPoolExecutor`).
+   - Procesy vrací jen hotové řádky, do CSV zapisuje jediný hlavní proces ve stejném pořadí
+     jako při zpracování v jednom procesu, takže výstup je shodný.
+
+   Inkrementální zpracování:
+   - S přepínačem `--incremental` se vedle výstupu vede manifest `<output_csv>_manifest.json`
+     se zpracovanými soubory (název, velikost, čas změny, SHA-256 obsahu) a otiskem nastavení
+     (seznam čísel z Excelu a požadované tabulky).
+   - Zpracují se jen nové a změněné soubory. Řádky nových souborů se připíšou na konec výstupů,
+     řádky změněných a odstraněných souborů se nahradí (upsert podle názvu souboru).
+   - Pokud manifest chybí nebo se změnilo nastavení, proběhne plné zpracování a manifest se vytvoří znovu.
+   - Soubory s chybou se do manifestu nezapisují, takže se příště zpracují znovu. Soubory přeskočené
+     pro chybějící nebo špatné datum podání jsou v manifestu označené k opakování (`opakovat`), jejich
+     řádky se při dalším běhu nahradí.
+   - Manifest u každého souboru ukládá i data podání, která si z něj pamatují tabulky (`data`,
+     viz `DatumPodani`). Z nich se v pořadí souborů skládá datum předchozích dokumentů, zpracovaný soubor
+     tak dostane stejné datum jako při plném zpracování. Dokument bez data podání si pamatuje datum,
+     které dostal (`pred`). Když se změní dokument před ním, jeho řádky se nahradí ve druhém průchodu,
+     i když se sám nezměnil.
 
 5. Výstup:
-   - Vytvořený CSV soubor obsahuje všechny zpracované informace a je uložen ve formátu UTF-8 se správnou podporou českých znaků.
-   - Název souboru je definován v `output_csv`.
+   - Vytvořené CSV soubory obsahují všechny zpracované informace a jsou uloženy ve formátu UTF-8 se správnou podporou českých znaků.
+   - Názvy souborů jsou definovány ve `vystupy`.
 
 Poznámky:
 - Namespace `pat` a `com` je předdefinován pro práci se standardní strukturou XML dokumentů.
 - Pokud `Application_number` není nalezen v Excelovém souboru, zpracování se ukončí s chybovou zprávou.
 - Skript zabezpečuje, že nedochází k duplikaci IPCR klasifikací v rámci jednoho záznamu.
+- ST96 dokument má jediný `BibliographicData`, klasifikace se proto hledají pod kterýmkoli z nich.
 """
 
+import argparse
+import contextlib
 import csv
+import hashlib
+import json
 import os
 import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import pandas as pd
 
+from zapis_vystupu import FORMATY, cesta_pro_format, otevri_zapis
+
+# lxml má rychlejší iterparse se stejným rozhraním, pokud není k dispozici, stačí ElementTree
+try:
+    from lxml import etree as stream_etree
+except ImportError:
+    stream_etree = ET
+
 # Cesty k souborům
 folder_path = r'C:\Users\Lenovo\Desktop\PROJEKT DATA PV\XML'
 output_csv = r'C:\Users\Lenovo\Python\PROJEKT\MPTPV.csv'
 excel_file_path = r'C:\Users\Lenovo\Desktop\faktovka.xlsx'
 
-print("work in process")
+# Výstupní soubory jednotlivých tabulek
+vystupy = {
+    'mpt': output_csv,
+    'patent_data': r'C:\Users\Lenovo\Python\PROJEKT\patent_data.csv',
+    'applicants': r'C:\Users\Lenovo\Python\PROJEKT\applicants.csv',
+}
+
+# Namespace dictionary for XML parsing (including 'com' and 'pat' namespaces)
+namespaces = {
+    'pat': 'http://www.wipo.int/standards/XMLSchema/ST96/Patent',
+    'com': 'http://www.wipo.int/standards/XMLSchema/ST96/Common'
+}
+
+# Značka pro dosud nenalezený element (text elementu může být i None)
+NENALEZENO = object()
+
+# Pole dokumentu: název -> cesta od kořene, bere se první výskyt
+POLE_DOKUMENTU = {
+    'application_number': './/pat:ApplicationIdentification/com:ApplicationNumber/com:ApplicationNumberText',
+    'filing_date': './/pat:ApplicationIdentification/pat:FilingDate',
+    # úřad, u kterého byla přihláška podána
+    'application_office_code': './/pat:ApplicationIdentification/com:IPOfficeCode',
+    'publication_office_code': './/pat:PatentPublicationIdentification/com:IPOfficeCode',
+    'publication_number': './/pat:PatentPublicationIdentification/pat:PublicationNumber',
+    'document_kind_code': './/pat:PatentPublicationIdentification/com:PatentDocumentKindCode',
+    'publication_date': './/pat:PatentPublicationIdentification/pat:PublicationDate',
+    'invention_title': './/pat:InventionTitle',
+}
+
+# Opakující se záznamy: cesta záznamu od kořene a jeho pole (cesty relativně k záznamu, surový text)
+ZAZNAMY = {
+    'ipcr': {
+        'cesta': './/pat:BibliographicData//pat:IPCRClassificationBag//pat:IPCRClassification',
+        'pole': {
+            'section': './/pat:Section',
+            'class': './/pat:Class',
+        },
+    },
+    'applicant': {
+        'cesta': './/pat:ApplicantBag/pat:Applicant',
+        'pole': {
+            'organization': './/com:OrganizationStandardName',
+            'person': './/com:PersonFullName',
+            'country_code': './/com:CountryCode',
+        },
+    },
+}
+
+# Pole, podle kterých se filtruje, se čtou vždy
+POLE_FILTRU = ('application_number', 'filing_date')
+
+
+def radky_mpt(pole, zaznamy, file_name):
+    """Řádky tabulky MPT: každá unikátní IPCR klasifikace (Section + Class) na vlastním řádku."""
+    ipcr_classifications = set()  # Use a set to avoid duplicates
+    for ipcr in zaznamy['ipcr']:
+        if ipcr['section'] is not NENALEZENO and ipcr['class'] is not NENALEZENO:
+            ipcr_classifications.add(f"{ipcr['section']}{ipcr['class']}")
+    return [[pole['application_number'], mpt, pole['filing_date'], file_name] for mpt in sorted(ipcr_classifications)]
+
+
+def radky_patent_data(pole, zaznamy, file_name):
+    """Jeden řádek s údaji o zveřejnění dokumentu."""
+    return [[
+        pole['publication_office_code'],
+        pole['application_office_code'],
+        pole['publication_number'],
+        pole['document_kind_code'],
+        pole['publication_date'],
+        pole['application_number'],
+        pole['filing_date'],
+        pole['invention_title'],
+        file_name,
+    ]]
+
+
+def radky_applicants(pole, zaznamy, file_name):
+    """Řádek za každého přihlašovatele, jméno organizace má přednost před jménem osoby."""
+    rows = []
+    for applicant in zaznamy['applicant']:
+        if applicant['organization'] is not NENALEZENO:
+            applicant_name = (applicant['organization'] or '').strip()
+        elif applicant['person'] is not NENALEZENO:
+            applicant_name = (applicant['person'] or '').strip()
+        else:
+            applicant_name = 'N/A'
+        country_code = applicant['country_code']
+        country_code = (country_code or '').strip() if country_code is not NENALEZENO else 'N/A'
+        rows.append([applicant_name, country_code, pole['application_number'], file_name, pole['filing_date']])
+    return rows
+
+
+# Výstupní tabulky: hlavička, sloupec s názvem souboru (pro upsert), sloupec s datem podání, typy sloupců
+# pro sloupcové formáty,
+# potřebná pole a záznamy, sestavení řádků
+TABULKY = {
+    'mpt': {
+        'hlavicka': ['Application Number', 'MPT', 'Filing Date', 'File Name'],
+        'sloupec_souboru': 'File Name',
+        'sloupec_data': 'Filing Date',
+        'typy': {'MPT': 'kategorie', 'Filing Date': 'datum'},
+        'pole': ['application_number', 'filing_date'],
+        'zaznamy': ['ipcr'],
+        'radky': radky_mpt,
+        'filtr_seznam': True,
+    },
+    'patent_data': {
+        'hlavicka': ['Publication_Office_Code', 'Original_Publication_Office_Code', 'Publication_Number',
+                     'Document_Kind_Code', 'Publication_Date', 'Application_Number', 'Filing_Date',
+                     'Invention_Title', 'File_Name'],
+        'sloupec_souboru': 'File_Name',
+        'sloupec_data': 'Filing_Date',
+        'typy': {'Publication_Office_Code': 'kategorie', 'Original_Publication_Office_Code': 'kategorie',
+                 'Document_Kind_Code': 'kategorie', 'Publication_Date': 'datum', 'Filing_Date': 'datum'},
+        'pole': ['publication_office_code', 'application_office_code', 'publication_number', 'document_kind_code',
+                 'publication_date', 'application_number', 'filing_date', 'invention_title'],
+        'zaznamy': [],
+        'radky': radky_patent_data,
+        'filtr_seznam': False,
+    },
+    'applicants': {
+        'hlavicka': ['Applicant Name', 'Country Code', 'Application Number', 'File Name', 'Filing Date'],
+        'sloupec_souboru': 'File Name',
+        'sloupec_data': 'Filing Date',
+        'typy': {'Country Code': 'kategorie', 'Filing Date': 'datum'},
+        'pole': ['application_number', 'filing_date'],
+        'zaznamy': ['applicant'],
+        'radky': radky_applicants,
+        'filtr_seznam': False,
+    },
+}
+
+# Verze formátu manifestu pro inkrementální režim
+MANIFEST_VERZE = 3
+
+# Sloupce CSV se seznamem chyb
+CHYBY_HLAVICKA = ['File Name', 'Typ', 'Chyba']
+
+# Pravidla, podle kterých se soubor přeskočí (klíč -> popis do souhrnu)
+DUVODY_PRESKOCENI = {
+    'mimo_seznam': "číslo přihlášky není v Excel souboru",
+    'chybi_datum': "chybí datum podání",
+    'chybne_datum': "datum podání není ve formátu RRRR-MM-DD",
+    'datum_do_2012': "datum podání <= 2012",
+}
+
 
 # Načtení Excel souboru s Application Numbers
-try:
+def nacti_platna_cisla(excel_file_path):
+    """Vrátí množinu čísel přihlášek ze sloupce `Application_number` (prázdné buňky se vynechají)."""
     excel_data = pd.read_excel(excel_file_path)
     if 'Application_number' not in excel_data.columns:
         raise KeyError("Sloupec 'Application_number' nebyl nalezen v Excel souboru. Zkontrolujte název sloupce.")
-    valid_application_numbers = set(excel_data['Application_number'].astype(str))
-except Exception as e:
-    print(f"Chyba při načítání Excel souboru: {e}")
-    exit()
+    # pandas 3 nechá u `astype(str)` chybějící hodnotu jako NaN (float), ta se nedá řadit s texty
+    return set(excel_data['Application_number'].dropna().astype(str))
 
-# Namespace dictionary for XML parsing (including 'com' and 'pat' namespaces)
-namespaces = {
-    'pat': 'http://www.wipo.int/standards/XMLSchema/ST96/Patent',
-    'com': 'http://www.wipo.int/standards/XMLSchema/ST96/Common'
+
+def zkompiluj_cestu(cesta):
+    """
+    Převede cestu typu './/pat:A/com:B' nebo 'pat:A//pat:B' na seznam kroků (tag, osa).
+    Osa 'child' znamená přímého potomka předchozího kroku, 'desc' libovolného potomka.
+    """
+    kroky = []
+    osa = 'child'
+    for cast in cesta.split('/'):
+        if cast == '.':
+            continue
+        if cast == '':
+            osa = 'desc'
+            continue
+        prefix, nazev = cast.split(':')
+        kroky.append(('{%s}%s' % (namespaces[prefix], nazev), osa))
+        osa = 'child'
+    return kroky
+
+
+def odpovida(kroky, tagy):
+    """
+    Zjistí, zda element na konci `tagy` odpovídá cestě `kroky`.
+    `tagy` jsou tagy od prvního potomka kontextového elementu (kořene nebo záznamu) po aktuální element.
+    """
+    def shoda(k, t):
+        tag, osa = kroky[k]
+        if tagy[t] != tag:
+            return False
+        if k == 0:
+            return osa == 'desc' or t == 0
+        if osa == 'child':
+            return t > 0 and shoda(k - 1, t - 1)
+        return any(shoda(k - 1, u) for u in range(t - 1, -1, -1))
+
+    return bool(tagy) and shoda(len(kroky) - 1, len(tagy) - 1)
+
+
+def priprav_specifikaci(tabulky):
+    """Sestaví, co je pro požadované tabulky potřeba číst: pole dokumentu a záznamy."""
+    pole = set(POLE_FILTRU)
+    zaznamy = set()
+    for tabulka in tabulky:
+        pole.update(TABULKY[tabulka]['pole'])
+        zaznamy.update(TABULKY[tabulka]['zaznamy'])
+    return {
+        'tabulky': list(tabulky),
+        'pole': {nazev: POLE_DOKUMENTU[nazev] for nazev in sorted(pole)},
+        'zaznamy': {nazev: ZAZNAMY[nazev] for nazev in sorted(zaznamy)},
+        'seznam_tabulky': {tabulka for tabulka in tabulky if TABULKY[tabulka]['filtr_seznam']},
+    }
+
+
+def text_pole(text):
+    """Text pole dokumentu bez okrajových mezer (prázdný řetězec pro element bez textu)."""
+    return text.strip() if text is not None else ''
+
+
+def otevri_zdroj(zdroj):
+    """
+    Otevře XML soubor podle cesty. Otevřený souborový objekt (např. člen ZIP archivu ze `zipfile`)
+    se přetočí na začátek a po čtení se nezavírá, aby ho šlo přečíst i podruhé (předfiltr v režimu `tree`).
+    """
+    if hasattr(zdroj, 'read'):
+        zdroj.seek(0)
+        return contextlib.nullcontext(zdroj)
+    return open(zdroj, 'rb')
+
+
+# Původní způsob: celý strom v paměti a hledání přes find/findall
+def extrahuj_strom(file_path, spec):
+    """Vrátí (pole dokumentu, záznamy) podle specifikace pomocí ET.parse."""
+    with otevri_zdroj(file_path) as xml_file:
+        tree = ET.parse(xml_file)
+    root = tree.getroot()
+
+    pole = {}
+    for nazev, cesta in spec['pole'].items():
+        element = root.find(cesta, namespaces)
+        pole[nazev] = text_pole(element.text) if element is not None else None
+
+    zaznamy = {}
+    for nazev, zaznam_spec in spec['zaznamy'].items():
+        zaznamy[nazev] = []
+        for element in root.findall(zaznam_spec['cesta'], namespaces):
+            zaznam = {}
+            for pole_nazev, cesta in zaznam_spec['pole'].items():
+                nalezeny = element.find(cesta, namespaces)
+                zaznam[pole_nazev] = nalezeny.text if nalezeny is not None else NENALEZENO
+            zaznamy[nazev].append(zaznam)
+
+    return pole, zaznamy
+
+
+def posud_datum(filing_date):
+    """Vrátí důvod přeskočení podle data podání, nebo None, pokud datum vyhovuje."""
+    if filing_date is None:
+        return 'chybi_datum'
+    # Convert string to datetime object and check if it is <= 2012
+    try:
+        filing_date_obj = datetime.strptime(filing_date, '%Y-%m-%d')
+    except ValueError:
+        return 'chybne_datum'
+    if filing_date_obj.year <= 2012:
+        return 'datum_do_2012'
+    return None
+
+
+def vyrazene_seznamem(pole, valid_application_numbers, spec):
+    """Tabulky, pro které dokument vyřadí seznam čísel z Excelu (číslo přihlášky v seznamu není)."""
+    if valid_application_numbers is not None and pole['application_number'] not in valid_application_numbers:
+        return spec['seznam_tabulky']
+    return set()
+
+
+def posud_dokument(pole, valid_application_numbers, spec):
+    """
+    Vrátí (důvod přeskočení celého dokumentu, tabulky vyřazené seznamem čísel).
+    Důvod je None, pokud se má dokument zpracovat alespoň pro jednu tabulku.
+    """
+    # Přeskočit zpracování, pokud Application Number není v Excel souboru
+    vyrazene = vyrazene_seznamem(pole, valid_application_numbers, spec)
+    if vyrazene and len(vyrazene) == len(spec['tabulky']):
+        return 'mimo_seznam', vyrazene
+    return posud_datum(pole['filing_date']), vyrazene
+
+
+# Streamovací způsob: jeden průchod souborem, hotové elementy se hned zahazují
+def extrahuj_stream(file_path, spec, valid_application_numbers=None, jen_identifikace=False):
+    """
+    Vrátí (pole dokumentu, záznamy, důvod přeskočení) jedním průchodem přes iterparse.
+
+    Čtení skončí hned, jakmile je jasné, že dokument neprojde filtrem (číslo mimo
+    `valid_application_numbers` u všech tabulek, datum podání <= 2012 nebo ve špatném formátu), a vrátí se důvod.
+    S `jen_identifikace=True` se čte jen po konec prvního bloku ApplicationIdentification
+    (předfiltr pro režim `tree`).
+    """
+    pole = {nazev: None for nazev in spec['pole']}
+    zaznamy = {nazev: [] for nazev in spec['zaznamy']}
+
+    # Cesty indexované podle tagu posledního kroku, aby se u většiny elementů nic nezkoušelo
+    pole_podle_tagu = {}
+    for nazev, cesta in spec['pole'].items():
+        kroky = zkompiluj_cestu(cesta)
+        pole_podle_tagu.setdefault(kroky[-1][0], []).append((nazev, kroky))
+    zaznamy_podle_tagu = {}
+    pole_zaznamu_podle_tagu = {}
+    for nazev, zaznam_spec in spec['zaznamy'].items():
+        kroky = zkompiluj_cestu(zaznam_spec['cesta'])
+        zaznamy_podle_tagu.setdefault(kroky[-1][0], []).append((nazev, kroky))
+        for pole_nazev, cesta in zaznam_spec['pole'].items():
+            pole_kroky = zkompiluj_cestu(cesta)
+            pole_zaznamu_podle_tagu.setdefault(pole_kroky[-1][0], []).append((nazev, pole_nazev, pole_kroky))
+    tag_identifikace = zkompiluj_cestu('pat:ApplicationIdentification')[0][0]
+
+    stack = []  # otevřené elementy od kořene k aktuálnímu
+    tagy = []  # jejich tagy
+    otevrene = []  # rozpracované záznamy: (název, hloubka, {pole: text nebo NENALEZENO})
+
+    def rozhodni():
+        """Důvod předčasného ukončení, pokud už jsou známa pole pro filtr, jinak None."""
+        if pole['application_number'] is None:
+            if valid_application_numbers is None and pole['filing_date'] is not None:
+                return posud_datum(pole['filing_date'])
+            return None
+        if valid_application_numbers is not None and pole['application_number'] not in valid_application_numbers:
+            if len(spec['seznam_tabulky']) == len(spec['tabulky']):
+                return 'mimo_seznam'
+        # Datum se posuzuje až po čísle přihlášky, aby souhrn počítal důvody ve stejném pořadí
+        if pole['filing_date'] is not None:
+            return posud_datum(pole['filing_date'])
+        return None
+
+    with otevri_zdroj(file_path) as xml_file:
+        for event, elem in stream_etree.iterparse(xml_file, events=('start', 'end')):
+            tag = elem.tag
+
+            if event == 'start':
+                stack.append(elem)
+                tagy.append(tag)
+                for nazev, kroky in zaznamy_podle_tagu.get(tag, ()):
+                    if odpovida(kroky, tagy[1:]):
+                        otevrene.append((nazev, len(stack), dict.fromkeys(spec['zaznamy'][nazev]['pole'], NENALEZENO)))
+                continue
+
+            # event == 'end': text elementu je kompletní
+            for nazev, kroky in pole_podle_tagu.get(tag, ()):
+                if pole[nazev] is None and odpovida(kroky, tagy[1:]):
+                    pole[nazev] = text_pole(elem.text)
+                    if nazev in POLE_FILTRU:
+                        duvod = rozhodni()
+                        if duvod:
+                            return pole, zaznamy, duvod
+
+            # První výskyt pole v dokumentovém pořadí pro každý otevřený záznam
+            for nazev, pole_nazev, kroky in pole_zaznamu_podle_tagu.get(tag, ()):
+                for zaznam_nazev, hloubka, hodnoty in otevrene:
+                    if (zaznam_nazev == nazev and hodnoty[pole_nazev] is NENALEZENO
+                            and len(stack) > hloubka and odpovida(kroky, tagy[hloubka:])):
+                        hodnoty[pole_nazev] = elem.text
+
+            if otevrene and otevrene[-1][1] == len(stack):
+                nazev, _, hodnoty = otevrene.pop()
+                zaznamy[nazev].append(hodnoty)
+
+            if jen_identifikace and tag == tag_identifikace:
+                break
+
+            # Uvolnění paměti: element vyčistíme a odpojíme od rodiče
+            stack.pop()
+            tagy.pop()
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+    return pole, zaznamy, None
+
+
+# Původní způsob s předfiltrem: celý strom se načte jen u souborů, které projdou hlavičkou
+def extrahuj_strom_s_predfiltrem(file_path, spec, valid_application_numbers=None):
+    """Vrátí (pole dokumentu, záznamy, důvod přeskočení) pomocí ET.parse."""
+    pole, zaznamy, duvod = extrahuj_stream(file_path, spec, valid_application_numbers, jen_identifikace=True)
+    if duvod:
+        return pole, zaznamy, duvod
+    return extrahuj_strom(file_path, spec) + (None,)
+
+
+EXTRAKTORY = {
+    'stream': extrahuj_stream,
+    'tree': extrahuj_strom_s_predfiltrem,
 }
 
-# Open CSV file for writing with UTF-8 encoding that supports Czech characters
-with open(output_csv, mode='w', newline='', encoding='utf-8-sig') as csv_file:
-    csv_writer = csv.writer(csv_file)
-    
-    # Write header
-    headers = ['Application Number', 'MPT', 'Filing Date', 'File Name']
-    csv_writer.writerow(headers)
-
-    # Loop through all XML files in the folder
-    for file_name in os.listdir(folder_path):
-        if file_name.endswith('.xml'):
-            file_path = os.path.join(folder_path, file_name)
-            
-            # Parse the XML file
-            try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-                
-                # Extract Application Number
-                application_number_element = root.find('.//pat:ApplicationIdentification/com:ApplicationNumber/com:ApplicationNumberText', namespaces)
-                application_number = application_number_element.text.strip() if application_number_element is not None else 'N/A'
-                
-                # Přeskočit zpracování, pokud Application Number není v Excel souboru
-                if application_number not in valid_application_numbers:
+
+def zpracuj_soubor(file_path, file_name, valid_application_numbers, engine='stream', spec=None):
+    """
+    Zpracuje jeden XML soubor a vrátí ({tabulka: řádky}, důvod přeskočení, {tabulka: datum podání}).
+    `file_path` může být i otevřený souborový objekt (člen ZIP archivu), viz `stahovani_dat_web.py`.
+    U přeskočeného souboru jsou všechny seznamy řádků prázdné a důvod je klíč z `DUVODY_PRESKOCENI`.
+    Dokument bez data podání má důvod `chybi_datum` a řádky s prázdným datem, doplní ho `DatumPodani`.
+    Datum podání se vrací pro tabulky, pro které dokument projde seznamem čísel, i když se pro špatný
+    formát nebo datum <= 2012 přeskočí (původní skripty si ho v tu chvíli už zapamatovaly). Prázdný element
+    `FilingDate` datum nemění (původní skripty na něm skončily chybou dřív, než si ho zapamatovaly).
+    """
+    if spec is None:
+        spec = priprav_specifikaci(['mpt'])
+    rows = {tabulka: [] for tabulka in spec['tabulky']}
+
+    pole, zaznamy, duvod = EXTRAKTORY[engine](file_path, spec, valid_application_numbers)
+    vyrazene = vyrazene_seznamem(pole, valid_application_numbers, spec)
+    data_podani = {}
+    if pole['filing_date']:
+        data_podani = {tabulka: pole['filing_date'] for tabulka in spec['tabulky'] if tabulka not in vyrazene}
+    if duvod:
+        return rows, duvod, data_podani
+    if pole['application_number'] is None:
+        pole['application_number'] = 'N/A'
+    duvod, vyrazene = posud_dokument(pole, valid_application_numbers, spec)
+    if duvod not in (None, 'chybi_datum'):
+        return rows, duvod, data_podani
+
+    for tabulka in spec['tabulky']:
+        if tabulka not in vyrazene:
+            rows[tabulka] = TABULKY[tabulka]['radky'](pole, zaznamy, file_name)
+    return rows, duvod, data_podani
+
+
+class DatumPodani:
+    """
+    Datum podání předchozího dokumentu pro dokumenty bez data. Původní skripty měly datum v proměnné
+    z minulého souboru a zapsaly ho i k dokumentu bez `FilingDate` (u prvního takového skončily chybou),
+    výsledky se proto musí procházet v pořadí souborů. Každá tabulka má vlastní datum, které mění jen
+    dokumenty procházející jejím seznamem čísel, jako kdyby tabulku vytvářel samostatný skript.
+    """
+
+    def __init__(self, preskocit=False):
+        self.preskocit = preskocit
+        self.posledni = {}
+
+    def dopln(self, rows, duvod, data_podani):
+        """
+        Vrátí (řádky, důvod) s doplněným datem. Tabulka bez předchozího data řádky dokumentu bez data
+        nedostane a důvod `chybi_datum` zůstane, jinak je důvod None.
+        """
+        self.posledni.update(data_podani)
+        if duvod != 'chybi_datum':
+            return rows, duvod
+        if self.preskocit:
+            return {tabulka: [] for tabulka in rows}, duvod
+        chybi = False
+        for tabulka, tabulka_rows in rows.items():
+            datum = self.posledni.get(tabulka)
+            if datum is None:
+                chybi = chybi or bool(tabulka_rows)
+                rows[tabulka] = []
+                continue
+            index = TABULKY[tabulka]['hlavicka'].index(TABULKY[tabulka]['sloupec_data'])
+            for row in tabulka_rows:
+                row[index] = datum
+        return rows, duvod if chybi else None
+
+
+# Stav pracovního procesu, nastaví ho inicializace poolu (seznam čísel se tak neposílá s každým souborem)
+_prace = {}
+
+
+def inicializuj_praci(folder, valid_application_numbers, engine, tabulky, s_otiskem=False):
+    """Uloží společné parametry zpracování do globálního stavu procesu."""
+    _prace['folder'] = folder
+    _prace['valid'] = valid_application_numbers
+    _prace['engine'] = engine
+    _prace['spec'] = priprav_specifikaci(tabulky)
+    _prace['s_otiskem'] = s_otiskem
+
+
+def otisk_souboru(file_path):
+    """Vrátí otisk souboru pro manifest: velikost, čas změny a SHA-256 obsahu."""
+    stat = os.stat(file_path)
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for blok in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(blok)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256.hexdigest()}
+
+
+def zpracuj_v_procesu(file_name):
+    """
+    Zpracuje soubor v pracovním procesu a vrátí
+    (file_name, {tabulka: řádky}, důvod přeskočení, {tabulka: datum podání}, chyba, otisk).
+    Výjimka se nevypisuje, ale vrací se jako text v položce chyba. Otisk se počítá jen v inkrementálním režimu.
+    """
+    file_path = os.path.join(_prace['folder'], file_name)
+    try:
+        otisk = otisk_souboru(file_path) if _prace['s_otiskem'] else None
+        rows, duvod, data_podani = zpracuj_soubor(file_path, file_name, _prace['valid'], _prace['engine'],
+                                                  _prace['spec'])
+    except Exception as e:
+        return file_name, {}, None, {}, f"{type(e).__name__}: {e}", None
+    return file_name, rows, duvod, data_podani, None, otisk
+
+
+def zpracuj_slozku(folder, file_names, valid_application_numbers, engine='stream', workers=1,
+                   s_otiskem=False, tabulky=('mpt',)):
+    """
+    Zpracuje soubory a postupně vrací výsledky `zpracuj_v_procesu` ve stejném pořadí jako `file_names`.
+    Při `workers > 1` se soubory rozdělí mezi procesy, pořadí výsledků se tím nemění.
+    """
+    if workers <= 1:
+        inicializuj_praci(folder, valid_application_numbers, engine, tabulky, s_otiskem)
+        for file_name in file_names:
+            yield zpracuj_v_procesu(file_name)
+        return
+
+    # Dávky po několika souborech snižují režii předávání mezi procesy
+    chunksize = max(1, min(64, len(file_names) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=inicializuj_praci,
+                             initargs=(folder, valid_application_numbers, engine, tabulky, s_otiskem)) as executor:
+        yield from executor.map(zpracuj_v_procesu, file_names, chunksize=chunksize)
+
+
+def otisk_nastaveni(valid_application_numbers, tabulky):
+    """Otisk seznamu platných čísel a požadovaných tabulek; když se změní, manifest přestane platit."""
+    obsah = '\n'.join(sorted(valid_application_numbers or ())) + '\n#' + ','.join(sorted(tabulky))
+    return hashlib.sha256(obsah.encode('utf-8')).hexdigest()
+
+
+def nacti_manifest(cesta, nastaveni):
+    """Vrátí záznamy manifestu {file_name: otisk}, nebo None, pokud manifest chybí či neplatí."""
+    if not os.path.exists(cesta):
+        return None
+    with open(cesta, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('verze') != MANIFEST_VERZE or manifest.get('nastaveni') != nastaveni:
+        return None
+    return manifest['soubory']
+
+
+def uloz_manifest(cesta, nastaveni, soubory):
+    """Uloží manifest přes dočasný soubor, aby po přerušení nezůstal rozepsaný."""
+    docasny = cesta + '.tmp'
+    with open(docasny, 'w', encoding='utf-8') as f:
+        json.dump({'verze': MANIFEST_VERZE, 'nastaveni': nastaveni, 'soubory': soubory}, f, indent=1)
+    os.replace(docasny, cesta)
+
+
+def rozdel_podle_manifestu(folder, file_names, manifest):
+    """
+    Porovná soubory ve složce s manifestem a vrátí (ke zpracování, odstraněné).
+    Velikost a čas změny se kontrolují nejdřív, hash se počítá jen u souborů, kde se liší.
+    Nezměněným souborům s novým časem se v manifestu rovnou aktualizuje otisk.
+    """
+    ke_zpracovani = []
+    for file_name in file_names:
+        zaznam = manifest.get(file_name)
+        if zaznam is None or zaznam.get('opakovat'):
+            ke_zpracovani.append(file_name)
+            continue
+        stat = os.stat(os.path.join(folder, file_name))
+        if stat.st_size == zaznam['size'] and stat.st_mtime == zaznam['mtime']:
+            continue
+        otisk = otisk_souboru(os.path.join(folder, file_name))
+        if otisk['sha256'] == zaznam['sha256']:
+            manifest[file_name] = otisk
+        else:
+            ke_zpracovani.append(file_name)
+    odstranene = set(manifest) - set(file_names)
+    return ke_zpracovani, odstranene
+
+
+class DatumZManifestu:
+    """
+    Datum podání předchozích dokumentů (`DatumPodani.posledni`) podle manifestu: data podání souborů
+    (`data`) se skládají postupně v pořadí `file_names`, soubory se dotazují ve stejném pořadí.
+    """
+
+    def __init__(self, file_names, manifest):
+        self.file_names = file_names
+        self.manifest = manifest
+        self.index = 0
+        self.datum = {}
+
+    def pred(self, pozice):
+        """Datum před souborem na `pozice` v `file_names` (soubory s chybou v manifestu nejsou)."""
+        while self.index < pozice:
+            zaznam = self.manifest.get(self.file_names[self.index])
+            if zaznam is not None:
+                self.datum.update(zaznam['data'])
+            self.index += 1
+        return dict(self.datum)
+
+
+def zavisle_soubory(file_names, manifest, zpracovane):
+    """
+    Nezpracované soubory bez data podání, jejichž řádky mají datum předchozího dokumentu, které už
+    neplatí (dokument před nimi se změnil, přibyl nebo zmizel).
+    """
+    zavisle = []
+    datum = {}
+    for file_name in file_names:
+        zaznam = manifest.get(file_name)
+        if zaznam is None:
+            continue
+        if 'pred' in zaznam and file_name not in zpracovane and zaznam['pred'] != datum:
+            zavisle.append(file_name)
+        datum.update(zaznam['data'])
+    return zavisle
+
+
+def odstran_radky_souboru(cesta, file_names, sloupec_souboru):
+    """Přepíše CSV bez řádků, jejichž sloupec s názvem souboru je v `file_names` (čte se po řádcích)."""
+    docasny = cesta + '.tmp'
+    with open(cesta, newline='', encoding='utf-8-sig') as vstup, \
+            open(docasny, 'w', newline='', encoding='utf-8-sig') as vystup:
+        reader = csv.reader(vstup)
+        writer = csv.writer(vystup)
+        hlavicka = next(reader)
+        index = hlavicka.index(sloupec_souboru)
+        writer.writerow(hlavicka)
+        writer.writerows(row for row in reader if row[index] not in file_names)
+    os.replace(docasny, cesta)
+
+
+def uloz_chyby(chyby, cesta):
+    """Uloží seznam chyb (slovníky se sloupci `CHYBY_HLAVICKA`) do CSV souboru."""
+    with open(cesta, mode='w', newline='', encoding='utf-8-sig') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CHYBY_HLAVICKA)
+        writer.writeheader()
+        writer.writerows(chyby)
+
+
+def vypis_souhrn_preskoceni(preskoceno):
+    """Vypíše, kolik souborů bylo přeskočeno podle jednotlivých pravidel."""
+    print(f"Přeskočeno souborů celkem: {sum(preskoceno.values())}")
+    for duvod, popis in DUVODY_PRESKOCENI.items():
+        print(f"  - {popis}: {preskoceno[duvod]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrakce MPT klasifikací a dalších tabulek z ST96 XML souborů.")
+    parser.add_argument('--engine', choices=sorted(EXTRAKTORY), default='stream',
+                        help="způsob čtení XML: stream (iterparse, konstantní paměť) nebo tree (ET.parse)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="počet paralelních procesů (výchozí 1 = zpracování v jednom procesu)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="zpracovat jen nové a změněné soubory podle manifestu a doplnit je do existujícího výstupu")
+    parser.add_argument('--tabulky', nargs='+', choices=list(TABULKY), default=['mpt'],
+                        help="tabulky, které se mají vytvořit jedním průchodem (výchozí mpt)")
+    parser.add_argument('--format', choices=FORMATY, default='csv',
+                        help="formát výstupu: csv (výchozí), parquet nebo arrow (typované sloupce, komprese), "
+                             "sqlite (tabulky v místní databázi)")
+    parser.add_argument('--preskocit-bez-data', action='store_true',
+                        help="dokumenty bez data podání přeskočit (výchozí je datum předchozího dokumentu "
+                             "jako v původním skriptu)")
+    args = parser.parse_args()
+    if args.incremental and args.format != 'csv':
+        parser.error("inkrementální režim umí doplňovat jen CSV výstup")
+    tabulky = list(dict.fromkeys(args.tabulky))
+    cesty = {tabulka: cesta_pro_format(vystupy[tabulka], args.format) for tabulka in tabulky}
+
+    print("work in process")
+
+    # Seznam čísel z Excelu je potřeba jen pro tabulky, které se podle něj filtrují
+    valid_application_numbers = None
+    if any(TABULKY[tabulka]['filtr_seznam'] for tabulka in tabulky):
+        try:
+            valid_application_numbers = nacti_platna_cisla(excel_file_path)
+        except Exception as e:
+            print(f"Chyba při načítání Excel souboru: {e}")
+            return
+
+    file_names = [file_name for file_name in os.listdir(folder_path) if file_name.endswith('.xml')]
+    preskoceno = Counter()
+    chyby = []
+
+    hlavni_vystup = cesty[tabulky[0]]
+    manifest_path = os.path.splitext(hlavni_vystup)[0] + '_manifest.json'
+    # Otisk nastavení a manifest jsou potřeba jen v inkrementálním režimu
+    nastaveni = otisk_nastaveni(valid_application_numbers, tabulky) if args.incremental else None
+    manifest = None
+    if args.incremental and all(os.path.exists(cesty[tabulka]) for tabulka in tabulky):
+        manifest = nacti_manifest(manifest_path, nastaveni)
+        if manifest is None:
+            print("Manifest chybí nebo neodpovídá nastavení, zpracují se všechny soubory.")
+
+    if manifest is None:
+        # Plné zpracování: výstupy se přepíšou
+        ke_zpracovani = file_names
+        manifest = {}
+        mode = 'w'
+    else:
+        ke_zpracovani, odstranene = rozdel_podle_manifestu(folder_path, file_names, manifest)
+        zmenene = {file_name for file_name in ke_zpracovani if file_name in manifest} | odstranene
+        print(f"Nových nebo změněných souborů: {len(ke_zpracovani)}, odstraněných: {len(odstranene)}")
+        if zmenene:
+            # Staré řádky změněných a odstraněných souborů se nahradí (upsert podle názvu souboru)
+            for tabulka in tabulky:
+                odstran_radky_souboru(cesty[tabulka], zmenene, TABULKY[tabulka]['sloupec_souboru'])
+        for file_name in odstranene:
+            del manifest[file_name]
+        mode = 'a'
+
+    datum_podani = DatumPodani(args.preskocit_bez_data)
+    pozice = {file_name: index for index, file_name in enumerate(file_names)}
+
+    def zpracuj(soubory, mode):
+        predchozi = DatumZManifestu(file_names, manifest)
+        # Open output files (CSV with UTF-8 encoding that supports Czech characters), header is written for new files
+        zapisy = {tabulka: otevri_zapis(cesty[tabulka], TABULKY[tabulka]['hlavicka'], args.format,
+                                        TABULKY[tabulka]['typy'], mode) for tabulka in tabulky}
+        try:
+            # Výsledky chodí ve stejném pořadí jako soubory, zapisuje jen tento proces
+            for file_name, rows, duvod, data_podani, chyba, otisk in zpracuj_slozku(
+                    folder_path, soubory, valid_application_numbers, args.engine, args.workers, args.incremental,
+                    tabulky):
+                if args.incremental:
+                    # Předchozí dokumenty se v inkrementálním běhu nečtou, jejich datum je v manifestu
+                    datum_podani.posledni = predchozi.pred(pozice[file_name])
+                if chyba:
+                    # Soubor s chybou se do manifestu nezapíše, příště se zkusí znovu
+                    chyby.append({'File Name': file_name, 'Typ': 'zpracovani', 'Chyba': chyba})
+                    manifest.pop(file_name, None)
                     continue
+                pred = dict(datum_podani.posledni)
+                bez_data = duvod == 'chybi_datum'
+                rows, duvod = datum_podani.dopln(rows, duvod, data_podani)
+                if otisk:
+                    zaznam = dict(otisk, data=data_podani)
+                    if bez_data:
+                        zaznam['pred'] = pred
+                    if duvod in ('chybne_datum', 'chybi_datum'):
+                        zaznam['opakovat'] = True
+                    manifest[file_name] = zaznam
+                if duvod:
+                    preskoceno[duvod] += 1
+                    if duvod in ('chybne_datum', 'chybi_datum'):
+                        chyby.append({'File Name': file_name, 'Typ': duvod, 'Chyba': DUVODY_PRESKOCENI[duvod]})
+                for tabulka, tabulka_rows in rows.items():
+                    zapisy[tabulka].writerows(tabulka_rows)
+        finally:
+            for zapis in zapisy.values():
+                zapis.close()
+
+    zpracuj(ke_zpracovani, mode)
+
+    if args.incremental:
+        # Dokumenty bez data podání, kterým se změnilo datum předchozího dokumentu, se zpracují znovu
+        zavisle = zavisle_soubory(file_names, manifest, set(ke_zpracovani))
+        if zavisle:
+            print(f"Souborů bez data podání se změněným předchozím datem: {len(zavisle)}")
+            for tabulka in tabulky:
+                odstran_radky_souboru(cesty[tabulka], set(zavisle), TABULKY[tabulka]['sloupec_souboru'])
+            zpracuj(zavisle, 'a')
+        uloz_manifest(manifest_path, nastaveni, manifest)
+
+    vypis_souhrn_preskoceni(preskoceno)
+    if chyby:
+        chyby_csv = os.path.splitext(hlavni_vystup)[0] + '_chyby.csv'
+        uloz_chyby(chyby, chyby_csv)
+        print(f"Souborů s chybou: {len(chyby)}, seznam je uložen v {chyby_csv}")
+    for tabulka in tabulky:
+        print(f"File created: {cesty[tabulka]}")
+
 
-                # Extract Filing Date and check if it is <= 2012
-                filing_date_element = root.find('.//pat:ApplicationIdentification/pat:FilingDate', namespaces)
-                if filing_date_element is not None:
-                    filing_date = filing_date_element.text.strip()
-                    # Convert string to datetime object
-                    try:
-                        filing_date_obj = datetime.strptime(filing_date, '%Y-%m-%d')
-                    except ValueError:
-                        print(f"Error parsing filing date {filing_date} in file {file_name}")
-                        continue
-                    
-                    # Skip if filing date is <= 2012
-                    if filing_date_obj.year <= 2012:
-                        continue  # Skip this file and move to the next one
-                
-                # Extract IPCRClassification (MPT) and avoid duplicates
-                ipcr_classifications = set()  # Use a set to avoid duplicates
-                bibliographic_data = root.find('.//pat:BibliographicData', namespaces)
-                if bibliographic_data is not None:
-                    for ipcr_bag in bibliographic_data.findall('.//pat:IPCRClassificationBag', namespaces):
-                        for ipcr_classification in ipcr_bag.findall('.//pat:IPCRClassification', namespaces):
-                            section = ipcr_classification.find('.//pat:Section', namespaces)
-                            cls = ipcr_classification.find('.//pat:Class', namespaces)
-                            if section is not None and cls is not None:
-                                ipcr_classifications.add(f"{section.text}{cls.text}")
-
-                # Write each unique IPCR classification in a new row
-                for mpt in sorted(ipcr_classifications):
-                    csv_writer.writerow([
-                        application_number,
-                        mpt,
-                        filing_date,
-                        file_name
-                    ])
-                    
-            except Exception as e:
-                print(f"Error processing file {file_name}: {e}")
-
-print(f"CSV file created: {output_csv}")
+if __name__ == "__main__":
+    main()
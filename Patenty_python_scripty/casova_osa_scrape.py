@@ -12,9 +12,13 @@ id dotaz, ale nefungovalo to.
    - Skript načítá Excel soubor `results.xlsx` obsahující sloupce `Application_Number` (čísla přihlášek)
      a `TYP_CISLO` (typy patentů).
    - Pracuje s prvním listem `skoly data`. 
+   - Excel se čte přes `nacitani_dat.nacti` (typy sloupců, po prvním načtení z Parquet cache).
 
 2. **Iterace přes přihlášky a typy patentů:**
-   - Zpracovává prvních několik přihlášek pro ukázkové použití.
+   - Zpracovává všechny přihlášky z Excelu (`--limit N` omezí počet, např. pro ukázku).
+   - Přihlášky běží souběžně v `--workers` vláknech (výchozí 8) nad jedinou `requests.Session`
+     s poolem stálých spojení, bez nového TCP/TLS spojení pro každý dotaz. `--interval` je nejkratší
+     odstup mezi dotazy na server napříč vlákny. Výsledky se zapisují ve stejném pořadí jako v Excelu.
    - Pro každou přihlášku provádí následující kroky:
 
    **Krok 1: Získání iddotaz**
@@ -26,6 +30,8 @@ id dotaz, ale nefungovalo to.
 
    **Krok 2.5: Validace hitlistu**
    - Ověřuje, zda je dotaz správně připravený a výsledky jsou dostupné.
+   - Provádí se jen s přepínačem `--validovat`. Dotaz nezávisí na `iddotaz` a úspěch dotazu
+     ověřuje už krok 3, takže jde o jeden dotaz na přihlášku navíc.
 
    **Krok 3: Provedení dotazu**
    - Spouští dotaz a ověřuje jeho úspěšnost.
@@ -46,12 +52,33 @@ id dotaz, ale nefungovalo to.
      - Datum (`Datum`),
      - Popis události (`Popis`).
 
+### Dávkový režim (`--davky`):
+- Místo dotazu na každou přihlášku (`CIPV`) se pošle jeden dotaz pro každý typ patentu (`SKUP`).
+- Hitlist se projde po stránkách (`pRadStart`) a posbírají se `pIdSpis` (`data-id`) všech přihlášek,
+  pak se souběžně stahují jen detaily požadovaných přihlášek.
+- Místo pěti dotazů na přihlášku tak zbývá jeden dotaz na detail a několik dotazů na celou dávku.
+  Přihlášky, které dávka nenašla, se zpracují po jedné.
+
 ### Funkce:
 - `get_dotaz_id()`: Získá jedinečný `iddotaz` z API.
 - `validate_hitlist()`: Ověří dostupnost výsledků dotazu.
 - `execute_dotaz(iddotaz)`: Spustí dotaz a ověří jeho úspěšnost.
 - `get_pIdSpis(iddotaz)`: Načte `pIdSpis` z výsledků dotazu.
+- `parse_casova_osa(html)`: Vrátí dvojice (datum, popis) ze stránky detailu.
+- HTML se parsuje modulem `html_parsovani` (selectolax nebo lxml, pokud jsou nainstalované, jinak BeautifulSoup).
+- `stahni_casovou_osu(session, application_number, patent_type)`: Kroky 1 až 5 pro jednu přihlášku.
+- `zpracuj_prihlasku(session, application_number, patent_type)`: Časová osa z cache, nebo ze serveru.
+- `nacti_hitlist(iddotaz)`: Všechny řádky hitlistu jako dvojice (texty buněk, pIdSpis).
+- `stahni_davku(session, patent_type)`: Dávkový dotaz pro jeden typ patentu.
+- `stahni_davkove(session, executor, prihlasky)`: Dávkový režim pro celý seznam přihlášek.
 - `main()`: Hlavní funkce, která iteruje přes přihlášky a řídí celý proces stahování.
+- Všechny funkce s dotazy přijímají `session` (výchozí modul `requests`).
+
+### Cache:
+- Dotazy jdou přes společnou cache (`http_cache.py`). Kroky 1 až 4 mění stav dotazu na serveru a necachují se,
+  proto se stránka detailu ukládá navíc pod klíčem `casova_osa:<číslo přihlášky>:<typ>` (platnost `TTL_CASOVA_OSA`).
+  Opakovaný běh nebo změna parseru tak celý řetězec dotazů přeskočí.
+- Přepínače `--bez-cache`, `--offline` (jen data z cache) a `--cache <soubor>`.
 
 ### Ošetření chyb:
 - Skript kontroluje stavové kódy HTTP požadavků a zpracovává chyby jako:
@@ -61,34 +88,50 @@ id dotaz, ale nefungovalo to.
 
 ### Výstup:
 - CSV soubor `casova_osa.csv` obsahuje časové osy pro jednotlivé přihlášky.
+- Nastavením `output_format` na `parquet` nebo `arrow` se časová osa uloží do typovaného sloupcového
+  souboru (modul `zapis_vystupu`, `Datum` jako datum, `Popis` jako kategorie).
 
 ### Poznámky:
-- Skript zahrnuje pauzy (`time.sleep`) mezi požadavky, aby se server nepřetěžoval.
+- Odstup mezi dotazy na server (`--interval`) a omezený počet vláken chrání server před přetížením.
 - Předpokládá specifickou strukturu odpovědí serveru, která musí být konzistentní.
 - 
 """
 
 
 
+import argparse
 import requests
-import pandas as pd
-import csv
 import time
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+
+import html_parsovani
+from http_cache import DEN, pridej_prepinace, vytvor_session
+from nacitani_dat import nacti
+from zapis_vystupu import cesta_pro_format, otevri_zapis
+
+# Výstupní soubor a jeho formát (csv, parquet, arrow nebo sqlite = tabulka v `patenty.sqlite`)
+output_file = 'casova_osa.csv'
+output_format = 'csv'
+
+# Platnost uložené časové osy v cache (sekundy)
+TTL_CASOVA_OSA = 30 * DEN
+
+# Časový limit spojení a odpovědi (sekundy)
+TIMEOUT = (10, 60)
 
 
 # Funkce pro získání iddotaz
-def get_dotaz_id():
+def get_dotaz_id(session=requests):
     """Získá nový iddotaz ze serveru."""
     url = "https://isdv.upv.gov.cz/webapp/resdb.dotaz.getDotazID"
-    response = requests.get(url)
+    response = session.get(url, timeout=TIMEOUT)
     if response.status_code != 200:
         print(f"Chyba při získávání iddotaz, status code: {response.status_code}")
         return None
     return response.text.strip()
 
 # Funkce pro validaci hitlistu
-def validate_hitlist():
+def validate_hitlist(session=requests):
     """Validuje seznam výsledků před provedením dotazu."""
     url = "https://isdv.upv.gov.cz/webapp/resdb.hitlist.isEmpty"
     params = {
@@ -98,7 +141,7 @@ def validate_hitlist():
     headers = {
         "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Mobile Safari/537.36"
     }
-    response = requests.post(url, params=params, headers=headers)
+    response = session.post(url, params=params, headers=headers, timeout=TIMEOUT)
     if response.status_code == 200:
         print("Odpověď serveru (validate_hitlist):")
         print(response.text.strip())
@@ -114,7 +157,7 @@ def validate_hitlist():
         return False
 
 # Funkce pro spuštění dotazu
-def execute_dotaz(iddotaz):
+def execute_dotaz(iddotaz, session=requests):
     """Spustí dotaz a vrátí potvrzení."""
     url = f"https://isdv.upv.gov.cz/webapp/resdb.dotaz.proveddotazsql"
     params = {
@@ -125,7 +168,7 @@ def execute_dotaz(iddotaz):
         "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Mobile Safari/537.36"
     }
     print(f"Volám execute_dotaz s params: {params}")
-    response = requests.get(url, params=params, headers=headers)
+    response = session.get(url, params=params, headers=headers, timeout=TIMEOUT)
     if response.status_code == 200:
         print("Odpověď serveru (execute_dotaz):")
         print(response.text.strip())
@@ -141,7 +184,7 @@ def execute_dotaz(iddotaz):
         return False
 
 # Funkce pro získání pIdSpis
-def get_pIdSpis(iddotaz):
+def get_pIdSpis(iddotaz, session=requests):
     """Načte pIdSpis z výsledků dotazu."""
     url = f"https://isdv.upv.gov.cz/webapp/resdb.print_vysledek.Vysledek"
     params = {
@@ -152,111 +195,286 @@ def get_pIdSpis(iddotaz):
     headers = {
         "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Mobile Safari/537.36"
     }
-    response = requests.get(url, params=params, headers=headers)
+    response = session.get(url, params=params, headers=headers, timeout=TIMEOUT)
     if response.status_code != 200:
         print(f"Chyba při získávání pIdSpis pro iddotaz {iddotaz}, status code: {response.status_code}")
         return None
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    spis_element = soup.find('input', {'class': 'hitlist', 'data-id': True})
-    if spis_element:
-        return spis_element['data-id']
+    pIdSpis = html_parsovani.prvni_data_id(response.text)
+    if pIdSpis:
+        return pIdSpis
 
     print(f"pIdSpis nebyl nalezen pro iddotaz {iddotaz}.")
     return None
 
+# Funkce pro načtení všech řádků hitlistu (dávkový režim)
+def nacti_hitlist(iddotaz, session=requests):
+    """
+    Projde stránky výsledků dotazu (`pRadStart`) a vrátí seznam dvojic (texty buněk řádku, pIdSpis).
+    Číslo přihlášky se v řádku hledá podle hodnoty, pořadí sloupců hitlistu se tak nemusí předpokládat.
+    """
+    url = "https://isdv.upv.gov.cz/webapp/resdb.print_vysledek.Vysledek"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Mobile Safari/537.36"
+    }
+    radky = []
+    predchozi = None
+    start = 0
+    while True:
+        params = {"pIdDotaz": iddotaz, "pLang": "CS", "pRadStart": str(start)}
+        response = session.get(url, params=params, headers=headers, timeout=TIMEOUT)
+        if response.status_code != 200:
+            print(f"Chyba při načítání hitlistu od řádku {start}, status code: {response.status_code}")
+            break
+        radky_stranky = html_parsovani.radky_trdata(response.text)
+        stranka = [(bunky, pIdSpis) for bunky, pIdSpis in radky_stranky if pIdSpis is not None]
+        # Konec výsledků, nebo server stránkování ignoruje a vrací stále stejnou stránku
+        if not stranka or stranka == predchozi:
+            break
+        radky.extend(stranka)
+        predchozi = stranka
+        # Posun o všechny řádky stránky, i ty bez pIdSpis, jinak by se stránky překrývaly
+        start += len(radky_stranky)
+    return radky
+
+# Funkce pro zpracování stránky detailu s časovou osou
+def parse_casova_osa(html):
+    """Vrátí seznam dvojic (datum, popis) z bloku `casosaobal`, nebo None, pokud blok chybí."""
+    return html_parsovani.casova_osa(html)
+
+# Krok 2: Inicializace dotazu (jedna přihláška, nebo dávka podle typu)
+def inicializuj_dotaz(session, iddotaz, patent_type, application_number=None):
+    url1 = "https://isdv.upv.gov.cz/webapp/!resdb.formxml.make"
+    data1 = {
+        "idform": "PT",
+        "formtyp": "A",
+        "iddotaz": iddotaz,
+        "iduser": "-1",
+        "lan": "CS",
+    }
+    if application_number is not None:
+        data1.update({
+            "dotaz/polozka[2]/@co": "CIPV",
+            "dotaz/polozka[2]/@jak": "=",
+            "dotaz/polozka[2]/hodnota": application_number,
+        })
+    data1.update({
+        "dotaz/polozka[9]/@co": "SKUP",
+        "dotaz/polozka[9]/hodnota": patent_type,
+    })
+
+    response1 = session.post(url1, data=data1, timeout=TIMEOUT)
+    if response1.status_code != 200:
+        popis = application_number if application_number is not None else f"typ {patent_type}"
+        print(f"Chyba při inicializaci dotazu pro {popis}, status code: {response1.status_code}")
+        return False
+
+    print("Dotaz úspěšně inicializován.")
+    return True
+
+# Řetězec dotazů pro jednu přihlášku, vrací HTML stránky detailu s časovou osou
+def stahni_casovou_osu(session, application_number, patent_type, validovat=False):
+    """
+    Provede kroky 1 až 5 pro jednu přihlášku a vrátí HTML detailu, nebo None při chybě.
+    Validace hitlistu (krok 2.5) se provádí jen s `validovat=True`, úspěch dotazu ověřuje už krok 3.
+    """
+    # Krok 1: Získání iddotaz
+    iddotaz = get_dotaz_id(session)
+    if not iddotaz:
+        print(f"Chyba při získávání iddotaz pro {application_number}")
+        return None
+
+    # Krok 2: Inicializace dotazu pomocí POST požadavku
+    if not inicializuj_dotaz(session, iddotaz, patent_type, application_number):
+        return None
+
+    # Krok 2.5: Validace hitlistu
+    if validovat and not validate_hitlist(session):
+        print("Validace hitlistu selhala, přerušení procesu.")
+        return None
+
+    # Krok 3: Provedení dotazu
+    if not execute_dotaz(iddotaz, session):
+        print("Dotaz nebyl úspěšně proveden, přerušení procesu.")
+        return None
+
+    # Krok 4: Získání pIdSpis z výsledků dotazu
+    pIdSpis = get_pIdSpis(iddotaz, session)
+    if not pIdSpis:
+        print(f"Chyba: Nepodařilo se získat pIdSpis pro {application_number}")
+        return None
+
+    print(f"Získaný pIdSpis: {pIdSpis}")
+    return stahni_detail(session, pIdSpis, iddotaz, application_number)
+
+# Krok 5: Získání časové osy (POST)
+def stahni_detail(session, pIdSpis, iddotaz, application_number):
+    url3 = "https://isdv.upv.gov.cz/webapp/resdb.print_detail.Detail"
+    data3 = {
+        "pIdSpis": pIdSpis,
+        "pLang": "CS",
+        "pIdDotaz": iddotaz,
+        "pD": int(time.time() * 1000)
+    }
+
+    response3 = session.post(url3, data=data3, timeout=TIMEOUT)
+    if response3.status_code != 200:
+        print(f"Chyba při získávání časové osy pro {application_number}, status code: {response3.status_code}")
+        return None
+    return response3.text
+
+# Dávkový dotaz: všechny přihlášky daného typu jedním dotazem
+def stahni_davku(session, patent_type, validovat=False):
+    """Vrátí (iddotaz, {text buňky: pIdSpis}) pro všechny výsledky dávkového dotazu, vyhledává se číslem přihlášky."""
+    iddotaz = get_dotaz_id(session)
+    if not iddotaz:
+        print(f"Chyba při získávání iddotaz pro typ {patent_type}")
+        return None, {}
+    if not inicializuj_dotaz(session, iddotaz, patent_type):
+        return None, {}
+    if validovat and not validate_hitlist(session):
+        print("Validace hitlistu selhala, přerušení procesu.")
+        return None, {}
+    if not execute_dotaz(iddotaz, session):
+        print("Dotaz nebyl úspěšně proveden, přerušení procesu.")
+        return None, {}
+    spisy = {}
+    for bunky, pIdSpis in nacti_hitlist(iddotaz, session):
+        for bunka in bunky:
+            if bunka:
+                spisy.setdefault(bunka, pIdSpis)
+    print(f"Dávka typu {patent_type}: načteno řádků hitlistu {len(set(spisy.values()))}")
+    return iddotaz, spisy
+
+# Časová osa jedné přihlášky z cache, nebo ze serveru (běží ve vláknech)
+def zpracuj_prihlasku(session, application_number, patent_type, validovat=False):
+    """Vrátí HTML detailu pro přihlášku, nebo None. Stažená časová osa se uloží do cache."""
+    cache = session.cache
+    klic_cache = f"casova_osa:{application_number}:{patent_type}"
+    html = cache.nacti(klic_cache) if cache else None
+    if html is not None:
+        return html
+    if cache and cache.offline:
+        print(f"Časová osa pro {application_number} není v cache (offline režim).")
+        return None
+
+    print(f"Zpracovávám přihlášku: {application_number} s typem patentu: {patent_type}")
+    try:
+        html = stahni_casovou_osu(session, application_number, patent_type, validovat)
+    except requests.RequestException as e:
+        print(f"Chyba spojení u přihlášky {application_number}: {e}")
+        return None
+    if html is not None and cache and parse_casova_osa(html) is not None:
+        cache.uloz(klic_cache, html, TTL_CASOVA_OSA)
+    return html
+
 # Hlavní logika pro čtení dat a generování časové osy
 def main():
+    parser = argparse.ArgumentParser(description="Stažení časových os přihlášek z ISDV.")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="počet přihlášek zpracovávaných souběžně (výchozí 8)")
+    parser.add_argument('--interval', type=float, default=0.1,
+                        help="nejkratší odstup mezi dotazy na server v sekundách (výchozí 0.1)")
+    parser.add_argument('--limit', type=int, default=None,
+                        help="zpracovat jen prvních N přihlášek (výchozí všechny)")
+    parser.add_argument('--validovat', action='store_true',
+                        help="před provedením dotazu ověřit hitlist (krok 2.5, jeden dotaz navíc)")
+    parser.add_argument('--davky', action='store_true',
+                        help="dávkový režim: jeden dotaz na typ patentu, pIdSpis všech přihlášek z hitlistu")
+    pridej_prepinace(parser)
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    session = vytvor_session(args, args.interval, pool=workers)
+
     # Načtení seznamu přihlášek a typů patentu ze souboru results.xlsx
-    excel_data = pd.read_excel('results.xlsx', sheet_name="skoly data")
+    excel_data = nacti('results.xlsx', list="skoly data")
     application_numbers = excel_data['Application_Number'].tolist()
     patent_types = excel_data['TYP_CISLO'].tolist()  # Dynamické načtení typu patentu
+    prihlasky = list(zip(application_numbers, patent_types))[:args.limit]
 
-    # Otevřeme soubor CSV pro zápis všech dat
-    with open('casova_osa.csv', mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        # Zapisujeme hlavičku CSV souboru
-        writer.writerow(["Nazev prihlasky", "Datum", "Popis"])
-
-        # Iterace přes první tři přihlášky a typy patentu
-        for application_number, patent_type in zip(application_numbers[:3], patent_types[:3]):
-            print(f"Zpracovávám přihlášku: {application_number} s typem patentu: {patent_type}")
-
-            # Krok 1: Získání iddotaz
-            iddotaz = get_dotaz_id()
-            if not iddotaz:
-                print(f"Chyba při získávání iddotaz pro {application_number}")
-                continue
-
-            # Krok 2: Inicializace dotazu pomocí POST požadavku
-            url1 = "https://isdv.upv.gov.cz/webapp/!resdb.formxml.make"
-            data1 = {
-                "idform": "PT",
-                "formtyp": "A",
-                "iddotaz": iddotaz,
-                "iduser": "-1",
-                "lan": "CS",
-                "dotaz/polozka[2]/@co": "CIPV",
-                "dotaz/polozka[2]/@jak": "=",
-                "dotaz/polozka[2]/hodnota": application_number,
-                "dotaz/polozka[9]/@co": "SKUP",
-                "dotaz/polozka[9]/hodnota": patent_type,
-            }
-
-            response1 = requests.post(url1, data=data1)
-            if response1.status_code != 200:
-                print(f"Chyba při inicializaci dotazu pro {application_number}, status code: {response1.status_code}")
-                continue
-
-            print("Dotaz úspěšně inicializován.")
-
-            # Krok 2.5: Validace hitlistu
-            if not validate_hitlist():
-                print("Validace hitlistu selhala, přerušení procesu.")
-                continue
-
-            # Krok 3: Provedení dotazu
-            if not execute_dotaz(iddotaz):
-                print("Dotaz nebyl úspěšně proveden, přerušení procesu.")
-                continue
-
-            # Krok 4: Získání pIdSpis z výsledků dotazu
-            pIdSpis = get_pIdSpis(iddotaz)
-            if not pIdSpis:
-                print(f"Chyba: Nepodařilo se získat pIdSpis pro {application_number}")
-                continue
-
-            print(f"Získaný pIdSpis: {pIdSpis}")
-
-            # Krok 5: Získání časové osy (POST)
-            url3 = "https://isdv.upv.gov.cz/webapp/resdb.print_detail.Detail"
-            data3 = {
-                "pIdSpis": pIdSpis,
-                "pLang": "CS",
-                "pIdDotaz": iddotaz,
-                "pD": int(time.time() * 1000)
-            }
-
-            response3 = requests.post(url3, data=data3)
-            if response3.status_code != 200:
-                print(f"Chyba při získávání časové osy pro {application_number}, status code: {response3.status_code}")
-                continue
-
-            # Zpracování odpovědi
-            soup = BeautifulSoup(response3.text, 'html.parser')
-            casosaobal_div = soup.find('div', {'class': 'casosaobal'})
-            if casosaobal_div:
-                timeline_points = casosaobal_div.find_all('div', {'class': 'tlpoint'})
-                for point in timeline_points:
-                    date = point.find('span', {'class': 'dtm'}).text.strip()
-                    description = point.find('p').text.strip()
-                    writer.writerow([application_number, date, description])
-
-                print(f"Data pro přihlášku {application_number} byla úspěšně uložena.")
-            else:
-                print(f"Data pro přihlášku {application_number} nebyla nalezena.")
+    # Otevřeme výstupní soubor pro zápis všech dat, hlavička se zapíše hned
+    with otevri_zapis(cesta_pro_format(output_file, output_format), ["Nazev prihlasky", "Datum", "Popis"],
+                      output_format, {'Datum': 'datum', 'Popis': 'kategorie'}, encoding='utf-8') as writer, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+
+        if args.davky:
+            body = stahni_davkove(session, executor, prihlasky, args.validovat)
+            for application_number, patent_type in prihlasky:
+                zapis_body(writer, application_number, body.get((application_number, patent_type)))
+        else:
+            # Přihlášky běží souběžně, výsledky se zapisují ve stejném pořadí jako v Excelu
+            vysledky = executor.map(lambda prihlaska: zpracuj_prihlasku(session, *prihlaska, args.validovat),
+                                    prihlasky)
+            for (application_number, patent_type), html in zip(prihlasky, vysledky):
+                if html is not None:
+                    zapis_casovou_osu(writer, application_number, html)
 
     print("Proces stahování dokončen.")
 
+# Dávkový režim pro všechny přihlášky, vrací {(číslo přihlášky, typ): body časové osy}
+def stahni_davkove(session, executor, prihlasky, validovat=False):
+    """
+    Přihlášky z cache se nestahují. Ostatní se seskupí podle typu patentu, pro každý typ proběhne
+    jeden dotaz a z hitlistu se vezmou pIdSpis. Detaily se pak stahují souběžně. Přihlášky, které
+    dávka nenašla, se zpracují postaru po jedné.
+    """
+    cache = session.cache
+    body = {}
+    podle_typu = {}
+    for application_number, patent_type in dict.fromkeys(prihlasky):
+        html = cache.nacti(f"casova_osa:{application_number}:{patent_type}") if cache else None
+        if html is not None:
+            body[(application_number, patent_type)] = parse_casova_osa(html)
+        else:
+            podle_typu.setdefault(patent_type, []).append(application_number)
+    if cache and cache.offline:
+        return body
+
+    def detail(ulozka):
+        (application_number, patent_type), pIdSpis, iddotaz = ulozka
+        try:
+            html = stahni_detail(session, pIdSpis, iddotaz, application_number)
+        except requests.RequestException as e:
+            print(f"Chyba spojení u přihlášky {application_number}: {e}")
+            return None
+        casova_osa = parse_casova_osa(html) if html is not None else None
+        if casova_osa is not None and cache:
+            cache.uloz(f"casova_osa:{application_number}:{patent_type}", html, TTL_CASOVA_OSA)
+        return casova_osa
+
+    zbyvajici = []
+    for patent_type, application_numbers in podle_typu.items():
+        try:
+            iddotaz, spisy = stahni_davku(session, patent_type, validovat)
+        except requests.RequestException as e:
+            print(f"Chyba spojení u dávky typu {patent_type}: {e}")
+            iddotaz, spisy = None, {}
+        ulozky = [((application_number, patent_type), spisy[application_number], iddotaz)
+                  for application_number in application_numbers if application_number in spisy]
+        for ulozka, casova_osa in zip(ulozky, executor.map(detail, ulozky)):
+            body[ulozka[0]] = casova_osa
+        zbyvajici += [(application_number, patent_type)
+                      for application_number in application_numbers if application_number not in spisy]
+
+    if zbyvajici:
+        print(f"Přihlášek mimo dávky, zpracují se po jedné: {len(zbyvajici)}")
+        vysledky = executor.map(lambda prihlaska: zpracuj_prihlasku(session, *prihlaska, validovat), zbyvajici)
+        for prihlaska, html in zip(zbyvajici, vysledky):
+            body[prihlaska] = parse_casova_osa(html) if html is not None else None
+    return body
+
+# Zápis časové osy jedné přihlášky
+def zapis_casovou_osu(writer, application_number, html):
+    return zapis_body(writer, application_number, parse_casova_osa(html))
+
+def zapis_body(writer, application_number, body):
+    if body is None:
+        print(f"Data pro přihlášku {application_number} nebyla nalezena.")
+        return False
+    for date, description in body:
+        writer.writerow([application_number, date, description])
+    print(f"Data pro přihlášku {application_number} byla úspěšně uložena.")
+    return True
+
 if __name__ == "__main__":
     main()
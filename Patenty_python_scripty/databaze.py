@@ -0,0 +1,327 @@
+"""
+Místní databáze (SQLite) s typovanými tabulkami datového modelu, které dřív existovaly jen jako volné
+CSV/XLSX soubory ve složce `Azure_zdroje` a spojovaly se ručně v `Patenty_SQL/Patenty_dotazy.sql`.
+Extraktory a scrapery do ní mohou zapisovat přímo (formát `sqlite` v `zapis_vystupu.py`) a spojení
+pro BI běží lokálně nad indexy, bez opakovaného načítání CSV.
+
+### Tabulky (`TABULKY`):
+- Každá tabulka má sloupce s typy jako `zapis_vystupu` (`text`, `kategorie`, `datum`, `cele`, `desetinne`),
+  primární klíč podle přirozeného klíče dat a indexy na `Application_Number` a `API` (`INDEXOVANE_SLOUPCE`).
+- Data se ukládají jako ISO text `RRRR-MM-DD` (řadí se a porovnávají správně i jako text).
+- Sloupec přidaný do `TABULKY` se do existující databáze doplní při otevření (`ALTER TABLE ADD COLUMN`).
+  Po změně primárního klíče se tabulka při otevření přestaví s novým klíčem a dosavadními řádky.
+- `zdroje`: soubory z `Azure_zdroje`, ze kterých se tabulka naplní při importu (`nahravani.py`,
+  pozdější má přednost).
+- `prejmenovani`: jiné názvy sloupců ve zdrojích a ve výstupech skriptů (`Patent_Number` je
+  `Application_Number` jako po `sp_rename` v SQL, `Nazev prihlasky` z `casova_osa_scrape.py`).
+  Ostatní názvy se párují bez ohledu na velikost písmen a s mezerami jako podtržítky.
+- `Applicants_1.csv`, `applicants_2.csv` a `vysledek_stav.csv` se neimportují, jsou to uložená spojení
+  a kopie ostatních tabulek, nahrazuje je pohled `applicants_stav`. `vysledekstav.csv` má stejná API jako
+  `vysledekstav3.csv` (ten spojuje i SQL) a stavy poškozené kódováním (`Platn� dokument`), neimportuje se
+  a zůstává beze změny.
+
+### Pohledy (`POHLEDY`):
+- `applicants_stav`: přihlašovatelé se stavem dokumentu (`Applicants LEFT JOIN vysledekstav ON API`),
+  přihlašovatelé bez stavu mají `STAV` NULL.
+- `mpt_popis`: MPT klasifikace s popisem třídy z číselníku `MPT`.
+- `prijmy_univerzit`: licenční příjmy se jménem a zkratkou univerzity.
+
+### Použití:
+- `Databaze(cesta)`: spojení v režimu WAL, `zapis(tabulka, sloupce, radky)` uloží řádky v jedné transakci
+  jako upsert podle primárního klíče (`INSERT ... ON CONFLICT DO UPDATE`). Existující řádek se přepíše,
+  jen když se některá hodnota liší, a sloupce, které zápis nemá, zůstanou. `dotaz(sql)` vrátí výsledek
+  jako seznam n-tic.
+- `python nahravani.py --slozka ../Azure_zdroje` naplní databázi ze souborů, `python databaze.py --info`
+  vypíše počty řádků, `--pohled applicants_stav` vypíše počet řádků a čas dotazu.
+"""
+
+import argparse
+import sqlite3
+import time
+from datetime import date
+
+from zapis_vystupu import PREVODY
+
+# Umístění databáze
+DATABAZE = 'patenty.sqlite'
+
+# Jak dlouho čekat na zámek databáze, když do ní zapisuje jiný proces (sekundy)
+CEKANI_NA_ZAMEK = 60
+
+# Typy sloupců `zapis_vystupu` jako typy SQLite
+SQL_TYPY = {
+    'text': 'TEXT',
+    'kategorie': 'TEXT',
+    'datum': 'TEXT',
+    'cele': 'INTEGER',
+    'desetinne': 'REAL',
+}
+
+# Sloupce, podle kterých se tabulky spojují, mají vždy index
+INDEXOVANE_SLOUPCE = ('Application_Number', 'API')
+
+TABULKY = {
+    'Seznam_univerzit': {
+        'sloupce': {'ID_univerzita': 'cele', 'Nazev_univerzity': 'text', 'Zkratka_univerzity': 'text'},
+        'klic': ('ID_univerzita',),
+        'zdroje': ('Seznam_univerzit.csv',),
+        'prejmenovani': {'Zkratka': 'Zkratka_univerzity'},
+    },
+    'Applicants': {
+        'sloupce': {'Applicant_Name': 'text', 'Country_Code': 'kategorie', 'Application_Number': 'text',
+                    'File_Name': 'text', 'Filing_Date': 'datum', 'ID_univerzita': 'cele', 'API': 'text',
+                    'TYP': 'kategorie', 'TYP_CISLO': 'cele'},
+        'klic': ('API', 'Applicant_Name'),
+        'zdroje': ('Applicants.csv',),
+        'prejmenovani': {},
+    },
+    'vysledekstav': {
+        'sloupce': {'Application_Number': 'text', 'API': 'text', 'STAV': 'kategorie'},
+        'klic': ('API',),
+        'zdroje': ('vysledekstav3.csv',),
+        'prejmenovani': {},
+    },
+    'casova_osa': {
+        'sloupce': {'Application_Number': 'text', 'Datum': 'datum', 'Popis': 'kategorie'},
+        'klic': ('Application_Number', 'Datum', 'Popis'),
+        'zdroje': ('casova_osa.csv',),
+        'prejmenovani': {'Nazev_prihlasky': 'Application_Number'},
+    },
+    'MPT': {
+        'sloupce': {'Popis': 'text', 'Level1': 'kategorie', 'Level2': 'kategorie', 'Level3': 'text'},
+        'klic': ('Level3',),
+        'zdroje': ('MPT.csv',),
+        'prejmenovani': {},
+    },
+    'MPTapi': {
+        'sloupce': {'Application_Number': 'text', 'MPT': 'kategorie', 'Filing_Date': 'datum', 'File_Name': 'text',
+                    'API': 'text'},
+        'klic': ('API', 'MPT', 'File_Name'),
+        'zdroje': ('MPTapi.csv',),
+        'prejmenovani': {},
+    },
+    'patent_data': {
+        'sloupce': {'Publication_Office_Code': 'kategorie', 'Original_Publication_Office_Code': 'kategorie',
+                    'Publication_Number': 'text', 'Document_Kind_Code': 'kategorie', 'Publication_Date': 'datum',
+                    'Application_Number': 'text', 'Filing_Date': 'datum', 'Invention_Title': 'text',
+                    'File_Name': 'text'},
+        'klic': ('Publication_Number', 'Document_Kind_Code'),
+        'zdroje': ('patent_data_updated2cast.csv',),
+        'prejmenovani': {},
+    },
+    'malicenci': {
+        'sloupce': {'Patent_Code': 'kategorie', 'Application_Number': 'text', 'Patent_ID': 'cele',
+                    'Status': 'kategorie', 'Classes': 'text', 'Title': 'text', 'Organization': 'text',
+                    'ID_univerzita': 'cele'},
+        # Patent ve spoluvlastnictví má v `ma_licenci_2.csv` řádek pro každou organizaci
+        'klic': ('Patent_Code', 'Application_Number', 'Organization'),
+        'zdroje': ('malicenci_1.csv', 'ma_licenci_2.csv'),
+        'prejmenovani': {'Patent_Number': 'Application_Number'},
+    },
+    'licencni_prijmy': {
+        'sloupce': {'ID_prijmy_univerzity': 'cele', 'Nazev_univerzity': 'text', 'ID_univerzita': 'cele',
+                    'Licencni_prijem': 'cele', 'Rok': 'cele', 'IncomeCategory': 'kategorie'},
+        'klic': ('ID_prijmy_univerzity',),
+        'zdroje': ('licencni_prijmy.csv',),
+        'prejmenovani': {},
+    },
+}
+
+POHLEDY = {
+    'applicants_stav': """
+        SELECT a.*, v.STAV
+        FROM Applicants a
+        LEFT JOIN vysledekstav v ON a.API = v.API""",
+    'mpt_popis': """
+        SELECT m.*, p.Popis, p.Level1, p.Level2
+        FROM MPTapi m
+        LEFT JOIN MPT p ON p.Level3 = m.MPT""",
+    'prijmy_univerzit': """
+        SELECT l.*, u.Zkratka_univerzity
+        FROM licencni_prijmy l
+        LEFT JOIN Seznam_univerzit u ON u.ID_univerzita = l.ID_univerzita""",
+}
+
+
+def _nazev(sloupec):
+    """Název sloupce pro porovnání: bez okrajových mezer, mezery jako podtržítka, malými písmeny."""
+    return sloupec.strip().replace(' ', '_').lower()
+
+
+def najdi_tabulku(nazev):
+    """Název tabulky z `TABULKY` odpovídající `nazev` bez ohledu na velikost písmen, jinak None."""
+    return next((tabulka for tabulka in TABULKY if tabulka.lower() == nazev.lower()), None)
+
+
+def sloupce_tabulky(tabulka, hlavicka):
+    """
+    Pro každý sloupec `hlavicka` název sloupce tabulky `tabulka` z `TABULKY`, nebo None, pokud ho tabulka
+    nemá. Opakovaný sloupec (např. `API` ve spojených souborech) se použije jen poprvé.
+    """
+    schema = TABULKY[tabulka]
+    nazvy = {_nazev(sloupec): sloupec for sloupec in schema['sloupce']}
+    nazvy.update({_nazev(puvodni): sloupec for puvodni, sloupec in schema['prejmenovani'].items()})
+    vysledek, pouzite = [], set()
+    for sloupec in hlavicka:
+        cilovy = nazvy.get(_nazev(sloupec))
+        vysledek.append(cilovy if cilovy not in pouzite else None)
+        pouzite.add(cilovy)
+    return vysledek
+
+
+def _hodnota_sql(prevod, hodnota):
+    """Hodnota převedená podle typu sloupce, datum jako ISO text."""
+    hodnota = prevod(hodnota)
+    return hodnota.isoformat() if isinstance(hodnota, date) else hodnota
+
+
+def _identifikator(nazev):
+    return '"' + nazev.replace('"', '""') + '"'
+
+
+class Databaze:
+    """Spojení s místní databází, jedna instance na proces."""
+
+    def __init__(self, cesta=DATABAZE):
+        self.cesta = cesta
+        self.db = sqlite3.connect(cesta, timeout=CEKANI_NA_ZAMEK, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.vytvor_schema()
+
+    def vytvor_schema(self):
+        """
+        Vytvoří chybějící tabulky, sloupce, indexy a pohledy (existující nemění). Tabulku s jiným primárním
+        klíčem, než má `TABULKY`, přestaví a řádky do ní zkopíruje.
+        """
+        with self.db:
+            self.db.execute("BEGIN")
+            for tabulka, schema in TABULKY.items():
+                self._vytvor_tabulku(tabulka, schema['sloupce'], schema['klic'])
+                info = self.db.execute(f"PRAGMA table_info({_identifikator(tabulka)})").fetchall()
+                existujici = {radek[1] for radek in info}
+                for sloupec, typ in schema['sloupce'].items():
+                    if sloupec not in existujici:
+                        self.db.execute(f"ALTER TABLE {_identifikator(tabulka)} "
+                                        f"ADD COLUMN {_identifikator(sloupec)} {SQL_TYPY[typ]}")
+                klic = tuple(radek[1] for radek in sorted(info, key=lambda radek: radek[5]) if radek[5])
+                if klic != tuple(schema['klic']):
+                    self._prestav_tabulku(tabulka, schema)
+            for pohled, sql in POHLEDY.items():
+                self.db.execute(f"CREATE VIEW IF NOT EXISTS {_identifikator(pohled)} AS {sql}")
+
+    def _prestav_tabulku(self, tabulka, schema):
+        # Dosavadní řádky jsou jedinečné podle starého klíče, nový klíč je jen rozšiřuje
+        docasna = _identifikator(f"{tabulka}_puvodni")
+        sloupce = ', '.join(map(_identifikator, schema['sloupce']))
+        # Pohledy se na konci `vytvor_schema` vytvoří znovu, přejmenování by odkazy v nich přesměrovalo
+        for pohled in POHLEDY:
+            self.db.execute(f"DROP VIEW IF EXISTS {_identifikator(pohled)}")
+        self.db.execute(f"ALTER TABLE {_identifikator(tabulka)} RENAME TO {docasna}")
+        for sloupec in INDEXOVANE_SLOUPCE:
+            self.db.execute(f"DROP INDEX IF EXISTS {_identifikator(f'idx_{tabulka}_{sloupec}')}")
+        self._vytvor_tabulku(tabulka, schema['sloupce'], schema['klic'])
+        self.db.execute(f"INSERT OR REPLACE INTO {_identifikator(tabulka)} ({sloupce}) SELECT {sloupce} FROM {docasna}")
+        self.db.execute(f"DROP TABLE {docasna}")
+
+    def _vytvor_tabulku(self, tabulka, sloupce, klic=()):
+        definice = [f"{_identifikator(sloupec)} {SQL_TYPY[typ]}" for sloupec, typ in sloupce.items()]
+        if klic:
+            definice.append(f"PRIMARY KEY ({', '.join(map(_identifikator, klic))})")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS {_identifikator(tabulka)} ({', '.join(definice)})")
+        for sloupec in INDEXOVANE_SLOUPCE:
+            # Index na prvním sloupci primárního klíče už existuje
+            if sloupec in sloupce and (not klic or klic[0] != sloupec):
+                self.db.execute(f"CREATE INDEX IF NOT EXISTS {_identifikator(f'idx_{tabulka}_{sloupec}')} "
+                                f"ON {_identifikator(tabulka)} ({_identifikator(sloupec)})")
+
+    def priprav_tabulku(self, nazev, hlavicka, typy=None, nahradit=False):
+        """
+        Tabulka pro zápis řádků s `hlavicka`: vrátí (název tabulky, názvy sloupců pro `hlavicka`).
+        Tabulka z `TABULKY` se najde podle názvu a řádky se do ní jen doplňují podle primárního klíče
+        (importovaná data a sloupce, které výstup skriptu nemá, zůstanou). Jiná tabulka se vytvoří podle
+        hlavičky a `typy` (bez primárního klíče, s indexy na `INDEXOVANE_SLOUPCE`), s `nahradit` znovu.
+        """
+        tabulka = najdi_tabulku(nazev)
+        if tabulka is not None:
+            return tabulka, sloupce_tabulky(tabulka, hlavicka)
+        typy = typy or {}
+        sloupce = [sloupec.strip().replace(' ', '_') for sloupec in hlavicka]
+        with self.db:
+            self.db.execute("BEGIN")
+            if nahradit:
+                self.db.execute(f"DROP TABLE IF EXISTS {_identifikator(nazev)}")
+            self._vytvor_tabulku(nazev, {sloupec: typy.get(puvodni, 'text')
+                                         for sloupec, puvodni in zip(sloupce, hlavicka)})
+        return nazev, sloupce
+
+    def zapis(self, tabulka, sloupce, radky, typy=None):
+        """
+        Uloží řádky do tabulky v jedné transakci jako upsert podle primárního klíče: nový klíč se vloží,
+        existující řádek se přepíše jen ve sloupcích zápisu a jen když se některá hodnota liší.
+        `sloupce` jsou názvy sloupců tabulky pro hodnoty v řádku (None = hodnota se neukládá), typy se
+        převádí podle `TABULKY`, u ostatních tabulek podle `typy` {sloupec: typ}.
+        Vrátí (vložené, změněné, nezměněné) řádky.
+        """
+        schema = TABULKY.get(tabulka, {})
+        typy_sloupcu = schema.get('sloupce', typy or {})
+        klic = schema.get('klic', ())
+        pozice = [index for index, sloupec in enumerate(sloupce) if sloupec is not None]
+        nazvy = [sloupce[index] for index in pozice]
+        prevody = [PREVODY[typy_sloupcu.get(sloupec, 'text')] for sloupec in nazvy]
+        sql = (f"INSERT INTO {_identifikator(tabulka)} ({', '.join(map(_identifikator, nazvy))}) "
+               f"VALUES ({', '.join('?' * len(nazvy))})")
+        ostatni = [_identifikator(sloupec) for sloupec in nazvy if sloupec not in klic]
+        if klic and ostatni:
+            sql += (f" ON CONFLICT ({', '.join(map(_identifikator, klic))}) DO UPDATE SET "
+                    + ', '.join(f"{sloupec} = excluded.{sloupec}" for sloupec in ostatni)
+                    + " WHERE " + ' OR '.join(f"{sloupec} IS NOT excluded.{sloupec}" for sloupec in ostatni))
+        elif klic:
+            sql += f" ON CONFLICT ({', '.join(map(_identifikator, klic))}) DO NOTHING"
+        hodnoty = [tuple(_hodnota_sql(prevod, row[index] if index < len(row) else None)
+                         for index, prevod in zip(pozice, prevody)) for row in radky]
+        pocet_sql = f"SELECT COUNT(*) FROM {_identifikator(tabulka)}"
+        with self.db:
+            self.db.execute("BEGIN")
+            pred = self.db.execute(pocet_sql).fetchone()[0]
+            zmen = self.db.total_changes
+            self.db.executemany(sql, hodnoty)
+            vlozene = self.db.execute(pocet_sql).fetchone()[0] - pred
+            zmenene = self.db.total_changes - zmen - vlozene
+        return vlozene, zmenene, len(hodnoty) - vlozene - zmenene
+
+    def dotaz(self, sql, parametry=()):
+        """Výsledek dotazu jako seznam n-tic."""
+        return self.db.execute(sql, parametry).fetchall()
+
+    def info(self):
+        """Seznam (tabulka nebo pohled, počet řádků)."""
+        nazvy = [nazev for (nazev,) in self.db.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY type, name")]
+        return [(nazev, self.db.execute(f"SELECT COUNT(*) FROM {_identifikator(nazev)}").fetchone()[0])
+                for nazev in nazvy]
+
+    def zavri(self):
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Místní databáze tabulek o patentech univerzit.")
+    parser.add_argument('--cesta', default=DATABAZE, help=f"soubor databáze (výchozí {DATABAZE})")
+    parser.add_argument('--info', action='store_true', help="vypsat počty řádků tabulek a pohledů")
+    parser.add_argument('--pohled', choices=sorted(POHLEDY), help="změřit dotaz na pohled")
+    args = parser.parse_args()
+
+    db = Databaze(args.cesta)
+    if args.info:
+        for nazev, pocet in db.info():
+            print(f"  {nazev}: {pocet} řádků")
+    if args.pohled:
+        zacatek = time.perf_counter()
+        radky = db.dotaz(f"SELECT * FROM {_identifikator(args.pohled)}")
+        print(f"{args.pohled}: {len(radky)} řádků za {(time.perf_counter() - zacatek) * 1000:.1f} ms")
+    db.zavri()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Společné rychlé parsování HTML stránek ISDV pro scrapery (`casova_osa_scrape.py`, `licence_scraping.py`).
+Ze stránek se čte jen několik prvků (časová osa na detailu, řádky `trdata` hitlistu, `data-id` spisu),
+proto se místo celého stromu BeautifulSoup s `html.parser` používá rychlejší parser s cílenými selektory.
+
+### Backendy (první dostupný podle `POREDI_BACKENDU`):
+- `selectolax`: parser Lexbor (`selectolax.lexbor`), CSS selektory, nejrychlejší.
+- `lxml`: `lxml.html` s XPath dotazy.
+- `bs4`: původní chování (`BeautifulSoup(..., 'html.parser')`), funguje vždy, když je nainstalován bs4.
+- Backend lze vynutit přes `nastav_backend(nazev)` nebo proměnnou prostředí `HTML_BACKEND`.
+
+### Funkce:
+- `casova_osa(html)`: Seznam dvojic (datum, popis) z bloku `div.casosaobal > div.tlpoint`, nebo None,
+  pokud blok na stránce chybí.
+- `radky_trdata(html)`: Řádky `tr.trdata` jako dvojice (texty buněk `td`, `data-id` z `input.hitlist`, nebo None).
+- `prvni_data_id(html)`: `data-id` prvního `input.hitlist` na stránce, nebo None.
+- `pocet_zaznamu(html)`: Celkový počet záznamů výsledku dotazu z textu stránky hitlistu (`VZOR_POCTU`), nebo None.
+
+### Poznámky:
+- Text buňky odpovídá `get_text(strip=True)` z BeautifulSoup: každý textový uzel se ořízne a spojí bez
+  oddělovače. Datum a popis časové osy odpovídá `.text.strip()` (ořízne se až celý text). Komentáře se
+  vynechají, výsledky jsou tak stejné pro všechny backendy.
+- Bajty se dekódují podle `charset` v hlavičce stránky (`<meta>`), jinak jako UTF-8.
+
+### Benchmark:
+- `python html_parsovani.py --vzory <složka>` změří všechny dostupné backendy na uložených stránkách
+  (soubory `.html` / `.htm`), `--cache <soubor>` vezme stránky detailu a hitlistu z cache `http_cache.py`.
+- Pro každou stránku se ověří, že rychlé backendy vrací stejný výsledek jako `bs4`.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+POREDI_BACKENDU = ('selectolax', 'lxml', 'bs4')
+
+_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# Popisek celkového počtu záznamů v záhlaví hitlistu ("Počet záznamů: 1 234", "Počet nalezených záznamů: 1234"),
+# číslo musí následovat hned za dvojtečkou. Obecná slova jako "celkem" nebo "nalezeno" se vyskytují i v textu
+# záznamů, proto se nehledají. Počet je jen odhad, scraper ho ověřuje podle poslední stránky.
+VZOR_POCTU = re.compile(r'počet\s+(?:nalezených\s+)?záznamů\s*:\s*(\d{1,3}(?:[ \xa0]\d{3})+|\d+)(?!\d)',
+                        re.IGNORECASE)
+_ZNACKY = re.compile(r'<[^>]*>')
+
+
+def _dekoduj(html):
+    """Vrátí HTML jako text, bajty podle `charset` z `<meta>`, jinak jako UTF-8."""
+    if isinstance(html, str):
+        return html
+    nalez = _CHARSET.search(html[:4096])
+    kodovani = nalez.group(1).decode('ascii') if nalez else 'utf-8'
+    try:
+        return html.decode(kodovani, errors='replace')
+    except LookupError:
+        return html.decode('utf-8', errors='replace')
+
+
+def _text(kusy, po_uzlech=True):
+    """Spojí textové uzly jako `get_text(strip=True)`, nebo jako `.text.strip()` (`po_uzlech=False`)."""
+    if po_uzlech:
+        return ''.join(kus.strip() for kus in kusy)
+    return ''.join(kusy).strip()
+
+
+def pocet_zaznamu(html):
+    """Celkový počet záznamů z textu stránky výsledků, nebo None (nezávisí na backendu)."""
+    text = _ZNACKY.sub(' ', _dekoduj(html)).replace('&nbsp;', ' ')
+    nalez = VZOR_POCTU.search(text)
+    if not nalez:
+        return None
+    return int(re.sub(r'\D', '', nalez.group(1)))
+
+
+# --- selectolax (Lexbor) ---
+
+def _selectolax_strom(html):
+    from selectolax.lexbor import LexborHTMLParser
+    return LexborHTMLParser(_dekoduj(html))
+
+
+def _selectolax_text(uzel, po_uzlech=True):
+    if uzel is None:
+        return ''
+    if po_uzlech:
+        return uzel.text(deep=True, separator='', strip=True)
+    return uzel.text(deep=True).strip()
+
+
+def _selectolax_casova_osa(html):
+    obal = _selectolax_strom(html).css_first('div.casosaobal')
+    if obal is None:
+        return None
+    return [(_selectolax_text(bod.css_first('span.dtm'), False), _selectolax_text(bod.css_first('p'), False))
+            for bod in obal.css('div.tlpoint')]
+
+
+def _selectolax_radky(html):
+    radky = []
+    for radek in _selectolax_strom(html).css('tr.trdata'):
+        spis = radek.css_first('input.hitlist[data-id]')
+        radky.append((tuple(_selectolax_text(td) for td in radek.css('td')),
+                      spis.attributes['data-id'] if spis is not None else None))
+    return radky
+
+
+def _selectolax_data_id(html):
+    spis = _selectolax_strom(html).css_first('input.hitlist[data-id]')
+    return spis.attributes['data-id'] if spis is not None else None
+
+
+# --- lxml ---
+
+def _trida(nazev):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {nazev} ')"
+
+
+def _lxml_strom(html):
+    import lxml.html
+    from lxml import etree
+    try:
+        return lxml.html.document_fromstring(_dekoduj(html))
+    except etree.ParserError:
+        # Prázdná stránka
+        return None
+
+
+def _lxml_prvni(uzel, xpath):
+    nalez = uzel.xpath(xpath) if uzel is not None else []
+    return nalez[0] if nalez else None
+
+
+def _lxml_text(uzel, po_uzlech=True):
+    return _text(uzel.itertext(), po_uzlech) if uzel is not None else ''
+
+
+def _lxml_casova_osa(html):
+    obal = _lxml_prvni(_lxml_strom(html), f"//div[{_trida('casosaobal')}]")
+    if obal is None:
+        return None
+    return [(_lxml_text(_lxml_prvni(bod, f".//span[{_trida('dtm')}]"), False),
+             _lxml_text(_lxml_prvni(bod, ".//p"), False))
+            for bod in obal.xpath(f".//div[{_trida('tlpoint')}]")]
+
+
+def _lxml_radky(html):
+    strom = _lxml_strom(html)
+    if strom is None:
+        return []
+    radky = []
+    for radek in strom.xpath(f"//tr[{_trida('trdata')}]"):
+        spis = _lxml_prvni(radek, f".//input[{_trida('hitlist')} and @data-id]")
+        radky.append((tuple(_lxml_text(td) for td in radek.iter('td') if td is not radek),
+                      spis.get('data-id') if spis is not None else None))
+    return radky
+
+
+def _lxml_data_id(html):
+    spis = _lxml_prvni(_lxml_strom(html), f"//input[{_trida('hitlist')} and @data-id]")
+    return spis.get('data-id') if spis is not None else None
+
+
+# --- bs4 (původní chování) ---
+
+def _bs4_strom(html):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser')
+
+
+def _bs4_text(uzel, po_uzlech=True):
+    if uzel is None:
+        return ''
+    return uzel.get_text(strip=True) if po_uzlech else uzel.text.strip()
+
+
+def _bs4_casova_osa(html):
+    obal = _bs4_strom(html).find('div', {'class': 'casosaobal'})
+    if not obal:
+        return None
+    return [(_bs4_text(bod.find('span', {'class': 'dtm'}), False), _bs4_text(bod.find('p'), False))
+            for bod in obal.find_all('div', {'class': 'tlpoint'})]
+
+
+def _bs4_radky(html):
+    radky = []
+    for radek in _bs4_strom(html).find_all('tr', class_='trdata'):
+        spis = radek.find('input', {'class': 'hitlist', 'data-id': True})
+        radky.append((tuple(_bs4_text(td) for td in radek.find_all('td')),
+                      spis['data-id'] if spis else None))
+    return radky
+
+
+def _bs4_data_id(html):
+    spis = _bs4_strom(html).find('input', {'class': 'hitlist', 'data-id': True})
+    return spis['data-id'] if spis else None
+
+
+BACKENDY = {
+    'selectolax': ('selectolax.lexbor', _selectolax_casova_osa, _selectolax_radky, _selectolax_data_id),
+    'lxml': ('lxml.html', _lxml_casova_osa, _lxml_radky, _lxml_data_id),
+    'bs4': ('bs4', _bs4_casova_osa, _bs4_radky, _bs4_data_id),
+}
+
+
+def dostupne_backendy():
+    """Backendy, jejichž knihovna jde importovat, v pořadí podle `POREDI_BACKENDU`."""
+    dostupne = []
+    for nazev in POREDI_BACKENDU:
+        try:
+            __import__(BACKENDY[nazev][0])
+        except ImportError:
+            continue
+        dostupne.append(nazev)
+    return dostupne
+
+
+def nastav_backend(nazev=None):
+    """Nastaví backend pro `casova_osa`, `radky_trdata` a `prvni_data_id`, bez názvu první dostupný."""
+    global backend, casova_osa, radky_trdata, prvni_data_id
+    dostupne = dostupne_backendy()
+    if nazev is None:
+        if not dostupne:
+            raise ImportError("Pro parsování HTML je potřeba bs4, lxml nebo selectolax (pip install beautifulsoup4).")
+        nazev = dostupne[0]
+    elif nazev not in dostupne:
+        raise ValueError(f"Backend {nazev} není dostupný (dostupné: {', '.join(dostupne)})")
+    backend = nazev
+    _, casova_osa, radky_trdata, prvni_data_id = BACKENDY[nazev]
+    return nazev
+
+
+backend = casova_osa = radky_trdata = prvni_data_id = None
+nastav_backend(os.environ.get('HTML_BACKEND') or None)
+
+
+# --- benchmark ---
+
+def nacti_vzory(slozka=None, cache=None):
+    """Uložené stránky jako dvojice (název, HTML) ze složky a/nebo z cache `http_cache.py`."""
+    vzory = []
+    if slozka:
+        for nazev in sorted(os.listdir(slozka)):
+            if nazev.lower().endswith(('.html', '.htm')):
+                with open(os.path.join(slozka, nazev), 'rb') as soubor:
+                    vzory.append((nazev, soubor.read()))
+    if cache:
+        db = sqlite3.connect(f"file:{cache}?mode=ro", uri=True)
+        for url, telo in db.execute(
+                "SELECT url, telo FROM odpovedi WHERE telo IS NOT NULL AND "
+                "(url LIKE '%Detail%' OR url LIKE '%Vysledek%' OR url LIKE 'casova_osa:%')"):
+            vzory.append((url, telo))
+        db.close()
+    return vzory
+
+
+def zmer(funkce, vzory, opakovani):
+    """Nejlepší čas z `opakovani` průchodů všemi vzory (sekundy)."""
+    nejlepsi = None
+    for _ in range(opakovani):
+        zacatek = time.perf_counter()
+        for _, html in vzory:
+            funkce(html)
+        trvani = time.perf_counter() - zacatek
+        nejlepsi = trvani if nejlepsi is None else min(nejlepsi, trvani)
+    return nejlepsi
+
+
+def benchmark(vzory, opakovani=5):
+    """Změří backendy na vzorech a ověří shodu výsledků s `bs4`, vrátí {(backend, funkce): sekundy}."""
+    dostupne = dostupne_backendy()
+    detaily = [vzor for vzor in vzory if 'casosaobal' in _dekoduj(vzor[1])]
+    hitlisty = [vzor for vzor in vzory if 'trdata' in _dekoduj(vzor[1])]
+    ulohy = [('casova_osa', 1, detaily), ('radky_trdata', 2, hitlisty), ('prvni_data_id', 3, hitlisty)]
+
+    vysledky = {}
+    for funkce, index, stranky in ulohy:
+        if not stranky:
+            continue
+        print(f"{funkce}: {len(stranky)} stránek")
+        for nazev in dostupne:
+            implementace = BACKENDY[nazev][index]
+            if 'bs4' in dostupne and nazev != 'bs4':
+                for jmeno, html in stranky:
+                    if implementace(html) != BACKENDY['bs4'][index](html):
+                        print(f"  {nazev}: výsledek se liší od bs4 na stránce {jmeno}")
+            vysledky[(nazev, funkce)] = zmer(implementace, stranky, opakovani)
+        zaklad = vysledky.get(('bs4', funkce))
+        for nazev in dostupne:
+            trvani = vysledky[(nazev, funkce)]
+            zrychleni = f", {zaklad / trvani:.1f}x rychlejší než bs4" if zaklad and nazev != 'bs4' else ''
+            print(f"  {nazev:<11}{trvani / len(stranky) * 1000:8.3f} ms/stránka{zrychleni}")
+    return vysledky
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsování HTML stránek ISDV.")
+    parser.add_argument('--vzory', help="složka s uloženými stránkami (.html)")
+    parser.add_argument('--cache', help="cache http_cache.py, ze které se vezmou stránky detailu a hitlistu")
+    parser.add_argument('--opakovani', type=int, default=5, help="počet opakování měření (výchozí 5)")
+    args = parser.parse_args()
+
+    vzory = nacti_vzory(args.vzory, args.cache)
+    if not vzory:
+        parser.error("Nejsou žádné vzorové stránky, zadejte --vzory nebo --cache.")
+    print(f"Dostupné backendy: {', '.join(dostupne_backendy())}, vzorů: {len(vzory)}")
+    benchmark(vzory, max(1, args.opakovani))
+
+
+if __name__ == "__main__":
+    main()
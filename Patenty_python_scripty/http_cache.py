@@ -0,0 +1,501 @@
+"""
+Společná perzistentní cache HTTP odpovědí pro scrapery ÚPV (isdv.upv.gov.cz). Opakovaný běh skriptu
+nebo ladění parseru tak nemusí znovu posílat stejné dotazy na server.
+
+### Jak to funguje:
+- `CachovanaSession` je `requests.Session`, která před odesláním dotazu hledá odpověď v cache.
+  Skripty ji použijí místo `requests.get` / `requests.post` a zbytek kódu zůstává stejný.
+- Klíč záznamu je SHA-256 z metody, URL, seřazených parametrů a těla dotazu (formulářová data).
+- Metadata a malé odpovědi jsou v SQLite databázi `CACHE_DB`, velké odpovědi (archivy) jako soubory
+  ve složce `<CACHE_DB>_data`. Odpověď stahovaná se `stream=True` se do cache zapisuje po blocích
+  a čte se z disku, celá se nedrží v paměti.
+- Ukládají se jen odpovědi se stavem 200.
+
+### Pravidla podle endpointu (`PRAVIDLA`, první shoda regulárního výrazu s URL):
+- `ttl`: doba platnosti v sekundách, `None` = trvale, `0` = necachovat.
+- `klic`: parametry, ze kterých se skládá klíč (ostatní se ignorují), jinak všechny kromě `ignorovat`.
+- `ignorovat`: parametry mimo klíč, výchozí `pD` (časové razítko dotazu).
+- Dotazy, které mění stav na serveru (`getDotazID`, `formxml.make`, `hitlist.isEmpty`, `proveddotazsql`),
+  a URL bez pravidla se necachují.
+- Stav dokumentu platí den, časová osa 30 dní, stránky výsledků den, seznam archivů hodinu, archivy trvale.
+
+### Podmíněné dotazy a navázání:
+- Dotaz s `Range` jde vždy na server a neukládá se.
+- Dotaz s `If-None-Match` / `If-Modified-Since` na platný záznam se shodným ETag / Last-Modified dostane
+  odpověď 304 přímo z cache. Prošlý záznam s validátory se na serveru ověří podmíněným dotazem,
+  při 304 se jen prodlouží jeho platnost.
+
+### Velikost a offline režim:
+- Při překročení `max_velikost` (výchozí `MAX_VELIKOST`) se mažou nejdéle nepoužité záznamy.
+- V offline režimu se nic neposílá na server, vrací se i prošlé záznamy a chybějící záznam vyvolá
+  `OfflineChyba` (podtřída `requests.ConnectionError`, skripty ji ošetří jako nedostupný server).
+
+### Omezení rychlosti:
+- `OmezovacRychlosti`: pevný minimální odstup mezi začátky dotazů na server, sdílený všemi vlákny.
+- `AdaptivniOmezovac`: při odpovědi `PRETIZENI` (429, 502, 503, 504) nebo chybě spojení odstup zdvojnásobí
+  a dodrží `Retry-After`, po úspěšných dotazech ho zkracuje zpět na výchozí hodnotu. Session s ním
+  přetížený dotaz zopakuje (`opakovani`).
+
+### Použití ve skriptech:
+- `pridej_prepinace(parser)` přidá přepínače `--bez-cache`, `--offline` a `--cache <soubor>`,
+  `vytvor_session(args, interval)` podle nich vrátí session s omezením rychlosti dotazů na server (`stav_api.py`, `casova_osa_scrape.py`,
+  `licence_scraping.py`, `stahovani_dat_web.py`).
+
+### Další použití:
+- `HttpCache.zapis_soubor(...)`: převezme soubor stažený mimo session (archiv stažený s navázáním
+  v `stahovani_dat_web.py`).
+- `HttpCache.uloz(klic, obsah, ttl)` / `HttpCache.nacti(klic)`: uložení libovolného výsledku pod vlastním
+  klíčem (např. časová osa podle čísla přihlášky, když řetězec dotazů sám cachovat nejde).
+- `python http_cache.py --info` vypíše počet a velikost záznamů, `--vycistit` smaže prošlé záznamy,
+  `--smazat` celou cache.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Umístění cache a limit její velikosti
+CACHE_DB = 'upv_cache.sqlite'
+MAX_VELIKOST = 2 * 1024 ** 3
+
+# Odpovědi větší než tento limit se ukládají jako soubory mimo databázi
+MAX_V_DATABAZI = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+HODINA = 3600
+DEN = 24 * HODINA
+
+PRAVIDLA = [
+    {'vzor': r'resdb\.dotaz\.getDotazID|formxml\.make|hitlist\.isEmpty|proveddotazsql', 'ttl': 0},
+    {'vzor': r'resdb\.ipr\.status', 'ttl': DEN},
+    {'vzor': r'print_detail\.Detail', 'ttl': 30 * DEN, 'klic': ('pIdSpis', 'pLang')},
+    {'vzor': r'print_vysledek\.Vysledek', 'ttl': DEN},
+    {'vzor': r'pubsrv\.seznam', 'ttl': HODINA},
+    {'vzor': r'\.zip$', 'ttl': None},
+]
+
+# Stavy odpovědi, při kterých adaptivní omezovač zpomalí a dotaz se opakuje
+PRETIZENI = (429, 502, 503, 504)
+
+# Hlavičky odpovědi, které se ukládají
+ULOZENE_HLAVICKY = ('Content-Type', 'ETag', 'Last-Modified', 'Content-Length')
+
+
+class OfflineChyba(requests.ConnectionError):
+    """Odpověď není v cache a offline režim nedovoluje dotaz na server."""
+
+
+class OmezovacRychlosti:
+    """Zajistí minimální odstup mezi začátky dotazů na server, sdílený všemi vlákny."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.zamek = threading.Lock()
+        self.dalsi = 0.0
+
+    def cekej(self):
+        with self.zamek:
+            ted = time.monotonic()
+            start = max(ted, self.dalsi)
+            self.dalsi = start + self.interval
+        if start > ted:
+            time.sleep(start - ted)
+
+
+class AdaptivniOmezovac(OmezovacRychlosti):
+    """
+    Omezovač, který odstup přizpůsobuje odpovědím serveru: při přetížení (`PRETIZENI`, chyba spojení)
+    ho zdvojnásobí (nejvýš `max_interval`) a dodrží `Retry-After`, po úspěšných dotazech ho postupně
+    zkracuje zpět na výchozí `interval`.
+    """
+
+    def __init__(self, interval, max_interval=60.0, zpomaleni=2.0, zrychleni=0.8):
+        super().__init__(interval)
+        self.min_interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.zpomaleni = zpomaleni
+        self.zrychleni = zrychleni
+        self.zpomaleno = 0.0
+
+    def po_dotazu(self, response=None):
+        """Upraví odstup podle odpovědi (`None` = chyba spojení), vrátí True, pokud je server přetížen."""
+        pretizeno = response is None or response.status_code in PRETIZENI
+        with self.zamek:
+            ted = time.monotonic()
+            if pretizeno:
+                # Souběžné dotazy odeslané před zpomalením ho nenásobí znovu
+                if ted - self.zpomaleno >= self.interval:
+                    self.interval = min(self.max_interval,
+                                        max(self.interval * self.zpomaleni, self.min_interval, 0.5))
+                    self.zpomaleno = ted
+                pauza = self.interval
+                retry_after = response.headers.get('Retry-After') if response is not None else None
+                if retry_after and retry_after.strip().isdigit():
+                    pauza = max(pauza, min(float(retry_after), self.max_interval))
+                self.dalsi = max(self.dalsi, ted + pauza)
+            else:
+                self.interval = max(self.min_interval, self.interval * self.zrychleni)
+        return pretizeno
+
+
+def _parametry(hodnoty):
+    """Parametry dotazu nebo formulářová data jako seznam dvojic (None pro tělo, které není slovník)."""
+    if hodnoty is None:
+        return []
+    if isinstance(hodnoty, dict):
+        return [(str(k), str(v)) for k, v in hodnoty.items()]
+    if isinstance(hodnoty, (list, tuple)):
+        return [(str(k), str(v)) for k, v in hodnoty]
+    return None
+
+
+class HttpCache:
+    """Úložiště odpovědí v SQLite, sdílené vlákny jednoho procesu."""
+
+    def __init__(self, cesta=CACHE_DB, max_velikost=MAX_VELIKOST, offline=False, pravidla=PRAVIDLA):
+        self.cesta = cesta
+        self.slozka = os.path.splitext(cesta)[0] + '_data'
+        self.max_velikost = max_velikost
+        self.offline = offline
+        self.pravidla = [dict(pravidlo, regex=re.compile(pravidlo['vzor'])) for pravidlo in pravidla]
+        self.zamek = threading.RLock()
+        self.db = sqlite3.connect(cesta, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS odpovedi (
+                klic TEXT PRIMARY KEY,
+                url TEXT,
+                status INTEGER,
+                hlavicky TEXT,
+                telo BLOB,
+                soubor TEXT,
+                velikost INTEGER,
+                ulozeno REAL,
+                platnost REAL,
+                pouzito REAL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS odpovedi_pouzito ON odpovedi (pouzito)")
+
+    # --- pravidla a klíče ---
+
+    def pravidlo(self, url):
+        """Pravidlo pro URL, nebo None, pokud se URL necachuje."""
+        for pravidlo in self.pravidla:
+            if pravidlo['regex'].search(url):
+                return pravidlo if pravidlo['ttl'] != 0 else None
+        return None
+
+    def klic(self, method, url, params=None, data=None, pravidlo=None):
+        """SHA-256 z metody, URL bez parametrů, seřazených parametrů a těla dotazu."""
+        cast = urlsplit(url)
+        dvojice = parse_qsl(cast.query, keep_blank_values=True) + _parametry(params)
+        telo = _parametry(data)
+        if telo is None:
+            # Tělo jiné než formulář (bajty, text) jde do klíče celé
+            telo_klic = data if isinstance(data, bytes) else str(data).encode('utf-8')
+        else:
+            dvojice += telo
+            telo_klic = b''
+        if pravidlo and pravidlo.get('klic'):
+            dvojice = [(k, v) for k, v in dvojice if k in pravidlo['klic']]
+        else:
+            ignorovat = pravidlo.get('ignorovat', ('pD',)) if pravidlo else ('pD',)
+            dvojice = [(k, v) for k, v in dvojice if k not in ignorovat]
+        zaklad = urlunsplit((cast.scheme, cast.netloc, cast.path, urlencode(sorted(dvojice)), ''))
+        otisk = hashlib.sha256()
+        for cast_klice in (method.upper().encode(), zaklad.encode('utf-8'), telo_klic):
+            otisk.update(cast_klice + b'\0')
+        return otisk.hexdigest()
+
+    # --- čtení a zápis ---
+
+    def zaznam(self, klic, vcetne_proslych=False):
+        """Vrátí záznam (slovník) podle klíče, prošlý jen s `vcetne_proslych` nebo v offline režimu."""
+        with self.zamek:
+            radek = self.db.execute(
+                "SELECT url, status, hlavicky, telo, soubor, velikost, platnost FROM odpovedi WHERE klic = ?",
+                (klic,)).fetchone()
+            if radek is None:
+                return None
+            url, status, hlavicky, telo, soubor, velikost, platnost = radek
+            platny = platnost is None or platnost > time.time()
+            if not (platny or vcetne_proslych or self.offline):
+                return None
+            if soubor and not os.path.exists(soubor):
+                self.smaz(klic)
+                return None
+            self.db.execute("UPDATE odpovedi SET pouzito = ? WHERE klic = ?", (time.time(), klic))
+        return {'url': url, 'status': status, 'hlavicky': json.loads(hlavicky), 'telo': telo,
+                'soubor': soubor, 'velikost': velikost, 'platny': platny}
+
+    def zapis(self, klic, url, status, hlavicky, ttl, telo=None, soubor=None):
+        """Uloží odpověď (tělo v databázi, nebo cestu k souboru) a případně uvolní místo."""
+        ted = time.time()
+        velikost = len(telo) if telo is not None else os.path.getsize(soubor)
+        platnost = None if ttl is None else ted + ttl
+        with self.zamek:
+            stary = self.db.execute("SELECT soubor FROM odpovedi WHERE klic = ?", (klic,)).fetchone()
+            if stary and stary[0] and stary[0] != soubor and os.path.exists(stary[0]):
+                os.remove(stary[0])
+            self.db.execute("INSERT OR REPLACE INTO odpovedi VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (klic, url, status, json.dumps(hlavicky), telo, soubor, velikost, ted, platnost, ted))
+            self.uvolni_misto(krome=klic)
+
+    def soubor_pro(self, klic):
+        """Cesta k souboru s tělem odpovědi mimo databázi."""
+        os.makedirs(self.slozka, exist_ok=True)
+        return os.path.join(self.slozka, klic)
+
+    def zapis_soubor(self, klic, url, hlavicky, ttl, zdroj):
+        """Uloží kopii již staženého souboru (např. archivu staženého s navázáním) jako odpověď 200."""
+        soubor = self.soubor_pro(klic)
+        shutil.copyfile(zdroj, soubor + '.tmp')
+        os.replace(soubor + '.tmp', soubor)
+        self.zapis(klic, url, 200, hlavicky, ttl, soubor=soubor)
+
+    def prodluz(self, klic, ttl):
+        """Obnoví platnost záznamu po úspěšném ověření na serveru (304)."""
+        platnost = None if ttl is None else time.time() + ttl
+        with self.zamek:
+            self.db.execute("UPDATE odpovedi SET platnost = ?, pouzito = ? WHERE klic = ?",
+                            (platnost, time.time(), klic))
+
+    def smaz(self, klic):
+        with self.zamek:
+            radek = self.db.execute("SELECT soubor FROM odpovedi WHERE klic = ?", (klic,)).fetchone()
+            if radek and radek[0] and os.path.exists(radek[0]):
+                os.remove(radek[0])
+            self.db.execute("DELETE FROM odpovedi WHERE klic = ?", (klic,))
+
+    def uvolni_misto(self, krome=None):
+        """Maže nejdéle nepoužité záznamy (kromě právě uloženého), dokud velikost přesahuje `max_velikost`."""
+        with self.zamek:
+            celkem = self.db.execute("SELECT COALESCE(SUM(velikost), 0) FROM odpovedi").fetchone()[0]
+            if celkem <= self.max_velikost:
+                return
+            for klic, velikost in self.db.execute(
+                    "SELECT klic, velikost FROM odpovedi ORDER BY pouzito").fetchall():
+                if klic == krome:
+                    continue
+                self.smaz(klic)
+                celkem -= velikost
+                if celkem <= self.max_velikost:
+                    break
+
+    def vycisti(self):
+        """Smaže prošlé záznamy, vrátí jejich počet."""
+        with self.zamek:
+            klice = [radek[0] for radek in self.db.execute(
+                "SELECT klic FROM odpovedi WHERE platnost IS NOT NULL AND platnost <= ?", (time.time(),))]
+            for klic in klice:
+                self.smaz(klic)
+        return len(klice)
+
+    def info(self):
+        with self.zamek:
+            return self.db.execute("SELECT COUNT(*), COALESCE(SUM(velikost), 0) FROM odpovedi").fetchone()
+
+    # --- vlastní klíče ---
+
+    def uloz(self, klic, obsah, ttl=None):
+        """Uloží libovolný text nebo bajty pod vlastním klíčem (např. `casova_osa:<číslo přihlášky>`)."""
+        if isinstance(obsah, str):
+            obsah = obsah.encode('utf-8')
+        self.zapis('vlastni:' + klic, klic, 200, {}, ttl, telo=obsah)
+
+    def nacti(self, klic, jako_text=True):
+        """Vrátí obsah uložený přes `uloz`, nebo None."""
+        zaznam = self.zaznam('vlastni:' + klic)
+        if zaznam is None:
+            return None
+        return zaznam['telo'].decode('utf-8') if jako_text else zaznam['telo']
+
+    def zavri(self):
+        with self.zamek:
+            self.db.close()
+
+
+def _odpoved_z_cache(zaznam, url, status=None):
+    """Sestaví `requests.Response` ze záznamu cache (tělo z databáze, nebo souborový stream)."""
+    response = requests.Response()
+    response.status_code = status or zaznam['status']
+    response.url = url
+    response.headers = CaseInsensitiveDict(zaznam['hlavicky'])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.reason = 'Not Modified' if response.status_code == 304 else 'OK'
+    response.from_cache = True
+    if response.status_code == 304:
+        response._content = b''
+    elif zaznam['soubor']:
+        response.raw = open(zaznam['soubor'], 'rb')
+    else:
+        response._content = zaznam['telo']
+    return response
+
+
+class CachovanaSession(requests.Session):
+    """
+    `requests.Session` s perzistentní cache odpovědí podle `PRAVIDLA` (`cache=None`: bez cache).
+    Omezení rychlosti (`interval`) se uplatní jen na dotazy, které opravdu jdou na server.
+    S `adaptivni=True` se odstup řídí odpověďmi serveru (`AdaptivniOmezovac`) a dotaz, na který
+    server odpoví přetížením, se až `opakovani`krát zopakuje.
+    """
+
+    def __init__(self, cache=None, interval=0, adaptivni=False, opakovani=3):
+        super().__init__()
+        self.cache = cache
+        self.omezovac = None
+        if adaptivni:
+            self.omezovac = AdaptivniOmezovac(interval)
+        elif interval > 0:
+            self.omezovac = OmezovacRychlosti(interval)
+        self.pred_dotazem = self.omezovac.cekej if self.omezovac else None
+        self.opakovani = opakovani if adaptivni else 0
+
+    def _na_server(self, method, url, **kwargs):
+        for pokus in range(self.opakovani + 1):
+            if self.pred_dotazem:
+                self.pred_dotazem()
+            if not isinstance(self.omezovac, AdaptivniOmezovac):
+                return super().request(method, url, **kwargs)
+            try:
+                response = super().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.omezovac.po_dotazu(None)
+                if pokus == self.opakovani:
+                    raise
+                continue
+            if not self.omezovac.po_dotazu(response) or pokus == self.opakovani:
+                return response
+            response.close()
+
+    def request(self, method, url, params=None, data=None, headers=None, **kwargs):
+        if self.cache is None:
+            return self._na_server(method, url, params=params, data=data, headers=headers, **kwargs)
+        pravidlo = self.cache.pravidlo(url)
+        if pravidlo is None or (headers and 'Range' in headers):
+            if self.cache.offline:
+                raise OfflineChyba(f"Offline režim: dotaz {method} {url} nelze cachovat.")
+            return self._na_server(method, url, params=params, data=data, headers=headers, **kwargs)
+
+        klic = self.cache.klic(method, url, params, data, pravidlo)
+        zaznam = self.cache.zaznam(klic, vcetne_proslych=True)
+        headers = dict(headers or {})
+
+        if zaznam and (zaznam['platny'] or self.cache.offline):
+            # Podmíněný dotaz se shodným validátorem dostane 304 bez dotazu na server
+            if (headers.get('If-None-Match') and headers['If-None-Match'] == zaznam['hlavicky'].get('ETag')) or \
+                    (headers.get('If-Modified-Since')
+                     and headers['If-Modified-Since'] == zaznam['hlavicky'].get('Last-Modified')):
+                return _odpoved_z_cache(zaznam, url, 304)
+            return _odpoved_z_cache(zaznam, url)
+        if self.cache.offline:
+            raise OfflineChyba(f"Offline režim: odpověď na {method} {url} není v cache.")
+
+        # Prošlý záznam se ověří na serveru, pokud volající neposílá vlastní validátory
+        overeni = zaznam is not None and not ('If-None-Match' in headers or 'If-Modified-Since' in headers)
+        if overeni:
+            if zaznam['hlavicky'].get('ETag'):
+                headers['If-None-Match'] = zaznam['hlavicky']['ETag']
+            if zaznam['hlavicky'].get('Last-Modified'):
+                headers['If-Modified-Since'] = zaznam['hlavicky']['Last-Modified']
+
+        stream = kwargs.pop('stream', False)
+        response = self._na_server(method, url, params=params, data=data, headers=headers, stream=True, **kwargs)
+        if response.status_code == 304 and zaznam:
+            self.cache.prodluz(klic, pravidlo['ttl'])
+            response.close()
+            if overeni:
+                return _odpoved_z_cache(zaznam, url)
+            return response
+        if response.status_code != 200:
+            if not stream:
+                response.content
+            return response
+
+        hlavicky = {nazev: response.headers[nazev] for nazev in ULOZENE_HLAVICKY if nazev in response.headers}
+        if not stream:
+            obsah = response.content
+            if len(obsah) <= MAX_V_DATABAZI:
+                self.cache.zapis(klic, url, 200, hlavicky, pravidlo['ttl'], telo=obsah)
+            else:
+                soubor = self.cache.soubor_pro(klic)
+                with open(soubor, 'wb') as f:
+                    f.write(obsah)
+                self.cache.zapis(klic, url, 200, hlavicky, pravidlo['ttl'], soubor=soubor)
+            return response
+
+        # Streamovaná odpověď: po blocích do souboru v cache, pak se čte z disku
+        soubor = self.cache.soubor_pro(klic)
+        docasny = soubor + '.tmp'
+        with response, open(docasny, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+        os.replace(docasny, soubor)
+        self.cache.zapis(klic, url, 200, hlavicky, pravidlo['ttl'], soubor=soubor)
+        return _odpoved_z_cache(self.cache.zaznam(klic), response.url)
+
+
+def pridej_prepinace(parser):
+    """Přidá do argparse skriptu společné přepínače `--bez-cache`, `--offline` a `--cache`."""
+    parser.add_argument('--bez-cache', action='store_true', help="neukládat ani nečíst odpovědi z cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="nic nestahovat, použít jen odpovědi uložené v cache (i prošlé)")
+    parser.add_argument('--cache', default=CACHE_DB, help="soubor cache (výchozí upv_cache.sqlite)")
+
+
+def vytvor_session(args=None, interval=0, pool=None, adaptivni=False):
+    """
+    Vrátí `CachovanaSession` podle přepínačů z `pridej_prepinace` (s `--bez-cache` bez cache)
+    a s minimálním odstupem `interval` sekund mezi dotazy na server. `pool` nastaví počet stálých
+    spojení pro souběžná vlákna (`HTTPAdapter`), `adaptivni` zapne `AdaptivniOmezovac`.
+    """
+    if args is not None and args.bez_cache:
+        if args.offline:
+            raise ValueError("Přepínače --offline a --bez-cache nelze kombinovat.")
+        session = CachovanaSession(None, interval, adaptivni)
+    else:
+        cesta = args.cache if args is not None else CACHE_DB
+        offline = args.offline if args is not None else False
+        session = CachovanaSession(HttpCache(cesta, offline=offline), interval, adaptivni)
+    if pool:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Správa cache HTTP odpovědí scraperů ÚPV.")
+    parser.add_argument('--cesta', default=CACHE_DB, help="soubor cache (výchozí upv_cache.sqlite)")
+    parser.add_argument('--info', action='store_true', help="vypsat počet a velikost záznamů")
+    parser.add_argument('--vycistit', action='store_true', help="smazat prošlé záznamy")
+    parser.add_argument('--smazat', action='store_true', help="smazat celou cache")
+    args = parser.parse_args()
+
+    cache = HttpCache(args.cesta)
+    if args.smazat:
+        cache.max_velikost = 0
+        cache.uvolni_misto()
+        print("Cache byla smazána.")
+    if args.vycistit:
+        print(f"Smazáno prošlých záznamů: {cache.vycisti()}")
+    pocet, velikost = cache.info()
+    print(f"Záznamů v cache: {pocet}, velikost: {velikost / 1024 ** 2:.1f} MB")
+    cache.zavri()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Kódování a normalizace textu výstupů. Skripty dřív zapisovaly v různých kódováních (UTF-8, UTF-8 s BOM
+i výchozí kódování Windows), ve zdrojích v `Azure_zdroje` jsou proto tři druhy poškození:
+- `vysledek_stav.csv` je v cp1250 (výchozí kódování Windows), ne v UTF-8.
+- `vysledekstav.csv` je cp1250 přečtené jako UTF-8 a znovu uložené, každé písmeno s diakritikou je
+  nahrazené znakem `�` (`Platn� dokument`). Původní písmeno v souboru už není, soubor se proto
+  neopravuje (hodnoty z jiného snímku dat by změnily jeho obsah), do databáze jde `vysledekstav3.csv`.
+- `applicants_2.csv`, `Applicants_1.csv` a `vysledekstav3.csv` obsahují UTF-8 přečtené jako cp1250
+  (`LĂ©kaĹ™skĂˇ` místo `Lékařská`), někde jen v části hodnot.
+- Některé názvy přihlašovatelů a patentů mají písmena s rozloženou diakritikou (NFD).
+
+### Společný výstup:
+- `zapis_vystupu.py` zapisuje jen v UTF-8 (CSV s BOM jako dosud) a všechny texty normalizuje na NFC
+  (`nfc`), nové výstupy tak už opravu nepotřebují.
+
+### Oprava souborů (`oprav_csv`):
+- Soubor se čte po řádcích (bajty), každý řádek se dekóduje jako UTF-8, a když to nejde, jako cp1250.
+- Sekvence UTF-8 přečteného jako cp1250 se převedou zpět (`oprav_mojibake`), jen když dávají platné UTF-8.
+- Hodnota se znaky `�` se nahradí hodnotou ze slovníku stejného sloupce, která se s ní shoduje
+  (každý `�` je jedno písmeno), jen když je taková hodnota jediná. Slovník tvoří hodnoty sloupců typu
+  `kategorie` z `databaze.TABULKY` (`STAV`, `Popis`, ...) z referenčních souborů (`slovniky`, samy se
+  při čtení opraví) a z již přečtených nepoškozených řádků opravovaného souboru.
+- Všechny hodnoty se normalizují na NFC. Řádky beze změny se zapíšou přesně tak, jak byly.
+- Výstup se zapisuje průběžně do dočasného souboru, který nakonec nahradí původní. V paměti je jen
+  slovník a blok `VELIKOST_BLOKU` řádků, ne celá tabulka.
+
+### Spuštění:
+- `python kodovani.py ../Azure_zdroje/applicants_2.csv` opraví soubor na místě a vypíše počty opravených
+  hodnot, `--slovnik <soubory>` doplní hodnoty se znaky `�` z referenčních souborů, `--kontrola` jen vypíše
+  počty bez zápisu.
+"""
+
+import argparse
+import csv
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+
+# Kódování, ve kterém skripty zapisovaly pod Windows bez zadaného kódování
+KODOVANI_WINDOWS = 'cp1250'
+
+# Znak, kterým dekodér nahrazuje nečitelné bajty
+NAHRADNI_ZNAK = '�'
+
+# Počet řádků zapsaných najednou
+VELIKOST_BLOKU = 10000
+
+# Úvodní a pokračovací bajty znaků UTF-8 tak, jak vypadají v cp1250. Jen úvodní bajty písmen latinky
+# (U+0080 až U+017F, `Ă©` je `é`), interpunkce (U+2000 až U+20FF a `™`, `â€ž` je `„`) a rozložené
+# diakritiky po malém písmenu (čárka, kroužek a háček, `eĚŚ` je `ě`), jiné sekvence bývají skutečný text
+# (`ášť` je v UTF-8 platný znak U+169D, `ĚŠ` ve `SMĚŠNÝ`).
+# Bajty, které cp1250 nedefinuje (0x81, 0x83, ...), Windows převádí na řídicí znaky U+0081, ...
+_CP1250 = {bajt: bytes([bajt]).decode(KODOVANI_WINDOWS, errors='ignore') or chr(bajt) for bajt in range(0x80, 0x100)}
+_BAJTY = {znak: bajt for bajt, znak in _CP1250.items()}
+_POKRACOVANI = ''.join(_CP1250[bajt] for bajt in range(0x80, 0xC0))
+_MOJIBAKE = re.compile(
+    f"[{''.join(_CP1250[bajt] for bajt in range(0xC2, 0xC6))}][{_POKRACOVANI}]"
+    f"|{_CP1250[0xE2]}[{_CP1250[0x80]}{_CP1250[0x82]}{_CP1250[0x84]}][{_POKRACOVANI}]"
+    f"|(?<=[a-z]){_CP1250[0xCC]}[{_CP1250[0x81]}{_CP1250[0x8A]}{_CP1250[0x8C]}]")
+
+
+def nfc(text):
+    """Text v normalizované podobě NFC (složená diakritika)."""
+    if text.isascii() or unicodedata.is_normalized('NFC', text):
+        return text
+    return unicodedata.normalize('NFC', text)
+
+
+# Kolikrát nejvýš opakovat převod, text přečtený špatně víckrát je poškozený ve více vrstvách
+VRSTVY_MOJIBAKE = 3
+
+
+def _zpet_na_utf8(nalez):
+    sekvence = nalez.group()
+    try:
+        return bytes(_BAJTY[znak] for znak in sekvence).decode('utf-8')
+    except UnicodeError:
+        return sekvence
+
+
+def oprav_mojibake(text):
+    """
+    Převede úseky UTF-8 přečteného jako cp1250 (`Ĺ™` na `ř`, i opakovaně přečtené `ÄŹÂ»Ĺ˝`),
+    ostatní text nechá beze změny.
+    """
+    for _ in range(VRSTVY_MOJIBAKE):
+        if text.isascii():
+            break
+        opraveny = _MOJIBAKE.sub(_zpet_na_utf8, text)
+        if opraveny == text:
+            break
+        text = opraveny
+    return text
+
+
+def oprav_text(text):
+    """Oprava mojibake a normalizace NFC."""
+    return nfc(oprav_mojibake(text))
+
+
+def kategorie_sloupce():
+    """Názvy sloupců typu `kategorie` z `databaze.TABULKY` (malými písmeny)."""
+    from databaze import TABULKY
+
+    return {sloupec.lower() for schema in TABULKY.values()
+            for sloupec, typ in schema['sloupce'].items() if typ == 'kategorie'}
+
+
+class Slovnik:
+    """Známé hodnoty sloupců, podle kterých se doplní hodnoty se znaky `�`."""
+
+    def __init__(self, sloupce=None):
+        self.sloupce = kategorie_sloupce() if sloupce is None else sloupce
+        # {sloupec: {hodnota: pořadí slovníku}}, hodnoty z opravovaného souboru mají pořadí za slovníky
+        self.hodnoty = {}
+        self.nactene = 0
+        # Výsledek hledání pro poškozenou hodnotu, stejné hodnoty se opakují
+        self.nalezene = {}
+
+    def sleduje(self, sloupec):
+        return sloupec.strip().lower() in self.sloupce
+
+    def pridej(self, sloupec, hodnota, poradi=None):
+        """Přidá známou hodnotu, hodnota s nižším `poradi` (dřív načtený slovník) má přednost."""
+        if hodnota and NAHRADNI_ZNAK not in hodnota:
+            znama = self.hodnoty.setdefault(sloupec.strip().lower(), {})
+            if hodnota not in znama:
+                znama[hodnota] = self.nactene if poradi is None else poradi
+                self.nalezene.clear()
+
+    def doplnit(self, sloupec, hodnota):
+        """
+        Známá hodnota sloupce, která odpovídá poškozené hodnotě, jinak None. Každý `�` je jedno až tři
+        písmena (dekodér nahrazuje celou neplatnou sekvenci bajtů, `á` a `š` za sebou jsou jeden `�`).
+        Ze shod se bere ta z prvního slovníku, jen když je v něm jediná.
+        """
+        klic = (sloupec.strip().lower(), hodnota)
+        if klic not in self.nalezene:
+            vzor = re.compile('.{1,3}'.join(re.escape(cast) for cast in hodnota.split(NAHRADNI_ZNAK)))
+            shody = [(poradi, znama) for znama, poradi in self.hodnoty.get(klic[0], {}).items()
+                     if vzor.fullmatch(znama)]
+            prvni = [znama for poradi, znama in shody if poradi == min(shody)[0]] if shody else []
+            self.nalezene[klic] = prvni[0] if len(prvni) == 1 else None
+        return self.nalezene[klic]
+
+    def nacti(self, cesta):
+        """Doplní slovník hodnotami ze souboru CSV (opravenými), čte se po řádcích."""
+        self.nactene += 1
+        radky = _Radky(cesta)
+        with radky:
+            ctecka = csv.reader(radky)
+            hlavicka = [oprav_text(sloupec) for sloupec in next(ctecka, [])]
+            sledovane = [(index, sloupec) for index, sloupec in enumerate(hlavicka) if self.sleduje(sloupec)]
+            for row in ctecka:
+                for index, sloupec in sledovane:
+                    if index < len(row):
+                        self.pridej(sloupec, oprav_text(row[index]))
+
+
+class _Radky:
+    """
+    Dekódované řádky souboru pro `csv.reader`, bez BOM. `surove` jsou řádky přečtené od posledního
+    `vyprazdni()`, tedy řádky jednoho záznamu CSV (hodnota v uvozovkách může mít víc řádků).
+    """
+
+    def __init__(self, cesta):
+        self.soubor = open(cesta, 'rb')
+        self.bom = self.soubor.read(3) == b'\xef\xbb\xbf'
+        if not self.bom:
+            self.soubor.seek(0)
+        self.surove = []
+        self.cp1250 = 0
+
+    def __iter__(self):
+        for data in self.soubor:
+            try:
+                radek = data.decode('utf-8')
+            except UnicodeDecodeError:
+                radek = data.decode(KODOVANI_WINDOWS, errors='replace')
+                self.cp1250 += 1
+            self.surove.append(radek)
+            yield radek
+
+    def vyprazdni(self):
+        surove, self.surove = ''.join(self.surove), []
+        return surove
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.soubor.close()
+
+
+def _konec_radku(text):
+    return '\r\n' if text.endswith('\r\n') else '\n'
+
+
+def oprav_csv(cesta, slovniky=(), vystup=None, zapsat=True, velikost_bloku=VELIKOST_BLOKU):
+    """
+    Opraví kódování souboru CSV v jednom průchodu a zapíše ho jako UTF-8 (s BOM, pokud ho soubor měl).
+    `vystup` je cesta výsledku (výchozí přepíše `cesta`), se `zapsat=False` se jen počítá.
+    Vrátí Counter s počty řádků a opravených hodnot.
+    """
+    pocty = Counter()
+    slovnik = Slovnik()
+    for reference in slovniky:
+        slovnik.nacti(reference)
+    vystup = vystup or cesta
+    docasny = vystup + '.tmp'
+
+    radky = _Radky(cesta)
+    with radky, open(docasny if zapsat else os.devnull, 'w', newline='',
+                     encoding='utf-8-sig' if radky.bom else 'utf-8') as soubor:
+        ctecka = csv.reader(radky)
+        blok = []
+        hlavicka = None
+        for row in ctecka:
+            surovy = radky.vyprazdni()
+            opraveny = []
+            for index, hodnota in enumerate(row):
+                sloupec = hlavicka[index] if hlavicka and index < len(hlavicka) else ''
+                nova = nfc(hodnota)
+                if nova != hodnota:
+                    pocty['NFC'] += 1
+                mojibake = oprav_mojibake(nova)
+                if mojibake != nova:
+                    pocty['mojibake'] += 1
+                    nova = nfc(mojibake)
+                if NAHRADNI_ZNAK in nova and slovnik.sleduje(sloupec):
+                    doplnena = slovnik.doplnit(sloupec, nova)
+                    pocty['doplněno ze slovníku' if doplnena else 'nedoplněno'] += 1
+                    nova = doplnena or nova
+                elif NAHRADNI_ZNAK in nova:
+                    pocty['nedoplněno'] += 1
+                elif hlavicka and slovnik.sleduje(sloupec):
+                    slovnik.pridej(sloupec, nova, slovnik.nactene + 1)
+                opraveny.append(nova)
+            if hlavicka is None:
+                hlavicka = opraveny
+            pocty['řádky'] += 1
+            if opraveny == row:
+                blok.append(surovy)
+            else:
+                pocty['opravené řádky'] += 1
+                blok.append(_csv_radek(opraveny, _konec_radku(surovy)))
+            if len(blok) >= velikost_bloku:
+                soubor.write(''.join(blok))
+                blok = []
+        soubor.write(''.join(blok))
+    pocty['řádky v cp1250'] = radky.cp1250
+
+    if zapsat:
+        os.replace(docasny, vystup)
+    return pocty
+
+
+class _Radek:
+    """Cíl pro `csv.writer`, který si zapsaný řádek jen zapamatuje."""
+
+    def write(self, text):
+        self.text = text
+
+
+def _csv_radek(hodnoty, konec_radku):
+    radek = _Radek()
+    csv.writer(radek, lineterminator=konec_radku).writerow(hodnoty)
+    return radek.text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oprava kódování souborů CSV (UTF-8, NFC) v jednom průchodu.")
+    parser.add_argument('soubory', nargs='+', help="soubory CSV k opravě (přepíšou se)")
+    parser.add_argument('--slovnik', nargs='*', default=[],
+                        help="referenční CSV se správnými hodnotami sloupců (např. vysledekstav3.csv)")
+    parser.add_argument('--kontrola', action='store_true', help="jen vypsat počty, nic nezapisovat")
+    args = parser.parse_args()
+
+    for cesta in args.soubory:
+        zacatek = time.perf_counter()
+        pocty = oprav_csv(cesta, args.slovnik, zapsat=not args.kontrola)
+        print(f"{cesta}: {time.perf_counter() - zacatek:.2f} s")
+        for popis, pocet in pocty.items():
+            print(f"  {popis}: {pocet}")
+
+
+if __name__ == "__main__":
+    main()
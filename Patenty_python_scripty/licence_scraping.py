@@ -10,7 +10,8 @@ Funkce skriptu krok za krokem:
 2. Funkce `fetch_data(start)`:
    - Generuje URL s daným parametrem `start`.
    - Odesílá HTTP GET požadavek na server a ověřuje úspěšnost (status 200).
-   - Pomocí knihovny BeautifulSoup parsuje HTML stránky a extrahuje řádky tabulky s třídou `trdata`.
+   - Parsuje HTML stránky (modul `html_parsovani`, rychlý parser s BeautifulSoup jako zálohou) a extrahuje
+     řádky tabulky s třídou `trdata`.
    - Z každého řádku tabulky extrahuje jednotlivé sloupce:
      - Kód patentu (`Patent Code`)
      - Číslo patentu (`Patent Number`)
@@ -19,106 +20,209 @@ Funkce skriptu krok za krokem:
      - Patentové třídy (`Classes`)
      - Název patentu (`Title`)
      - Organizaci (`Organization`).
-   - Výsledná data jsou uložena do seznamu.
+   - Vrací seznam řádků a celkový počet záznamů dotazu z textu stránky (`html_parsovani.pocet_zaznamu`),
+     nebo None, pokud se počet na stránce nenajde.
 
-3. Funkce `save_to_csv(data, filename)`:
+3. Funkce `save_to_csv(data, filename, format)`:
    - Přijímá seznam dat a ukládá je do CSV souboru ve formátu UTF-8.
    - Do prvního řádku zapisuje hlavičky sloupců.
+   - S `format` `parquet` nebo `arrow` (konstanta `output_format`) uloží data do typovaného
+     sloupcového souboru přes modul `zapis_vystupu` (status jako kategorie).
 
 4. Funkce `main()`:
-   - Definuje celkový počet záznamů (`total_records`) a počet záznamů na stránku (`records_per_page`).
-   - Iteruje přes stránky dat (v krocích po `records_per_page`) a volá funkci `fetch_data` pro stažení dat z každé stránky.
-   - Mezi požadavky vkládá pauzu (`time.sleep(10)`), aby se server nepřetěžoval.
-   - Stahování je přerušeno, pokud dojde k chybě při stahování konkrétní stránky.
-   - Po stažení všech dat je volána funkce `save_to_csv`, která uloží data do souboru `malicenci.csv`.
+   - Stáhne první stránku, z ní zjistí celkový počet záznamů (`total_records`) a počet záznamů na stránce
+     (`records_per_page`).
+   - Zbývající stránky stahuje souběžně v `--workers` vláknech (výchozí 4, nejvýš dvojnásobek stránek
+     rozpracovaných najednou, `stahni_stranky`) a řádky zapisuje do `malicenci.csv` průběžně ve stejném
+     pořadí jako stránky, v paměti tak nejsou všechna data najednou.
+   - Místo pevné pauzy hlídá odstup mezi dotazy adaptivní omezovač (`http_cache.AdaptivniOmezovac`):
+     začíná na `--interval` (výchozí 1 s), při odpovědi 429 / 503 nebo chybě spojení odstup prodlouží
+     a stránku zopakuje, po úspěšných dotazech se vrací zpět.
+   - Stránky, které se nepodařilo stáhnout, vypíše na konci. Pokud se počet záznamů nenajde, stahuje
+     stránky postupně do první prázdné.
+   - Počet záznamů z textu stránky se ověřuje: poslední stránka rozsahu musí být neúplná, jinak se
+     pokračuje postupně do první prázdné stránky. Prázdné stránky uvnitř rozsahu a počet menší než první
+     stránka znamenají, že počet nesouhlasí (vypíše se, prázdné stránky se nehlásí jako chybějící).
 
 5. Spuštění skriptu:
    - Skript se spouští funkcí `main()` a uloží výsledky do souboru `malicenci.csv`.
 
+Cache:
+- Stránky se stahují přes společnou cache (`http_cache.py`, stránka výsledků platí den), opakovaný běh
+  nebo úprava parseru tak stránky znovu nestahuje a pauza se u stránek z cache vynechá.
+- Přepínače `--bez-cache`, `--offline` (jen stránky z cache) a `--cache <soubor>`.
+
 Poznámky:
 - Skript obsahuje jednoduché ošetření chyb při stahování dat (např. HTTP status code).
-- Pauzy mezi požadavky jsou nastaveny na 10 sekund, aby nedocházelo k přetěžování serveru.
-- Stránkování je implementováno pomocí iterace od 0 do přibližného počtu záznamů (`total_records`).
+- Odstup mezi požadavky se přizpůsobuje serveru, aby nedocházelo k jeho přetěžování.
+- Stránkování je implementováno pomocí iterace od 0 do počtu záznamů zjištěného z první stránky (`total_records`),
+  ověřeného podle poslední stránky (`stahuj_postupne`).
 
 Výstup:
 - Výsledný soubor `malicenci.csv` obsahuje extrahovaná data z patentových stránek.
 """
 
 
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
 import requests
-from bs4 import BeautifulSoup
-import csv
-import time
+
+import html_parsovani
+from http_cache import pridej_prepinace, vytvor_session
+from zapis_vystupu import cesta_pro_format, otevri_zapis
 
 # Základní URL stránky bez parametru pRadStart
 base_url = "https://isdv.upv.gov.cz/webapp/resdb.print_vysledek.Vysledek?pIdDotaz=RES0000000032737595ctFSDVuH&pLang=CS&pRadStart=00"
 
-# Funkce pro stažení dat ze stránky
-def fetch_data(start):
+# Formát výstupu (csv, parquet, arrow nebo sqlite = tabulka v `patenty.sqlite`)
+output_format = 'csv'
+
+# Sloupce výstupu a jejich typy pro sloupcové formáty
+HLAVICKA = ['Patent Code', 'Patent Number', 'Patent ID', 'Status', 'Classes', 'Title', 'Organization']
+TYPY = {'Patent Code': 'kategorie', 'Status': 'kategorie'}
+
+# Časový limit spojení a odpovědi (sekundy)
+TIMEOUT = (10, 60)
+
+# Funkce pro stažení dat ze stránky, vrací (řádky, celkový počet záznamů nebo None)
+def fetch_data(start, session=requests):
     # Vytvoříme URL, která obsahuje správnou hodnotu start (00, 20, 40, ..., 100, 120, ...)
     url = f"{base_url}{start}"
     print(f"Stahuji data z URL: {url}")  # Pro kontrolu tiskneme URL
 
-    response = requests.get(url)
+    response = session.get(url, timeout=TIMEOUT)
     
     # Ověření, že request byl úspěšný
     if response.status_code != 200:
         print(f"Chyba při stahování stránky: {response.status_code}")
         return None
 
-    # Parsování HTML
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Najdeme všechny řádky s třídou "trdata"
-    rows = soup.find_all('tr', class_='trdata')
+    # Najdeme všechny řádky s třídou "trdata" a texty jejich sloupců (td)
+    rows = html_parsovani.radky_trdata(response.content)
 
     data = []
-    for row in rows:
-        # Extrahujeme jednotlivé sloupce (td) z řádku
-        cols = row.find_all('td')
-        
+    for cols, _ in rows:
         # Každý sloupec obsahuje specifická data
-        patent_code = cols[1].get_text(strip=True)
-        patent_number = cols[2].get_text(strip=True)
-        patent_id = cols[3].get_text(strip=True)
-        patent_status = cols[4].get_text(strip=True)
-        patent_classes = cols[5].get_text(strip=True)
-        patent_title = cols[6].get_text(strip=True)
-        organization = cols[7].get_text(strip=True)
+        patent_code = cols[1]
+        patent_number = cols[2]
+        patent_id = cols[3]
+        patent_status = cols[4]
+        patent_classes = cols[5]
+        patent_title = cols[6]
+        organization = cols[7]
 
         # Uložíme řádek jako seznam
         data.append([patent_code, patent_number, patent_id, patent_status, patent_classes, patent_title, organization])
 
-    return data
+    return data, html_parsovani.pocet_zaznamu(response.content)
+
+# Otevření výstupu (CSV nebo sloupcový formát), řádky se zapisují průběžně
+def otevri_vystup(filename, format='csv'):
+    return otevri_zapis(filename, HLAVICKA, format, TYPY, encoding='utf-8')
 
-# Uložení dat do CSV souboru
-def save_to_csv(data, filename):
-    with open(filename, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        # Předpokládáme názvy sloupců podle dat, která extrahujeme
-        writer.writerow(['Patent Code', 'Patent Number', 'Patent ID', 'Status', 'Classes', 'Title', 'Organization'])
+# Uložení dat do CSV souboru (nebo do sloupcového formátu)
+def save_to_csv(data, filename, format='csv'):
+    with otevri_vystup(filename, format) as writer:
         writer.writerows(data)
 
+# Stažení jedné stránky ve vlákně, chyba spojení se vrátí jako None
+def stahni_stranku(start, session):
+    try:
+        return fetch_data(str(start), session)
+    except requests.RequestException as e:
+        print(f"Chyba spojení u stránky od záznamu {start}: {e}")
+        return None
+
+# Stránky od záznamu `starty`, nejvýš `workers * 2` stránek rozpracovaných, výsledky v pořadí
+def stahni_stranky(starty, session, workers):
+    starty = iter(starty)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fronta = deque((start, executor.submit(stahni_stranku, start, session))
+                       for start in islice(starty, workers * 2))
+        while fronta:
+            start, future = fronta.popleft()
+            vysledek = future.result()
+            for dalsi in islice(starty, 1):
+                fronta.append((dalsi, executor.submit(stahni_stranku, dalsi, session)))
+            yield start, vysledek
+
+# Postupné stahování stránek od záznamu `start` do první prázdné, vrací počet zapsaných záznamů
+def stahuj_postupne(start, records_per_page, session, writer):
+    pocet = 0
+    while True:
+        vysledek = stahni_stranku(start, session)
+        if not vysledek or not vysledek[0]:
+            return pocet
+        writer.writerows(vysledek[0])
+        pocet += len(vysledek[0])
+        start += records_per_page
+
 # Hlavní logika pro stránkování a stahování dat
 def main():
-    all_data = []
-    total_records = 700  # Přibližný celkový počet záznamů
-    records_per_page = 500  # Kolik záznamů je na jedné stránce
-
-    for start in range(0, total_records, records_per_page):
-        formatted_start = str(start)  # Upravíme start na prosté číslo
-        print(f"Stahuji data od záznamu {formatted_start}...")
-        data = fetch_data(formatted_start)
-        if data:
-            all_data.extend(data)
+    parser = argparse.ArgumentParser(description="Stažení seznamu licencí z ISDV.")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="počet souběžně stahovaných stránek (výchozí 4)")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="nejkratší odstup mezi dotazy v sekundách, při přetížení serveru se prodlužuje (výchozí 1)")
+    pridej_prepinace(parser)
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    # Odstup se dodržuje jen mezi dotazy, které opravdu jdou na server, a přizpůsobuje se odpovědím
+    session = vytvor_session(args, interval=args.interval, pool=workers, adaptivni=True)
+
+    output_file = cesta_pro_format('malicenci.csv', output_format)
+    chybejici = []
+    with otevri_vystup(output_file, output_format) as writer:
+        # První stránka určí celkový počet záznamů a počet záznamů na stránce
+        print("Stahuji data od záznamu 0...")
+        prvni = stahni_stranku(0, session)
+        if not prvni or not prvni[0]:
+            print("Nepodařilo se stáhnout první stránku. Končím.")
+            return
+        data, total_records = prvni
+        records_per_page = len(data)
+        writer.writerows(data)
+        pocet = len(data)
+
+        if total_records is not None and total_records < records_per_page:
+            print(f"Počet záznamů ze stránky ({total_records}) je menší než první stránka, nepoužije se.")
+            total_records = None
+
+        if total_records is not None:
+            print(f"Celkem záznamů: {total_records}, na stránce: {records_per_page}")
+            prazdne = []
+            posledni = records_per_page
+            for start, vysledek in stahni_stranky(range(records_per_page, total_records, records_per_page),
+                                                  session, workers):
+                if vysledek is None:
+                    chybejici.append(start)
+                elif not vysledek[0]:
+                    prazdne.append(start)
+                else:
+                    writer.writerows(vysledek[0])
+                    pocet += len(vysledek[0])
+                posledni = len(vysledek[0]) if vysledek else 0
+            if prazdne:
+                print(f"Počet záznamů nesouhlasí, prázdné stránky od záznamů: {', '.join(map(str, prazdne))}")
+            # Plná poslední stránka: počet mohl být menší než skutečnost, pokračuje se do první prázdné
+            if posledni == records_per_page:
+                dalsi = max(total_records, records_per_page)
+                dalsi += -dalsi % records_per_page
+                navic = stahuj_postupne(dalsi, records_per_page, session, writer)
+                if navic:
+                    print(f"Počet záznamů nesouhlasí, za posledním záznamem staženo dalších {navic}.")
+                pocet += navic
         else:
-            print(f"Nepodařilo se stáhnout data pro start {formatted_start}. Končím.")
-            break  # Pokud se nepodaří stáhnout data, přestaneme procházet další stránky
-        time.sleep(10)  # Pauza mezi requesty, aby se server nepřetěžoval
+            # Počet záznamů na stránce nebyl nalezen, stránky se stahují postupně do první prázdné
+            print("Celkový počet záznamů nebyl na stránce nalezen, stahuji postupně.")
+            pocet += stahuj_postupne(records_per_page, records_per_page, session, writer)
 
-    # Uložení dat do CSV souboru
-    save_to_csv(all_data, 'malicenci.csv')
-    print("Data byla uložena do 'malicenci.csv'.")
+    if chybejici:
+        print(f"Nepodařilo se stáhnout stránky od záznamů: {', '.join(map(str, chybejici))}")
+    print(f"Data byla uložena do '{output_file}' ({pocet} záznamů).")
 
 if __name__ == "__main__":
     main()
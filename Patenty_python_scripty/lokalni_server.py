@@ -0,0 +1,243 @@
+"""
+Lokální náhrada serveru ÚPV s týdenními archivy ST96 pro ověření `stahovani_dat_web.py` bez přístupu
+na internet. Server (`http.server`) vrací stránku s odkazy na ZIP archivy ve složce a archivy samotné
+se stejným chováním, na které stahování spoléhá:
+- `ETag` a `Last-Modified` podle nastavení archivu (`validatory`), odpověď 304 na `If-None-Match`
+  nebo `If-Modified-Since`,
+- `Range` s `If-Range`: 206 se zbytkem souboru, 416 pro rozsah za koncem souboru, 200 s celým souborem,
+  když `If-Range` neodpovídá aktuální verzi.
+Všechny dotazy na archivy se zapisují do `server.dotazy` (cesta, hlavičky dotazu, stav odpovědi).
+
+### Kontrola (`python lokalni_server.py`):
+V dočasné složce spustí server a `stahovani_dat_web.main()` proti němu (`--base-url`, `--slozka`) a ověří:
+- první stažení (200), opakované spuštění s 304 podle ETag i Last-Modified a přeskočení archivu
+  bez validátorů podle katalogu (žádný dotaz),
+- navázání přerušeného stahování (206) a nové stažení po 416, i s cache archivů,
+- režim `extrahovat`: opakované spuštění připíše jen nové archivy a ponechá řádky starých, změněný
+  archiv nahradí své řádky, chybějící výstup znovu zpracuje všechny archivy z katalogu.
+Při chybě skončí výjimkou `AssertionError`.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import zipfile
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimální dokument ST96 pro extraktor (tabulka `patent_data` nepotřebuje seznam čísel z Excelu)
+XML_DOKUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<pat:PatentPublication xmlns:pat="http://www.wipo.int/standards/XMLSchema/ST96/Patent" \
+xmlns:com="http://www.wipo.int/standards/XMLSchema/ST96/Common">
+<pat:BibliographicData>
+<pat:PatentPublicationIdentification><com:IPOfficeCode>CZ</com:IPOfficeCode>\
+<pat:PublicationNumber>{cislo}</pat:PublicationNumber><com:PatentDocumentKindCode>U1</com:PatentDocumentKindCode>\
+<pat:PublicationDate>2020-01-01</pat:PublicationDate></pat:PatentPublicationIdentification>
+<pat:ApplicationIdentification><com:IPOfficeCode>CZ</com:IPOfficeCode><com:ApplicationNumber>\
+<com:ApplicationNumberText>2019-{cislo}</com:ApplicationNumberText></com:ApplicationNumber>\
+<pat:FilingDate>2019-06-01</pat:FilingDate></pat:ApplicationIdentification>
+<pat:InventionTitle>{nazev}</pat:InventionTitle>
+</pat:BibliographicData></pat:PatentPublication>
+"""
+
+
+class ArchivyHandler(BaseHTTPRequestHandler):
+    """Stránka se seznamem archivů a archivy z `server.slozka` s validátory podle `server.validatory`."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _odpoved(self, stav, hlavicky=(), telo=b''):
+        self.send_response(stav)
+        for nazev, hodnota in hlavicky:
+            self.send_header(nazev, hodnota)
+        self.send_header('Content-Length', str(len(telo)))
+        self.end_headers()
+        self.wfile.write(telo)
+        return stav
+
+    def do_GET(self):
+        nazev = self.path.lstrip('/').split('?')[0]
+        if not nazev.endswith('.zip'):
+            odkazy = ''.join(f'<a href="{soubor}">{soubor}</a>\n'
+                             for soubor in sorted(os.listdir(self.server.slozka)) if soubor.endswith('.zip'))
+            self._odpoved(200, [('Content-Type', 'text/html; charset=utf-8')],
+                          f"<html><body>\n{odkazy}</body></html>".encode('utf-8'))
+            return
+        cesta = os.path.join(self.server.slozka, nazev)
+        if not os.path.exists(cesta):
+            self._odpoved(404)
+            return
+        self.server.dotazy.append((nazev, dict(self.headers), self._archiv(nazev, cesta)))
+
+    def _archiv(self, nazev, cesta):
+        with open(cesta, 'rb') as f:
+            data = f.read()
+        validatory = self.server.validatory.get(nazev, ('etag', 'last_modified'))
+        etag = f'"{hashlib.sha1(data).hexdigest()[:16]}"' if 'etag' in validatory else None
+        zmena = int(os.path.getmtime(cesta))
+        last_modified = formatdate(zmena, usegmt=True) if 'last_modified' in validatory else None
+        hlavicky = [(nazev, hodnota) for nazev, hodnota in (('ETag', etag), ('Last-Modified', last_modified))
+                    if hodnota]
+
+        if etag and self.headers.get('If-None-Match') == etag:
+            return self._odpoved(304, hlavicky)
+        if (last_modified and not self.headers.get('If-None-Match') and self.headers.get('If-Modified-Since')
+                and parsedate_to_datetime(self.headers['If-Modified-Since']).timestamp() >= zmena):
+            return self._odpoved(304, hlavicky)
+
+        rozsah = self.headers.get('Range')
+        if rozsah and self.headers.get('If-Range') in (None, etag, last_modified):
+            zacatek = int(rozsah.split('=')[1].split('-')[0])
+            if zacatek >= len(data):
+                return self._odpoved(416, [('Content-Range', f"bytes */{len(data)}")])
+            return self._odpoved(206, hlavicky + [('Content-Range', f"bytes {zacatek}-{len(data) - 1}/{len(data)}")],
+                                 data[zacatek:])
+        return self._odpoved(200, hlavicky + [('Content-Type', 'application/zip')], data)
+
+
+def spust_server(slozka, validatory=None):
+    """
+    Spustí server ve vlákně na volném portu a vrátí (server, URL stránky se seznamem archivů).
+    `validatory`: {název archivu: ('etag', 'last_modified')}, archiv mimo slovník má oba.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ArchivyHandler)
+    server.slozka = slozka
+    server.validatory = validatory or {}
+    server.dotazy = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/seznam"
+
+
+def vytvor_archiv(cesta, dokumenty):
+    """Vytvoří ZIP archiv s dokumenty ST96 {název XML souboru: (číslo zveřejnění, název vynálezu)}."""
+    with zipfile.ZipFile(cesta, 'w') as zip_ref:
+        for file_name, (cislo, nazev) in dokumenty.items():
+            zip_ref.writestr(f"data/{file_name}", XML_DOKUMENT.format(cislo=cislo, nazev=nazev))
+
+
+def _stav_dotazu(server, archiv):
+    return [(hlavicky, stav) for nazev, hlavicky, stav in server.dotazy if nazev == archiv]
+
+
+def _spust_stahovani(base_url, slozka, *prepinace):
+    import stahovani_dat_web
+
+    sys.argv = ['stahovani_dat_web.py', '--base-url', base_url, '--slozka', slozka, '--workers', '2', *prepinace]
+    stahovani_dat_web.main()
+    with open(os.path.join(slozka, 'katalog.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _radky(cesta):
+    with open(cesta, newline='', encoding='utf-8-sig') as f:
+        return [(row['File_Name'], row['Invention_Title']) for row in csv.DictReader(f)]
+
+
+def over_stahovani(slozka):
+    """Stažení, 304, přeskočení podle katalogu, navázání (206) a 416 proti lokálnímu serveru."""
+    web, vystup = os.path.join(slozka, 'web'), os.path.join(slozka, 'stazene')
+    os.makedirs(web)
+    vytvor_archiv(os.path.join(web, 'a.zip'), {'a1.xml': (1, 'A1'), 'a2.xml': (2, 'A2' * 5000)})
+    vytvor_archiv(os.path.join(web, 'b.zip'), {'b1.xml': (3, 'B1')})
+    vytvor_archiv(os.path.join(web, 'c.zip'), {'c1.xml': (4, 'C1')})
+    server, base_url = spust_server(web, {'b.zip': (), 'c.zip': ('last_modified',)})
+    try:
+        katalog = _spust_stahovani(base_url, vystup, '--bez-cache')
+        assert [stav for _, _, stav in server.dotazy] == [200, 200, 200], server.dotazy
+        assert sorted(os.listdir(os.path.join(vystup, 'XML'))) == ['a1.xml', 'a2.xml', 'b1.xml', 'c1.xml']
+        assert len(katalog) == 3
+        print("OK: první stažení (200)")
+
+        server.dotazy.clear()
+        _spust_stahovani(base_url, vystup, '--bez-cache')
+        (hlavicky_a, stav_a), = _stav_dotazu(server, 'a.zip')
+        (hlavicky_c, stav_c), = _stav_dotazu(server, 'c.zip')
+        assert stav_a == 304 and 'If-None-Match' in hlavicky_a, hlavicky_a
+        assert stav_c == 304 and 'If-Modified-Since' in hlavicky_c, hlavicky_c
+        assert not _stav_dotazu(server, 'b.zip')
+        print("OK: opakované spuštění (304 podle ETag i Last-Modified, archiv bez validátorů přeskočen)")
+
+        # Přerušené stahování: polovina archivu v .part s metadaty ze serveru
+        url_a = base_url.rsplit('/', 1)[0] + '/a.zip'
+        with open(os.path.join(web, 'a.zip'), 'rb') as f:
+            data_a = f.read()
+        meta = {'etag': katalog[url_a]['etag'], 'last_modified': katalog[url_a]['last_modified']}
+        for cast, prepinace in ((data_a[:len(data_a) // 2], ('--bez-cache',)),
+                                (data_a + b'konec', ('--cache', os.path.join(slozka, 'cache.sqlite')))):
+            katalog = _spust_stahovani(base_url, vystup, *prepinace)
+            del katalog[url_a]
+            with open(os.path.join(vystup, 'katalog.json'), 'w', encoding='utf-8') as f:
+                json.dump(katalog, f)
+            with open(os.path.join(vystup, 'a.zip.part'), 'wb') as f:
+                f.write(cast)
+            with open(os.path.join(vystup, 'a.zip.part.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.remove(os.path.join(vystup, 'XML', 'a2.xml'))
+            server.dotazy.clear()
+            _spust_stahovani(base_url, vystup, *prepinace)
+            stavy = [stav for _, stav in _stav_dotazu(server, 'a.zip')]
+            with open(os.path.join(vystup, 'XML', 'a2.xml'), 'rb') as f, zipfile.ZipFile(io.BytesIO(data_a)) as zip_ref:
+                assert f.read() == zip_ref.read('data/a2.xml')
+            if len(cast) < len(data_a):
+                assert stavy == [206], stavy
+                print("OK: navázání přerušeného stahování (206)")
+            else:
+                from http_cache import HttpCache
+
+                assert stavy == [416, 200], stavy
+                cache = HttpCache(os.path.join(slozka, 'cache.sqlite'))
+                assert cache.zaznam(cache.klic('GET', url_a, pravidlo=cache.pravidlo(url_a))), "archiv není v cache"
+                cache.zavri()
+                print("OK: 416 a nové stažení celého archivu (uložen do cache)")
+    finally:
+        server.shutdown()
+
+
+def over_extrakci(slozka):
+    """Režim extrahovat: opakované spuštění nesmí přijít o řádky archivů zpracovaných dřív."""
+    import MPT_xml_extrakce as extrakce
+
+    web, vystup = os.path.join(slozka, 'web_extrakce'), os.path.join(slozka, 'extrakce')
+    os.makedirs(web)
+    os.makedirs(vystup)
+    extrakce.vystupy['patent_data'] = tabulka = os.path.join(vystup, 'patent_data.csv')
+    prepinace = ('--rezim', 'extrahovat', '--tabulky', 'patent_data', '--bez-cache')
+    vytvor_archiv(os.path.join(web, 'a.zip'), {'a1.xml': (1, 'A1'), 'a2.xml': (2, 'A2')})
+    server, base_url = spust_server(web)
+    try:
+        _spust_stahovani(base_url, vystup, *prepinace)
+        assert _radky(tabulka) == [('a1.xml', 'A1'), ('a2.xml', 'A2')], _radky(tabulka)
+
+        vytvor_archiv(os.path.join(web, 'b.zip'), {'b1.xml': (3, 'B1')})
+        _spust_stahovani(base_url, vystup, *prepinace)
+        assert _radky(tabulka) == [('a1.xml', 'A1'), ('a2.xml', 'A2'), ('b1.xml', 'B1')], _radky(tabulka)
+        print("OK: extrahovat, opakované spuštění připíše jen nový archiv")
+
+        vytvor_archiv(os.path.join(web, 'a.zip'), {'a1.xml': (1, 'A1 nové'), 'a2.xml': (2, 'A2')})
+        _spust_stahovani(base_url, vystup, *prepinace)
+        assert sorted(_radky(tabulka)) == [('a1.xml', 'A1 nové'), ('a2.xml', 'A2'), ('b1.xml', 'B1')], _radky(tabulka)
+        print("OK: extrahovat, změněný archiv nahradí své řádky")
+
+        os.remove(tabulka)
+        _spust_stahovani(base_url, vystup, *prepinace)
+        assert sorted(_radky(tabulka)) == [('a1.xml', 'A1 nové'), ('a2.xml', 'A2'), ('b1.xml', 'B1')], _radky(tabulka)
+        print("OK: extrahovat, chybějící výstup znovu zpracuje archivy z katalogu")
+    finally:
+        server.shutdown()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as slozka:
+        over_stahovani(slozka)
+        over_extrakci(slozka)
+    print("Kontrola stahování proti lokálnímu serveru prošla.")
+
+
+if __name__ == "__main__":
+    main()
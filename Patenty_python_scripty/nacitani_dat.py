@@ -0,0 +1,195 @@
+"""
+Společné načítání tabulek projektu (CSV, XLSX, Parquet, Arrow) do pandas s typy sloupců místo výchozích
+řetězců a `int64`. Používají ho notebooky v `Patenty_vizualizace_python`, `stav_api.py`
+a `casova_osa_scrape.py`, které dřív při každém spuštění znovu četly Excel přes openpyxl.
+
+### Typy sloupců:
+- Podle `databaze.TABULKY` (stejné typy jako místní databáze a `zapis_vystupu`), sloupec, který je ve více
+  tabulkách, má typ z první z nich (`Popis` jako v `casova_osa`), u zadané tabulky mají přednost její typy.
+- `kategorie` je `category` (`MPT`, `STAV`, `Popis`, `TYP`, kódy zemí), `datum` je `datetime64`
+  (`RRRR-MM-DD`, `DD.MM.RRRR` i pořadové číslo dne z Excelu), `cele` je nullable `Int32` / `Int64`
+  (ID univerzit, `TYP_CISLO`), `desetinne` je `float64`, ostatní zůstanou textem.
+- Převod je bezeztrátový: sloupec, ve kterém by se některá neprázdná hodnota nepřevedla, zůstane beze změny
+  (např. `Rok` jako datum v `licencni_prijmy_inc_kateg.csv`).
+- Názvy sloupců se sjednotí podle tabulek (`Application_number` i `Application Number` na
+  `Application_Number`, `TYP_cislo` na `TYP_CISLO`). Opakované sloupce ze spojení (`API.1`) se zahodí.
+
+### Cache Excelu:
+- List Excelu se po prvním načtení uloží jako Parquet (texty, bez typů) do složky `CACHE_SLOZKA` vedle
+  souboru. Další načtení čte Parquet, dokud je Excel starší než cache. Bez `pyarrow` se Excel čte vždy.
+
+### Funkce:
+- `nacti(cesta, tabulka=None, list=0)`: typovaná tabulka. Tabulka z `databaze.TABULKY` se bez `tabulka`
+  odhadne z názvu souboru (`applicants_2.xlsx` je `Applicants`, `vysledekstav3.csv` je `vysledekstav`).
+- `otypuj(df, tabulka=None)`: sjednocení názvů a typů u již načteného DataFrame.
+- `python nacitani_dat.py <soubor> [--list <list>]` porovná čas a paměť výchozího a typovaného načtení.
+"""
+
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+
+from databaze import TABULKY
+
+# Složka s Parquet kopiemi listů Excelu (vedle Excelu)
+CACHE_SLOZKA = '.excel_cache'
+
+# Počátek pořadových čísel dne v Excelu
+EXCEL_POCATEK = '1899-12-30'
+
+
+def _nazev(sloupec):
+    return str(sloupec).strip().replace(' ', '_').lower()
+
+
+def odhadni_tabulku(cesta):
+    """Tabulka z `databaze.TABULKY`, jejíž název je nejdelším začátkem názvu souboru, jinak None."""
+    soubor = os.path.splitext(os.path.basename(cesta))[0].lower()
+    kandidati = [tabulka for tabulka in TABULKY if soubor.startswith(tabulka.lower())]
+    return max(kandidati, key=len) if kandidati else None
+
+
+def typy_sloupcu(tabulka=None):
+    """{sloupec: typ} ze všech tabulek, u `tabulka` s přednostním typem této tabulky."""
+    typy = {}
+    for schema in TABULKY.values():
+        for sloupec, typ in schema['sloupce'].items():
+            typy.setdefault(sloupec, typ)
+    if tabulka is not None:
+        typy.update(TABULKY[tabulka]['sloupce'])
+    return typy
+
+
+def _datum(hodnoty):
+    """Data v textu (ISO, DD.MM.RRRR) nebo jako pořadové číslo dne z Excelu."""
+    text = hodnoty.astype('string').str.strip()
+    cislo = text.str.fullmatch(r'\d+(?:\.\d+)?').fillna(False).astype(bool)
+    datum = pd.to_datetime(text.where(~cislo), format='ISO8601', errors='coerce')
+    datum = datum.fillna(pd.to_datetime(text.where(~cislo), format='%d.%m.%Y', errors='coerce'))
+    excel = pd.to_datetime(pd.to_numeric(text.where(cislo), errors='coerce'), unit='D', origin=EXCEL_POCATEK)
+    return datum.fillna(excel)
+
+
+def _cislo(hodnoty):
+    if pd.api.types.is_numeric_dtype(hodnoty):
+        return hodnoty
+    text = hodnoty.astype('string').str.replace(' ', '').str.replace('\xa0', '').str.replace(',', '.')
+    return pd.to_numeric(text, errors='coerce')
+
+
+def _cele(hodnoty):
+    cisla = _cislo(hodnoty)
+    if (cisla.dropna() % 1 != 0).any():
+        return cisla
+    mez = cisla.abs().max()
+    return cisla.astype('Int32' if pd.isna(mez) or mez < 2 ** 31 else 'Int64')
+
+
+PREVODY = {
+    'kategorie': lambda hodnoty: hodnoty.astype('category'),
+    'datum': _datum,
+    'cele': _cele,
+    'desetinne': lambda hodnoty: _cislo(hodnoty).astype('float64'),
+}
+
+
+def _prazdne(hodnoty):
+    """Chybějící hodnoty a prázdné řetězce."""
+    return hodnoty.isna() | (hodnoty.astype('string').str.strip() == '').fillna(True)
+
+
+def otypuj(df, tabulka=None):
+    """Sjednotí názvy sloupců a převede sloupce na typy podle `databaze.TABULKY`."""
+    typy = typy_sloupcu(tabulka)
+    nazvy = {_nazev(sloupec): sloupec for sloupec in typy}
+    if tabulka is not None:
+        nazvy.update({_nazev(puvodni): sloupec for puvodni, sloupec in TABULKY[tabulka]['prejmenovani'].items()})
+    prejmenovani, zahodit = {}, []
+    for sloupec in df.columns:
+        zaklad = re.sub(r'\.\d+$', '', str(sloupec))
+        novy = nazvy.get(_nazev(sloupec), nazvy.get(_nazev(zaklad), str(sloupec)))
+        if novy in prejmenovani.values():
+            # Opakovaný sloupec (pandas k názvu přidá `.1`), platí první výskyt
+            zahodit.append(sloupec)
+        else:
+            prejmenovani[sloupec] = novy
+    df = df.drop(columns=zahodit).rename(columns=prejmenovani)
+
+    for sloupec in df.columns:
+        prevod = PREVODY.get(typy.get(sloupec))
+        if prevod is None:
+            continue
+        puvodni = df[sloupec]
+        novy = prevod(puvodni)
+        # Jen bezeztrátový převod: nové prázdné hodnoty smí být jen tam, kde byly prázdné i předtím
+        if not (novy.isna() & ~_prazdne(puvodni)).any():
+            df[sloupec] = novy
+    return df
+
+
+def _cache_excelu(cesta, list):
+    slozka, soubor = os.path.split(os.path.abspath(cesta))
+    nazev_listu = re.sub(r'[^\w-]', '_', str(list))
+    return os.path.join(slozka, CACHE_SLOZKA, f"{os.path.splitext(soubor)[0]}__{nazev_listu}.parquet")
+
+
+def nacti_excel(cesta, list=0):
+    """List Excelu jako texty, z Parquet cache, pokud je novější než Excel."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return pd.read_excel(cesta, sheet_name=list, dtype=str)
+    cache = _cache_excelu(cesta, list)
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(cesta):
+        return pd.read_parquet(cache)
+    df = pd.read_excel(cesta, sheet_name=list, dtype=str)
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    # Parquet vyžaduje textové názvy sloupců
+    df.columns = [str(sloupec) for sloupec in df.columns]
+    df.to_parquet(cache, index=False)
+    return df
+
+
+def nacti(cesta, tabulka=None, list=0):
+    """Typovaná tabulka ze souboru CSV, XLSX (přes cache), Parquet nebo Arrow."""
+    if tabulka is None:
+        tabulka = odhadni_tabulku(cesta)
+    pripona = os.path.splitext(cesta)[1].lower()
+    if pripona in ('.xlsx', '.xls'):
+        df = nacti_excel(cesta, list)
+    elif pripona == '.parquet':
+        df = pd.read_parquet(cesta)
+    elif pripona in ('.arrow', '.feather'):
+        df = pd.read_feather(cesta)
+    else:
+        df = pd.read_csv(cesta, dtype=str, encoding='utf-8-sig', encoding_errors='replace')
+    return otypuj(df, tabulka)
+
+
+def _pamet(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Porovnání výchozího a typovaného načtení tabulky.")
+    parser.add_argument('soubor', help="CSV nebo XLSX soubor")
+    parser.add_argument('--list', default=0, help="list Excelu (výchozí první)")
+    parser.add_argument('--tabulka', choices=sorted(TABULKY), help="tabulka z databaze.TABULKY pro typy sloupců")
+    args = parser.parse_args()
+
+    excel = os.path.splitext(args.soubor)[1].lower() in ('.xlsx', '.xls')
+    zacatek = time.perf_counter()
+    vychozi = pd.read_excel(args.soubor, sheet_name=args.list) if excel else pd.read_csv(args.soubor)
+    print(f"výchozí:   {time.perf_counter() - zacatek:7.3f} s, {_pamet(vychozi):7.2f} MB")
+    for popis in ('typovaný', 'z cache') if excel else ('typovaný',):
+        zacatek = time.perf_counter()
+        typovany = nacti(args.soubor, args.tabulka, args.list)
+        print(f"{popis + ':':<10} {time.perf_counter() - zacatek:7.3f} s, {_pamet(typovany):7.2f} MB")
+    print(typovany.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
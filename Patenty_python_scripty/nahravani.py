@@ -0,0 +1,138 @@
+"""
+Hromadné nahrání tabulek z `Azure_zdroje` do místní databáze (`databaze.py`) s odvozenými sloupci.
+Nahrazuje ruční kroky po načtení v `Patenty_SQL/Patenty_dotazy.sql` (`UPDATE ... SET API = CONCAT('EP/', ...)`,
+`ALTER COLUMN Licencni_prijem INT`, `UPDATE ... * 1000`, `CASE` pro `IncomeCategory`) a mazání
+a opakované načítání celých tabulek.
+
+### Jak to funguje:
+- Každý zdroj z `databaze.TABULKY` se čte přes pandas po dávkách (`VELIKOST_DAVKY` řádků), sloupce se
+  přejmenují na sloupce tabulky (`odvozene_sloupce.sjednot_nazvy`, nahrazuje `sp_rename`).
+- Na celou dávku se najednou použijí odvození tabulky (`odvozene_sloupce.ODVOZENI`):
+  - `licencni_prijmy`: příjem je ve zdroji v tisících Kč, uloží se v Kč jako celé číslo,
+    `IncomeCategory` podle hranic příjmu (`pd.cut`, hranice patří do nižší kategorie jako `<=` v SQL).
+  - `Applicants`, `MPTapi`: `API`, `TYP` a `TYP_CISLO` z názvu souboru a čísla přihlášky, stejný klíč
+    jako v ostatních tabulkách (`MPTapi.csv` má vlastní tvar `PV2/...`, `EP/<Application_Number>`).
+- Dávka se uloží jako upsert podle přirozeného klíče (`Databaze.zapis`) v jedné transakci. Opakované
+  nahrání stejných souborů nic nezmění, po aktualizaci zdroje se přepíšou jen změněné řádky.
+- Odvození se počítají ze zdroje, ne z uložených hodnot, opakované nahrání tak příjem znovu nenásobí
+  (jako opakované spuštění `UPDATE ... * 1000`).
+
+### Spuštění:
+- `python nahravani.py --slozka ../Azure_zdroje --cesta patenty.sqlite` vypíše pro každý soubor počet
+  vložených, změněných a nezměněných řádků. Druhé spuštění nad stejnými soubory má vložených i změněných 0.
+- `--kontrola` to ověří: nahraje složku dvakrát do dočasné databáze a zkontroluje, že druhé nahrání nic
+  nevložilo ani nezměnilo a že každá tabulka má tolik řádků, kolik různých klíčů mají její zdroje
+  (např. patent ve spoluvlastnictví zůstane v `malicenci` pro každou organizaci).
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from databaze import DATABAZE, TABULKY, Databaze
+from odvozene_sloupce import odvod, radky_tabulky, sjednot_nazvy
+
+# Složka se zdrojovými soubory
+ZDROJE = os.path.join('..', 'Azure_zdroje')
+
+# Počet řádků v jedné dávce (jedna transakce)
+VELIKOST_DAVKY = 10000
+
+# Kombinace sloupců, které musí po nahrání zůstat rozlišené (vlastník patentu ve spoluvlastnictví)
+ROZLISENE_SLOUPCE = {'malicenci': ('Patent_Code', 'Application_Number', 'ID_univerzita')}
+
+
+def nahraj_csv(db, cesta, tabulka, velikost_davky=VELIKOST_DAVKY):
+    """Nahraje CSV soubor do tabulky po dávkách, vrátí (vložené, změněné, nezměněné) řádky."""
+    pocty = np.zeros(3, dtype=np.int64)
+    davky = pd.read_csv(cesta, dtype=str, keep_default_na=False, chunksize=velikost_davky,
+                        encoding='utf-8-sig', encoding_errors='replace')
+    for davka in davky:
+        davka = odvod(sjednot_nazvy(davka, tabulka), tabulka)
+        pocty += db.zapis(tabulka, list(davka.columns), radky_tabulky(davka))
+    return tuple(int(pocet) for pocet in pocty)
+
+
+def nahraj_slozku(db, slozka, velikost_davky=VELIKOST_DAVKY):
+    """
+    Nahraje všechny zdroje `databaze.TABULKY` ze složky (chybějící soubory přeskočí).
+    Vrátí {soubor: (vložené, změněné, nezměněné)}.
+    """
+    pocty = {}
+    for tabulka, schema in TABULKY.items():
+        for soubor in schema['zdroje']:
+            cesta = os.path.join(slozka, soubor)
+            if os.path.exists(cesta):
+                pocty[soubor] = nahraj_csv(db, cesta, tabulka, velikost_davky)
+    return pocty
+
+
+def kontrola_opakovani(slozka, velikost_davky=VELIKOST_DAVKY):
+    """
+    Nahraje složku dvakrát do dočasné databáze a vrátí seznam chyb (prázdný, když druhé nahrání nic
+    nevložilo ani nezměnilo a tabulky mají tolik řádků, kolik různých klíčů je ve zdrojích).
+    """
+    chyby = []
+    with tempfile.TemporaryDirectory() as docasna:
+        db = Databaze(os.path.join(docasna, 'kontrola.sqlite'))
+        nahraj_slozku(db, slozka, velikost_davky)
+        for soubor, (vlozene, zmenene, _) in nahraj_slozku(db, slozka, velikost_davky).items():
+            if vlozene or zmenene:
+                chyby.append(f"{soubor}: druhé nahrání vložilo {vlozene} a změnilo {zmenene} řádků")
+        for tabulka, schema in TABULKY.items():
+            zdroje = [os.path.join(slozka, soubor) for soubor in schema['zdroje']
+                      if os.path.exists(os.path.join(slozka, soubor))]
+            if not zdroje:
+                continue
+            data = pd.concat([odvod(sjednot_nazvy(pd.read_csv(cesta, dtype=str, keep_default_na=False,
+                                                              encoding='utf-8-sig', encoding_errors='replace'),
+                                                  tabulka), tabulka) for cesta in zdroje]).fillna('')
+            ocekavane = len(data[list(schema['klic'])].drop_duplicates())
+            (ulozene,), = db.dotaz(f"SELECT COUNT(*) FROM {tabulka}")
+            if ulozene != ocekavane:
+                chyby.append(f"{tabulka}: {ulozene} řádků v databázi, ve zdrojích {ocekavane} různých klíčů")
+            sloupce = list(ROZLISENE_SLOUPCE.get(tabulka, ()))
+            if sloupce:
+                ocekavane = len(data[sloupce][(data[sloupce] != '').all(axis=1)].drop_duplicates())
+                podminka = ' AND '.join(f"{sloupec} IS NOT NULL" for sloupec in sloupce)
+                (ulozene,), = db.dotaz(f"SELECT COUNT(*) FROM (SELECT DISTINCT {', '.join(sloupce)} "
+                                       f"FROM {tabulka} WHERE {podminka})")
+                if ulozene != ocekavane:
+                    chyby.append(f"{tabulka}: {ulozene} různých ({', '.join(sloupce)}) v databázi, "
+                                 f"ve zdrojích {ocekavane}")
+        db.zavri()
+    return chyby
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nahrání tabulek z Azure_zdroje do místní databáze (upsert).")
+    parser.add_argument('--slozka', default=ZDROJE, help=f"složka se zdrojovými CSV (výchozí {ZDROJE})")
+    parser.add_argument('--cesta', default=DATABAZE, help=f"soubor databáze (výchozí {DATABAZE})")
+    parser.add_argument('--velikost-davky', type=int, default=VELIKOST_DAVKY,
+                        help=f"počet řádků v jedné transakci (výchozí {VELIKOST_DAVKY})")
+    parser.add_argument('--kontrola', action='store_true',
+                        help="nahrát složku dvakrát do dočasné databáze a ověřit, že se nic nezměnilo "
+                             "a žádné řádky se nesloučily")
+    args = parser.parse_args()
+
+    if args.kontrola:
+        chyby = kontrola_opakovani(args.slozka, max(1, args.velikost_davky))
+        for chyba in chyby:
+            print(f"  {chyba}")
+        print("Kontrola opakovaného nahrání:", "chyby" if chyby else "v pořádku")
+        raise SystemExit(1 if chyby else 0)
+
+    db = Databaze(args.cesta)
+    zacatek = time.perf_counter()
+    for soubor, (vlozene, zmenene, nezmenene) in nahraj_slozku(db, args.slozka, max(1, args.velikost_davky)).items():
+        print(f"  {soubor}: vloženo {vlozene}, změněno {zmenene}, beze změny {nezmenene}")
+    print(f"Nahrání trvalo {time.perf_counter() - zacatek:.2f} s")
+    db.zavri()
+
+
+if __name__ == "__main__":
+    main()
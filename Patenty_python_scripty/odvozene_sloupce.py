@@ -0,0 +1,154 @@
+"""
+Odvozené sloupce tabulek (klíč `API`, typ dokumentu, kategorie licenčního příjmu) počítané najednou
+nad celým sloupcem pandas. Dřív se počítaly na různých místech a různě: `CONCAT('EP/', Application_Number)`
+a `CASE` pro `IncomeCategory` v `Patenty_SQL/Patenty_dotazy.sql`, `PT/...` a `PUV/...` v Excelu
+(`Applicants.csv`, `vysledekstav.csv`), `PV2/...` v `MPTapi.csv`. Klíče z různých tabulek se proto
+nespojily (`MPTapi` s `Applicants` přes `API` ani jeden řádek).
+
+### Klíč `API` (`api_klic`), stejný jako v `Applicants.csv` a v API ÚPV (`stav_api.py`):
+- Typ dokumentu se určí z názvu ST96 souboru (`VZOR_SOUBORU`, `..._PV2015-922.xml`, `..._PUV2017-34273.xml`,
+  `..._CZEP2813870.xml`), `TYPY_DOKUMENTU` dává `TYP` a `TYP_CISLO` (typ pro dotazy `casova_osa_scrape.py`).
+- Patent: `PT/<Application_Number>` (`PT/2015-922`).
+- Užitný vzor: `PUV/<číslo bez roku>` (`PUV/34273`).
+- Evropský patent: `EP/<číslo zveřejnění z názvu souboru>` (`EP/2813870`), ne `EP/<Application_Number>`
+  jako v SQL, takový klíč API ÚPV ani `vysledekstav` nemají.
+- Řádek, u kterého se typ z názvu souboru nepozná, si ponechá původní hodnoty.
+
+### Funkce:
+- `typ_dokumentu(soubory)`, `api_klic(application_numbers, soubory)`: odvození nad sloupci (Series).
+- `dopln_klice(df, typ)`: doplní nebo opraví `API` (s `typ` i `TYP` a `TYP_CISLO`) v tabulce se sloupci
+  `File_Name` a `Application_Number`.
+- `sjednot_nazvy(df, tabulka)`: přejmenuje sloupce na názvy z `databaze.TABULKY` (`Application_number`,
+  `Application Number` i `Patent_Number` na `Application_Number`, nahrazuje `sp_rename`).
+- `prijem_v_kc(prijem)`, `kategorie_prijmu(prijem)`: licenční příjem (`pd.cut` podle `HRANICE_PRIJMU`).
+- `odvod(df, tabulka)`: všechna odvození tabulky (`ODVOZENI`), používá `nahravani.py`.
+- `odvod_radky(tabulka, sloupce, radky)`: totéž pro dávku řádků zápisu ve formátu `sqlite`
+  (`zapis_vystupu.py`), výstupy extraktorů a scraperů tak mají stejné klíče jako nahrané tabulky.
+"""
+
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from databaze import sloupce_tabulky
+
+# Druh a číslo dokumentu z názvu ST96 souboru
+VZOR_SOUBORU = r'_(?:CZ)?(EP|PUV|PV)(\d[\d-]*)\.xml$'
+
+# Druh dokumentu v názvu souboru: (TYP, TYP_CISLO)
+TYPY_DOKUMENTU = {
+    'PV': ('PT', 1),
+    'PUV': ('PUV', 2),
+    'EP': ('EP', 5),
+}
+
+# Licenční příjmy jsou ve zdroji v tisících Kč
+NASOBEK_PRIJMU = 1000
+
+# Horní hranice kategorií příjmu v Kč (včetně) a jejich názvy, jako `CASE` v Patenty_dotazy.sql
+HRANICE_PRIJMU = (145000, 800000)
+KATEGORIE_PRIJMU = ('Low Income', 'Medium Income', 'High Income')
+
+
+def _druh(soubory):
+    """Druh dokumentu (`PV`, `PUV`, `EP`) a číslo z názvu souboru, u nepoznaného názvu prázdné řetězce."""
+    nalez = soubory.astype('string').str.extract(VZOR_SOUBORU).fillna('')
+    return nalez[0], nalez[1]
+
+
+def typ_dokumentu(soubory):
+    """DataFrame se sloupci `TYP` a `TYP_CISLO` (Int64) podle názvu souboru, nepoznaný typ je prázdný."""
+    druh, _ = _druh(soubory)
+    return pd.DataFrame({
+        'TYP': druh.map({klic: typ for klic, (typ, _) in TYPY_DOKUMENTU.items()}),
+        'TYP_CISLO': druh.map({klic: cislo for klic, (_, cislo) in TYPY_DOKUMENTU.items()}).astype('Int64'),
+    }, index=soubory.index)
+
+
+def api_klic(application_numbers, soubory):
+    """Klíč `API` pro každý řádek, None, pokud se typ dokumentu z názvu souboru nepozná."""
+    druh, cislo = _druh(soubory)
+    cisla = application_numbers.fillna('').astype(str)
+    api = np.select(
+        [druh == 'PV', druh == 'PUV', druh == 'EP'],
+        ['PT/' + cisla, 'PUV/' + cisla.str.rsplit('-', n=1).str[-1], 'EP/' + cislo.astype(str)],
+        default=None)
+    return pd.Series(api, index=application_numbers.index, dtype=object)
+
+
+def dopln_klice(df, typ=True):
+    """
+    Doplní `API` podle `File_Name` a `Application_Number` (kde se typ pozná), s `typ` i `TYP` a `TYP_CISLO`.
+    """
+    if 'File_Name' not in df or 'Application_Number' not in df:
+        return df
+    api = api_klic(df['Application_Number'], df['File_Name'])
+    poznany = api.notna()
+    df['API'] = api.where(poznany, df['API'] if 'API' in df else None)
+    if not typ:
+        return df
+    for sloupec, hodnoty in typ_dokumentu(df['File_Name']).items():
+        if sloupec in df:
+            df[sloupec] = df[sloupec].astype(object).where(~poznany, hodnoty.astype(object))
+        else:
+            df[sloupec] = hodnoty
+    return df
+
+
+def sjednot_nazvy(df, tabulka):
+    """Přejmenuje sloupce na názvy tabulky `tabulka` z `databaze.TABULKY`, ostatní sloupce zahodí."""
+    sloupce = sloupce_tabulky(tabulka, [str(sloupec) for sloupec in df.columns])
+    df = df.loc[:, [sloupec is not None for sloupec in sloupce]]
+    df.columns = [sloupec for sloupec in sloupce if sloupec is not None]
+    return df
+
+
+def prijem_v_kc(prijem):
+    """Licenční příjem ze zdroje (tisíce Kč, i s desetinnou čárkou) v Kč jako Int64."""
+    if prijem.dtype == object or isinstance(prijem.dtype, pd.StringDtype):
+        prijem = prijem.astype('string').str.replace(' ', '').str.replace(',', '.')
+    return (pd.to_numeric(prijem, errors='coerce') * NASOBEK_PRIJMU).round().astype('Int64')
+
+
+def kategorie_prijmu(prijem):
+    """Kategorie příjmu v Kč podle `HRANICE_PRIJMU` (hranice patří do nižší kategorie)."""
+    return pd.cut(prijem.astype('float64'), [-np.inf, *HRANICE_PRIJMU, np.inf], labels=KATEGORIE_PRIJMU)
+
+
+def odvod_licencni_prijmy(df):
+    df['Licencni_prijem'] = prijem_v_kc(df['Licencni_prijem'])
+    df['IncomeCategory'] = kategorie_prijmu(df['Licencni_prijem'])
+    return df
+
+
+# Odvození podle tabulky `databaze.TABULKY`
+ODVOZENI = {
+    'Applicants': dopln_klice,
+    'MPTapi': partial(dopln_klice, typ=False),
+    'licencni_prijmy': odvod_licencni_prijmy,
+}
+
+
+def odvod(df, tabulka):
+    """Použije odvození tabulky (`ODVOZENI`) na celý DataFrame, tabulku bez odvození vrátí beze změny."""
+    if tabulka in ODVOZENI:
+        df = ODVOZENI[tabulka](df)
+    return df
+
+
+def radky_tabulky(df):
+    """Řádky DataFrame jako n-tice, prázdné hodnoty pandas (NaN, pd.NA) jako None."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def odvod_radky(tabulka, sloupce, radky):
+    """
+    Odvození tabulky pro řádky se sloupci `sloupce` (None = sloupec se neukládá).
+    Vrátí (sloupce, řádky) včetně odvozených sloupců.
+    """
+    pozice = [index for index, sloupec in enumerate(sloupce) if sloupec is not None]
+    df = pd.DataFrame([[row[index] if index < len(row) else None for index in pozice] for row in radky],
+                      columns=[sloupce[index] for index in pozice], dtype=object)
+    df = odvod(df, tabulka)
+    return list(df.columns), list(radky_tabulky(df))
@@ -7,23 +7,37 @@ kde A + B = C.
 ### Funkce skriptu:
 
 1. **Načítání textu z PDF souborů:**
-   - Funkce `extract_text_from_pdf(pdf_path)` iteruje přes všechny stránky PDF a extrahuje text.
+   - Funkce `extract_text_from_pdf(pdf_path)` nejdřív levnou sondou do surového obsahu stránek (modul `pdf_text`)
+     vybere stránky se slovy `KLICOVA_SLOVA` a plně extrahuje text jen z nich. Tabulka s příjmy je obvykle
+     na jedné stránce přílohy, zpracování je tak řádově rychlejší.
+   - S přepínačem `--cela-zprava` extrahuje text všech stránek (původní chování).
+   - Text stránek se ukládá do cache (`pdf_cache.py`, soubor `--pdf-cache`, výchozí `pdf_cache.sqlite`) podle
+     otisku obsahu PDF a verze extrakce. Po úpravě regulárního výrazu `pattern` nebo zpracování čísel běží
+     další spuštění jen nad uloženým textem, bez čtení PDF. `--bez-cache` cache nepoužije.
 
 2. **Vyhledávání odpovídajících řádků:**
-   - Regulární výraz `pattern` hledá řádky obsahující text "Příjmy z licenčních smluv" (s volitelným "(2)").
-   - Funkce `find_lines_with_pattern(text, pattern)` identifikuje odpovídající řádky v textu.
+   - Funkce `find_lines_with_pattern(text)` identifikuje řádky obsahující text "Příjmy z licenčních smluv"
+     (s volitelným "(2)") jedním lineárním průchodem normalizovaným textem (modul `vzor_licence`: bez mezer
+     a velkých písmen, s diakritikou i bez ní).
+   - S vlastním regulárním výrazem (`find_lines_with_pattern(text, pattern)`) se testuje řádek po řádku jako
+     dřív, původní výraz zůstává v `pattern`.
 
 3. **Zpracování čísel na řádcích:**
-   - Funkce `parse_number(number_str)` převádí čísla s čárkou na desetinná čísla.
-   - Funkce `find_combination(numbers)` hledá správnou kombinaci čísel A, B, C, kde A + B = C.
+   - Funkce `find_combination(numbers)` hledá správnou kombinaci čísel A, B, C, kde A + B = C, z tokenů řádku
+     (modul `rekonstrukce_cisel`: mezery mezi tisíci, desetinná čárka, pomlčka jako nula, A = C při B = 0).
    - Funkce `process_line_for_numbers(line)` extrahuje čísla z řádku, hledá kombinaci A, B, C a vrací je.
 
 4. **Iterace přes PDF soubory:**
-   - Skript prochází všechny PDF soubory ve složce `pdf_folder` a jejích podsložkách pomocí `os.walk`.
-   - Pro každý soubor:
+   - Skript prochází všechny PDF soubory ve složce `pdf_folder` (nebo `--slozka`) a jejích podsložkách pomocí `os.walk`.
+   - Pro každý soubor (`zpracuj_pdf(pdf_path)`):
      - Extrahuje text.
      - Vyhledává řádky odpovídající regulárnímu výrazu.
      - Ze zjištěných řádků se pokouší identifikovat čísla A, B, C.
+   - Soubory se zpracovávají souběžně (`zpracuj_paralelne`): každé PDF ve vlastním procesu, najednou
+     nejvýš `--workers` procesů (výchozí počet jader). Výsledky se posílají zpět hlavnímu procesu, který
+     je zapisuje do jednoho výstupu ve stejném pořadí, v jakém soubory najde `os.walk`.
+   - Proces, který na jednom souboru běží déle než `--timeout` sekund (výchozí `TIMEOUT_SOUBORU`), se ukončí,
+     takže jedno problematické PDF nezastaví celý běh.
 
 5. **Ukládání výsledků:**
    - Výsledky jsou zapisovány do CSV souboru `output.csv` ve složce `pdf_folder`.
@@ -35,9 +49,15 @@ kde A + B = C.
 
 6. **Ošetření chyb:**
    - Skript ošetřuje chyby při čtení PDF souborů a pokračuje se zpracováním dalších souborů, pokud k chybě dojde.
-   - Chyby jsou zobrazeny na konzoli.
+   - Chyby a soubory ukončené pro překročení časového limitu jsou zobrazeny na konzoli.
+
+7. **Souhrn časů:**
+   - Do souboru `souhrn_casu.csv` ve stejné složce se zapíše pro každou podsložku (univerzitu) počet souborů,
+     počet zpracovaných, chyb a timeoutů, celkový čas a čas nejdelšího souboru.
 
 ### Výstup:
+- Nastavením `output_format` na `parquet` nebo `arrow` se výsledky uloží do typovaného sloupcového souboru
+  (modul `zapis_vystupu`, A, B, C jako desetinná čísla).
 - CSV soubor `output.csv` obsahuje následující sloupce:
   - Název podsložky,
   - Název PDF souboru,
@@ -45,125 +65,228 @@ kde A + B = C.
   - Hodnoty A, B, C, kde A + B = C (nebo `None`, pokud nebyly nalezeny).
 
 ### Poznámky:
-- Regulární výraz je robustní vůči mezera/znakové variace (například "Příjmy z l i c e n č n í ch smluv").
+- Hledání řádků je robustní vůči mezerám uvnitř slov (například "Příjmy z licen čních smluv").
 - Skript předpokládá, že čísla na řádcích jsou oddělena mezerami.
 - Pokud A + B = C není nalezeno, záznam se uloží s hodnotami `None`.
 """
 
 
 
+import argparse
+import multiprocessing
 import os
 import re
-import csv
-from PyPDF2 import PdfReader
+import time
+from multiprocessing.connection import wait
+
+from pdf_cache import CACHE_DB, PdfCache
+from pdf_text import extrahuj_text
+from rekonstrukce_cisel import najdi_kombinaci
+from vzor_licence import VZOR_ZA_POPISEM, najdi_radky
+from zapis_vystupu import cesta_pro_format, otevri_zapis
 
 # Cesta k hlavní složce s podsložkami a PDF soubory
 pdf_folder = r"C:\Users\Lenovo\Desktop\vsechnyUNI\Patenty_vyrocni_zpravy"
 
-# Cesta k výstupnímu CSV souboru
-output_file_path = os.path.join(pdf_folder, "output.csv")
+# Formát výstupu (csv, parquet, arrow nebo sqlite = tabulka v `patenty.sqlite`), výstupní soubor je `output.csv` ve zpracovávané složce
+output_format = 'csv'
+
+# Slova, podle kterých sonda vybírá stránky k plné extrakci textu
+KLICOVA_SLOVA = ('licen', 'smluv')
+
+# Výchozí časový limit na zpracování jednoho PDF (sekundy)
+TIMEOUT_SOUBORU = 300
 
 # Regulární výraz pro hledání řádků s textem "Příjmy z licenčních smluv" s volitelným "(2)"
 pattern = re.compile(r'[Pp].+y.+z(.)?l(\s.)?i(\s.)?c(\s.)?e(\s.)?n(\s.)?č(\s.)?n(\s.)?í(\s.)?ch(\s.)? s(\s.)?m(\s.)?l(\s.)?u(\s.)?v( \(2\))?')
 
-# Funkce pro načtení textu z PDF
-def extract_text_from_pdf(pdf_path):
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page_num in range(len(reader.pages)):
-        text += reader.pages[page_num].extract_text()
-    return text
+# Funkce pro načtení textu z PDF, bez `cela` jen ze stránek s klíčovými slovy (modul `pdf_text`),
+# s `cache` (`PdfCache`) přes cache textu stránek
+def extract_text_from_pdf(pdf_path, cela=False, cache=None):
+    return extrahuj_text(pdf_path, KLICOVA_SLOVA, cela, cache)
 
 # Funkce pro hledání odpovídajících řádků
-def find_lines_with_pattern(text, pattern):
+def find_lines_with_pattern(text, pattern=None):
+    if pattern is None:
+        # Bez vlastního výrazu jeden průchod normalizovaným textem (modul `vzor_licence`)
+        return najdi_radky(text)
     lines = text.splitlines()  # Rozdělit text na řádky
     matching_lines = [line.strip() for line in lines if pattern.search(line)]  # Odstranit prázdné znaky pomocí strip()
     return matching_lines
 
-# Funkce pro převod čísla s čárkou na desetinné číslo
-def parse_number(number_str):
-    # Nahraď čárku tečkou pro správný převod na číslo
-    return float(number_str.replace(",", "."))
-
-# Funkce pro nalezení správné kombinace A + B = C
+# Funkce pro nalezení správné kombinace A + B = C z tokenů řádku (modul `rekonstrukce_cisel`: skupiny tisíců,
+# desetinné čárky, A = C s B = 0)
 def find_combination(numbers):
-    # Pokud máme pouze 2 čísla, může se jednat o A = C a B = 0
-    if len(numbers) == 2:
-        A, C = numbers
-        B = 0
-        if A == C:
-            return A, B, C
-    
-    # Pokud máme více než 2 čísla, hledáme kombinaci A + B = C
-    for i in range(1, len(numbers)):
-        try:
-            A = float(''.join(map(lambda x: str(int(x)), numbers[:i])))  # Spojíme první část
-            for j in range(i+1, len(numbers)+1):
-                B = float(''.join(map(lambda x: str(int(x)), numbers[i:j])))  # Spojíme druhou část
-                C = float(''.join(map(lambda x: str(int(x)), numbers[j:])))  # Spojíme zbytek
-                if A + B == C:
-                    return A, B, C
-        except ValueError:
-            # Pokud dojde k chybě, vrátíme None
-            continue
-    return None
+    return najdi_kombinaci(numbers)
 
 # Funkce pro zpracování řádku a nalezení čísel A, B, C
 def process_line_for_numbers(line):
     # Najdi čísla na konci řádku po textu "smluv" nebo "smluv (x)"
-    match = re.search(r"smluv(?:\s*\(\d*\))?\s*(.*)", line)
+    match = VZOR_ZA_POPISEM.search(line)
     if match:
         numbers_str = match.group(1).strip()
         if numbers_str:
-            try:
-                # Rozděl čísla podle mezer
-                numbers = [parse_number(num) for num in numbers_str.split()]
-
-                # Najdi kombinaci A + B = C
-                result = find_combination(numbers)
-                if result:
-                    A, B, C = result
-                    return A, B, C
-            except ValueError:
-                # Pokud dojde k chybě při zpracování čísel, vrátíme None
-                return None
+            # Rozděl čísla podle mezer a najdi kombinaci A + B = C (None, pokud tokeny nejsou čísla)
+            return find_combination(numbers_str.split())
     return None
 
-# Otevřít výstupní CSV soubor pro zápis (přepíše existující soubor)
-with open(output_file_path, 'w', newline='', encoding='utf-8') as csvfile:
-    csvwriter = csv.writer(csvfile)
-    
-    # Zapsat hlavičku do CSV
-    csvwriter.writerow(['Nazev podsložky', 'Nazev souboru', 'Matching Line', 'A', 'B', 'C'])
+# Zpracování jednoho PDF: vrací seznam řádků [Matching Line, A, B, C]
+def zpracuj_pdf(pdf_path, cela=False, cache=None):
+    # Načíst text z PDF
+    text = extract_text_from_pdf(pdf_path, cela, cache)
+
+    # Najít řádky s požadovaným vzorem a hledat A, B, C
+    radky = []
+    for line in find_lines_with_pattern(text):
+        numbers = process_line_for_numbers(line)
+        if numbers:
+            A, B, C = numbers
+            radky.append([line, A, B, C])
+        else:
+            radky.append([line, None, None, None])
+    return radky
 
-    # Projít všechny PDF soubory ve složce a v podsložkách
-    for root, dirs, files in os.walk(pdf_folder):
+# Seznam PDF souborů ve složce a podsložkách jako dvojice (název podsložky, cesta)
+def najdi_pdf(slozka):
+    soubory = []
+    for root, dirs, files in os.walk(slozka):
         for filename in files:
             if filename.endswith(".pdf"):
-                pdf_path = os.path.join(root, filename)
-                folder_name = os.path.basename(root)  # Název podsložky
-                print(f"Zpracovávám soubor: {filename} v podsložce: {folder_name}")
-                
-                try:
-                    # Načíst text z PDF
-                    text = extract_text_from_pdf(pdf_path)
-                    
-                    # Najít řádky s požadovaným vzorem
-                    matching_lines = find_lines_with_pattern(text, pattern)
-                    
-                    # Zapsat nalezené řádky do CSV a hledat A, B, C
-                    if matching_lines:
-                        for line in matching_lines:
-                            numbers = process_line_for_numbers(line)
-                            if numbers:
-                                A, B, C = numbers
-                                csvwriter.writerow([folder_name, filename, line, A, B, C])
-                            else:
-                                csvwriter.writerow([folder_name, filename, line, None, None, None])
-                    else:
-                        print(f"V souboru {filename} nebyly nalezeny odpovídající řádky.")
-                
-                except Exception as e:
-                    # Pokud dojde k jakékoli chybě, soubor přeskoč a pokračuj
-                    print(f"Chyba při zpracování souboru {filename}: {e}")
-                    continue
+                soubory.append((os.path.basename(root), os.path.join(root, filename)))
+    return soubory
+
+# Běží v samostatném procesu, výsledek posílá rodiči rourou; cache si proces otevírá sám
+def _pracovnik(zpracovani, pdf_path, cela, cache_path, spojeni):
+    zacatek = time.perf_counter()
+    cache = None
+    try:
+        cache = PdfCache(cache_path) if cache_path else None
+        vysledek = ('ok', zpracovani(pdf_path, cela, cache))
+    except Exception as e:
+        vysledek = ('chyba', str(e))
+    finally:
+        if cache is not None:
+            cache.zavri()
+    spojeni.send(vysledek + (time.perf_counter() - zacatek,))
+    spojeni.close()
+
+# Souběžné zpracování PDF v procesech s časovým limitem na soubor
+def zpracuj_paralelne(soubory, workers, timeout, cela=False, cache_path=None, zpracovani=zpracuj_pdf):
+    """
+    Každé PDF běží ve vlastním procesu, najednou nejvýš `workers` procesů. Proces, který běží déle než
+    `timeout` sekund, se ukončí. S `cache_path` procesy používají cache textu stránek (`PdfCache`).
+    `zpracovani(pdf_path, cela, cache)` je funkce na úrovni modulu, která zpracuje jedno PDF (výchozí
+    `zpracuj_pdf`, jinou používá `pdf_engine.py`). Vrací (index, stav, výsledek, trvání) ve stejném pořadí jako `soubory`,
+    stav je `ok` (výsledek = řádky), `chyba` (výsledek = popis chyby) nebo `timeout`.
+    """
+    kontext = multiprocessing.get_context()
+    cekajici = iter(enumerate(soubory))
+    bezici = {}  # spojení -> (index, proces, začátek)
+    hotove = {}
+    dalsi = 0
+    while dalsi < len(soubory):
+        while len(bezici) < workers:
+            polozka = next(cekajici, None)
+            if polozka is None:
+                break
+            index, (_, pdf_path) = polozka
+            cteni, zapis = kontext.Pipe(duplex=False)
+            proces = kontext.Process(target=_pracovnik, args=(zpracovani, pdf_path, cela, cache_path, zapis), daemon=True)
+            proces.start()
+            zapis.close()
+            bezici[cteni] = (index, proces, time.perf_counter())
+
+        # Čeká na první výsledek, nejdéle do vypršení limitu nejstaršího procesu
+        nejdrive = min(zacatek for _, _, zacatek in bezici.values()) + timeout
+        pripravena = wait(list(bezici), max(0, nejdrive - time.perf_counter()))
+        for cteni in pripravena:
+            index, proces, zacatek = bezici.pop(cteni)
+            try:
+                hotove[index] = cteni.recv()
+            except EOFError:
+                # Proces skončil bez výsledku (pád interpretu, nedostatek paměti)
+                proces.join()
+                hotove[index] = ('chyba', f"proces skončil s kódem {proces.exitcode}",
+                                 time.perf_counter() - zacatek)
+            cteni.close()
+            proces.join()
+        ted = time.perf_counter()
+        for cteni, (index, proces, zacatek) in list(bezici.items()):
+            if ted - zacatek >= timeout:
+                proces.terminate()
+                proces.join()
+                cteni.close()
+                del bezici[cteni]
+                hotove[index] = ('timeout', None, ted - zacatek)
+
+        while dalsi in hotove:
+            yield (dalsi,) + hotove.pop(dalsi)
+            dalsi += 1
+
+# Zápis souhrnu časů podle podsložek (univerzit)
+def zapis_souhrn(souhrn, cesta, format='csv'):
+    hlavicka = ['Nazev podsložky', 'Souboru', 'Zpracovano', 'Chyb', 'Timeoutu', 'Cas celkem (s)', 'Nejdelsi soubor (s)']
+    typy = {sloupec: 'cele' for sloupec in hlavicka[1:5]}
+    typy.update({'Cas celkem (s)': 'desetinne', 'Nejdelsi soubor (s)': 'desetinne'})
+    with otevri_zapis(cesta, hlavicka, format, typy, encoding='utf-8') as writer:
+        for folder_name, stat in sorted(souhrn.items()):
+            writer.writerow([folder_name, stat['souboru'], stat['ok'], stat['chyba'], stat['timeout'],
+                             round(stat['cas'], 3), round(stat['max'], 3)])
+            print(f"{folder_name}: {stat['souboru']} souborů, {stat['cas']:.1f} s celkem, "
+                  f"nejdelší {stat['max']:.1f} s, chyb {stat['chyba']}, timeoutů {stat['timeout']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Hledání příjmů z licenčních smluv ve výročních zprávách (PDF).")
+    parser.add_argument('--slozka', default=pdf_folder, help="hlavní složka s podsložkami univerzit")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="počet souběžně zpracovávaných PDF (procesů, výchozí počet jader)")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SOUBORU,
+                        help=f"časový limit na jeden soubor v sekundách (výchozí {TIMEOUT_SOUBORU:g})")
+    parser.add_argument('--cela-zprava', action='store_true',
+                        help="extrahovat text všech stránek (bez výběru stránek podle klíčových slov)")
+    parser.add_argument('--pdf-cache', default=CACHE_DB, help=f"soubor cache textu stránek (výchozí {CACHE_DB})")
+    parser.add_argument('--bez-cache', action='store_true', help="nečíst ani neukládat text stránek do cache")
+    args = parser.parse_args()
+
+    output_path = cesta_pro_format(os.path.join(args.slozka, "output.csv"), output_format)
+    souhrn_path = cesta_pro_format(os.path.join(args.slozka, "souhrn_casu.csv"), output_format)
+    soubory = najdi_pdf(args.slozka)
+    if not args.bez_cache:
+        # Databázi cache (tabulky, režim WAL) založí hlavní proces dřív, než ji začnou sdílet pracovní procesy
+        PdfCache(args.pdf_cache).zavri()
+    print(f"Nalezeno PDF souborů: {len(soubory)}, procesů: {max(1, args.workers)}")
+
+    souhrn = {}
+    # Otevřít výstupní soubor pro zápis (přepíše existující soubor), hlavička se zapíše hned
+    with otevri_zapis(output_path, ['Nazev podsložky', 'Nazev souboru', 'Matching Line', 'A', 'B', 'C'],
+                      output_format, {'A': 'desetinne', 'B': 'desetinne', 'C': 'desetinne'},
+                      encoding='utf-8') as csvwriter:
+        for index, stav, vysledek, trvani in zpracuj_paralelne(soubory, max(1, args.workers), args.timeout,
+                                                                 args.cela_zprava,
+                                                                 None if args.bez_cache else args.pdf_cache):
+            folder_name, pdf_path = soubory[index]
+            filename = os.path.basename(pdf_path)
+            stat = souhrn.setdefault(folder_name, {'souboru': 0, 'ok': 0, 'chyba': 0, 'timeout': 0, 'cas': 0.0, 'max': 0.0})
+            stat['souboru'] += 1
+            stat[stav] += 1
+            stat['cas'] += trvani
+            stat['max'] = max(stat['max'], trvani)
+            print(f"Zpracován soubor: {filename} v podsložce: {folder_name} ({trvani:.1f} s)")
+
+            if stav == 'timeout':
+                # Soubor přesáhl časový limit, proces byl ukončen
+                print(f"Soubor {filename} překročil časový limit {args.timeout:g} s a byl přeskočen.")
+            elif stav == 'chyba':
+                # Pokud dojde k jakékoli chybě, soubor přeskoč a pokračuj
+                print(f"Chyba při zpracování souboru {filename}: {vysledek}")
+            elif vysledek:
+                # Zapsat nalezené řádky do CSV
+                for row in vysledek:
+                    csvwriter.writerow([folder_name, filename] + row)
+            else:
+                print(f"V souboru {filename} nebyly nalezeny odpovídající řádky.")
+
+    zapis_souhrn(souhrn, souhrn_path, output_format)
+
+if __name__ == "__main__":
+    main()
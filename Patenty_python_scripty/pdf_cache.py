@@ -0,0 +1,144 @@
+"""
+Perzistentní cache textu a tabulek vytažených z PDF výročních zpráv. Úprava regulárního výrazu
+v `parse_pdf_s_matematikou.py` nebo logiky tabulek v `2_pdf_extrakce.py` tak nevyžaduje znovu číst
+všechna PDF, druhý a další běh bere text stránek z cache.
+
+### Jak to funguje:
+- Klíč souboru je SHA-256 jeho obsahu (`otisk_souboru`), přejmenované nebo přesunuté PDF se nečte znovu,
+  změněné PDF dostane nový otisk.
+- Každá stránka se ukládá zvlášť pod (otisk, extraktor, číslo stránky). Extraktor je řetězec s názvem
+  a verzí knihovny (např. `pypdf2-3.0.1-text`) a verzí vlastního zpracování, po aktualizaci knihovny
+  nebo změně extrakce se tak stránky vytáhnou znovu a staré záznamy se jen nepoužívají.
+- Obsah je text (výsledek `extract_text`, text sondy) nebo JSON (tabulky z `extract_tables`).
+  Hodnota NULL znamená, že stránku extraktor nepřečetl (chyba), a ukládá se také.
+- Počet stránek souboru je v tabulce `soubory`, podle něj se pozná, že je soubor v cache celý.
+- Databáze je v režimu WAL s čekáním na zámek, zapisovat do ní může více procesů najednou
+  (souběžné zpracování v `parse_pdf_s_matematikou.py`), každý proces si otevře vlastní `PdfCache`.
+
+### Použití:
+- `pdf_text.extrahuj_text(..., cache=PdfCache())` a `pdf_text.tabulky_stranek(..., cache=...)`.
+- `python pdf_cache.py --info` vypíše počet souborů a stránek podle extraktoru, `--smazat` smaže celou
+  cache, `--smazat-extraktor <název>` jen záznamy jednoho extraktoru (i starých verzí podle prefixu).
+"""
+
+import argparse
+import hashlib
+import sqlite3
+
+# Umístění cache
+CACHE_DB = 'pdf_cache.sqlite'
+CHUNK_SIZE = 1024 * 1024
+
+# Jak dlouho čekat na zámek databáze, když do ní zapisuje jiný proces (sekundy)
+CEKANI_NA_ZAMEK = 60
+
+
+def otisk_souboru(cesta):
+    """SHA-256 obsahu souboru (hexadecimálně), soubor se čte po blocích."""
+    otisk = hashlib.sha256()
+    with open(cesta, 'rb') as f:
+        for blok in iter(lambda: f.read(CHUNK_SIZE), b''):
+            otisk.update(blok)
+    return otisk.hexdigest()
+
+
+class PdfCache:
+    """Úložiště textu stránek v SQLite, jedna instance na proces."""
+
+    def __init__(self, cesta=CACHE_DB):
+        self.cesta = cesta
+        self.db = sqlite3.connect(cesta, timeout=CEKANI_NA_ZAMEK, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS soubory (
+                otisk TEXT PRIMARY KEY,
+                pocet_stran INTEGER
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS stranky (
+                otisk TEXT,
+                extraktor TEXT,
+                stranka INTEGER,
+                obsah TEXT,
+                PRIMARY KEY (otisk, extraktor, stranka)
+            )""")
+
+    def pocet_stran(self, otisk):
+        """Počet stránek souboru, nebo None, pokud soubor v cache není."""
+        radek = self.db.execute("SELECT pocet_stran FROM soubory WHERE otisk = ?", (otisk,)).fetchone()
+        return radek[0] if radek else None
+
+    def nacti(self, otisk, extraktor, stranky=None):
+        """
+        Uložené stránky jako slovník {číslo stránky: obsah}, s `stranky` jen vybrané (chybějící
+        ve slovníku nejsou).
+        """
+        radky = self.db.execute("SELECT stranka, obsah FROM stranky WHERE otisk = ? AND extraktor = ?",
+                                (otisk, extraktor))
+        obsahy = dict(radky)
+        if stranky is not None:
+            obsahy = {stranka: obsahy[stranka] for stranka in stranky if stranka in obsahy}
+        return obsahy
+
+    def uloz(self, otisk, extraktor, obsahy, pocet_stran=None):
+        """Uloží stránky {číslo stránky: obsah} jedné extrakce v jedné transakci."""
+        with self.db:
+            self.db.execute("BEGIN")
+            if pocet_stran is not None:
+                self.db.execute("INSERT OR REPLACE INTO soubory VALUES (?, ?)", (otisk, pocet_stran))
+            self.db.executemany("INSERT OR REPLACE INTO stranky VALUES (?, ?, ?, ?)",
+                                [(otisk, extraktor, stranka, obsah) for stranka, obsah in obsahy.items()])
+
+    def smaz(self, extraktor=None):
+        """Smaže záznamy extraktorů začínajících `extraktor`, bez něj celou cache. Vrátí počet stránek."""
+        with self.db:
+            self.db.execute("BEGIN")
+            if extraktor is None:
+                pocet = self.db.execute("DELETE FROM stranky").rowcount
+                self.db.execute("DELETE FROM soubory")
+            else:
+                pocet = self.db.execute("DELETE FROM stranky WHERE extraktor LIKE ? ESCAPE '\\'",
+                                        (_like_prefix(extraktor),)).rowcount
+        self.db.execute("VACUUM")
+        return pocet
+
+    def info(self):
+        """Počet souborů a seznam (extraktor, počet souborů, počet stránek)."""
+        souboru = self.db.execute("SELECT COUNT(*) FROM soubory").fetchone()[0]
+        extraktory = self.db.execute(
+            "SELECT extraktor, COUNT(DISTINCT otisk), COUNT(*) FROM stranky GROUP BY extraktor ORDER BY extraktor"
+        ).fetchall()
+        return souboru, extraktory
+
+    def zavri(self):
+        self.db.close()
+
+
+def _like_prefix(text):
+    """Vzor LIKE pro řetězce začínající `text` (znaky `%` a `_` doslovně)."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Správa cache textu vytaženého z PDF.")
+    parser.add_argument('--cesta', default=CACHE_DB, help=f"soubor cache (výchozí {CACHE_DB})")
+    parser.add_argument('--info', action='store_true', help="vypsat počet souborů a stránek")
+    parser.add_argument('--smazat', action='store_true', help="smazat celou cache")
+    parser.add_argument('--smazat-extraktor', metavar='NAZEV',
+                        help="smazat záznamy extraktorů začínajících tímto názvem")
+    args = parser.parse_args()
+
+    cache = PdfCache(args.cesta)
+    if args.smazat:
+        print(f"Smazáno stránek: {cache.smaz()}")
+    elif args.smazat_extraktor:
+        print(f"Smazáno stránek: {cache.smaz(args.smazat_extraktor)}")
+    souboru, extraktory = cache.info()
+    print(f"Souborů v cache: {souboru}")
+    for extraktor, pocet_souboru, pocet_stranek in extraktory:
+        print(f"  {extraktor}: {pocet_souboru} souborů, {pocet_stranek} stránek")
+    cache.zavri()
+
+
+if __name__ == "__main__":
+    main()
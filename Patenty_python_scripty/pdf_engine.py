@@ -0,0 +1,171 @@
+"""
+Jednotné hledání příjmů z licenčních smluv ve výročních zprávách (PDF) jedním průchodem celého korpusu.
+Nahrazuje tři oddělené pokusy, které se spouštěly každý zvlášť na jiné složky univerzit: regulární výraz
+nad textem z pdfplumber (`1_prvni_pokus_patenty.py`), tabulky z pdfplumber s řádkem `A.1`
+(`2_pdf_extrakce.py`) a text z PyPDF2 s hledáním A + B = C (`3_Ivca_fungujici.py`,
+`parse_pdf_s_matematikou.py`).
+
+### Metody (`METODY`, od nejlevnější):
+1. `text`: Text stránek vybraných sondou (`pdf_text`), řádky s příjmy (`vzor_licence`) a čísla A + B = C
+   (`process_line_for_numbers` z `parse_pdf_s_matematikou.py`). Stačí, pokud aspoň jeden řádek dá trojici.
+2. `tabulka`: Tabulky jen ze stejných kandidátních stránek (`pdfplumber`, `page.extract_tables()`). Řádek
+   tabulky, jehož buňka obsahuje příjmy z licenčních smluv (`vzor_licence.odpovida`), čísla z buněk za ní a A + B = C (`rekonstrukce_cisel`). Spustí se,
+   jen když `text` nenašel žádnou trojici (čísla často leží na jiném řádku textu než popis).
+3. `radek`: Jediné číslo za popisem na řádku textu jako celkový příjem C (jako `1_prvni_pokus_patenty.py`),
+   A a B zůstanou prázdné. Řádek s více čísly oddělenými mezerami je nejednoznačný (mezery mezi tisíci
+   i mezi sloupci) a přeskočí se. Nejméně spolehlivé, proto až po selhání tabulek.
+- Soubor, u kterého neuspěla žádná metoda, má metodu `nenalezeno` a ve výstupu nalezené řádky bez čísel.
+- Bez knihovny `pdfplumber` se metoda `tabulka` přeskočí.
+
+### Jak to funguje:
+- Soubory se zpracovávají souběžně v procesech s časovým limitem (`zpracuj_paralelne`
+  z `parse_pdf_s_matematikou.py`), text stránek i tabulky se ukládají do cache (`pdf_cache.py`).
+- Do `output_engine.csv` ve zpracovávané složce se zapíšou nalezené řádky se sloupcem `Metoda`.
+- Do `metody.csv` se pro každý soubor zapíše metoda, která uspěla (nebo `chyba` / `timeout`),
+  kandidátní stránky a čas zpracování. Na konci se vypíše počet souborů podle metody.
+
+### Spuštění:
+- `python pdf_engine.py --slozka <složka s podsložkami univerzit>`, přepínače `--workers`, `--timeout`,
+  `--pdf-cache` a `--bez-cache` jako u `parse_pdf_s_matematikou.py`.
+"""
+
+import argparse
+import os
+import re
+from collections import Counter
+
+from parse_pdf_s_matematikou import (KLICOVA_SLOVA, TIMEOUT_SOUBORU, find_lines_with_pattern, najdi_pdf, pdf_folder,
+                                     process_line_for_numbers, zpracuj_paralelne)
+from pdf_cache import CACHE_DB, PdfCache
+from pdf_text import spoj_stranky, tabulky_stranek, texty_stranek
+from rekonstrukce_cisel import najdi_kombinaci, rozloz_token
+from vzor_licence import odpovida
+from zapis_vystupu import cesta_pro_format, otevri_zapis
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+# Formát výstupu (csv, parquet, arrow nebo sqlite = tabulka v `patenty.sqlite`)
+output_format = 'csv'
+
+METODY = ('text', 'tabulka', 'radek')
+
+# Jediné číslo na řádku za "smluv" / "smluv (2)" (s desetinnou čárkou)
+VZOR_CISLA_RADKU = re.compile(r"smluv(?:\s*\(\d*\))?\s*(\d+(?:,\d+)?)\s*$")
+
+
+def metoda_text(text):
+    """Řádky [Matching Line, A, B, C] z textu, čísla jen tam, kde se našla kombinace A + B = C."""
+    radky = []
+    for line in find_lines_with_pattern(text):
+        try:
+            numbers = process_line_for_numbers(line)
+        except Exception:
+            numbers = None
+        radky.append([line] + list(numbers if numbers else (None, None, None)))
+    return radky
+
+
+def metoda_tabulka(tabulky):
+    """Řádky [popis, A, B, C] z tabulek {index stránky: tabulky}, kde buňka popisu obsahuje příjmy z licencí."""
+    radky = []
+    for tabulky_stranky in tabulky.values():
+        for tabulka in tabulky_stranky:
+            for row in tabulka:
+                bunky = [(bunka or '').replace('\n', ' ').strip() for bunka in row]
+                popis = next((i for i, bunka in enumerate(bunky) if odpovida(bunka)), None)
+                if popis is None:
+                    continue
+                # Buňka je jedno číslo, mezery v ní jsou jen mezi tisíci
+                tokeny = [bunka.replace(' ', '').replace('\xa0', '') for bunka in bunky[popis + 1:]]
+                vysledek = najdi_kombinaci([token for token in tokeny if rozloz_token(token) is not None])
+                if vysledek:
+                    radky.append([' '.join(bunka for bunka in bunky if bunka)] + list(vysledek))
+    return radky
+
+
+def metoda_radek(radky_textu):
+    """Řádky [Matching Line, None, None, C] s jediným číslem za popisem jako celkem C."""
+    radky = []
+    for line, *_ in radky_textu:
+        nalez = VZOR_CISLA_RADKU.search(line)
+        if nalez:
+            radky.append([line, None, None, float(nalez.group(1).replace(',', '.'))])
+    return radky
+
+
+def zpracuj_soubor(pdf_path, cela=False, cache=None):
+    """
+    Zkouší `METODY` od nejlevnější a skončí u první, která něco našla. Vrací (metoda, kandidátní stránky,
+    řádky [Matching Line, A, B, C]), metoda je `nenalezeno`, pokud neuspěla žádná.
+    """
+    indexy, texty = texty_stranek(pdf_path, KLICOVA_SLOVA, cela, cache)
+    radky_textu = metoda_text(spoj_stranky(texty, indexy))
+    if any(radek[1] is not None for radek in radky_textu):
+        return 'text', indexy, radky_textu
+
+    if pdfplumber is not None and indexy:
+        radky = metoda_tabulka(tabulky_stranek(pdf_path, cache, indexy))
+        if radky:
+            return 'tabulka', indexy, radky
+
+    radky = metoda_radek(radky_textu)
+    if radky:
+        return 'radek', indexy, radky
+    return 'nenalezeno', indexy, radky_textu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hledání příjmů z licenčních smluv ve výročních zprávách "
+                                                 "kombinací metod (text, tabulky, poslední číslo).")
+    parser.add_argument('--slozka', default=pdf_folder, help="hlavní složka s podsložkami univerzit")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="počet souběžně zpracovávaných PDF (procesů, výchozí počet jader)")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SOUBORU,
+                        help=f"časový limit na jeden soubor v sekundách (výchozí {TIMEOUT_SOUBORU:g})")
+    parser.add_argument('--pdf-cache', default=CACHE_DB, help=f"soubor cache textu stránek (výchozí {CACHE_DB})")
+    parser.add_argument('--bez-cache', action='store_true', help="nečíst ani neukládat text stránek do cache")
+    args = parser.parse_args()
+
+    output_path = cesta_pro_format(os.path.join(args.slozka, "output_engine.csv"), output_format)
+    metody_path = cesta_pro_format(os.path.join(args.slozka, "metody.csv"), output_format)
+    soubory = najdi_pdf(args.slozka)
+    print(f"Nalezeno PDF souborů: {len(soubory)}, procesů: {max(1, args.workers)}")
+    if pdfplumber is None:
+        print("Knihovna pdfplumber není nainstalovaná, metoda 'tabulka' se přeskočí.")
+    if not args.bez_cache:
+        PdfCache(args.pdf_cache).zavri()
+
+    pocty = Counter()
+    with otevri_zapis(output_path, ['Nazev podsložky', 'Nazev souboru', 'Metoda', 'Matching Line', 'A', 'B', 'C'],
+                      output_format, {'Metoda': 'kategorie', 'A': 'desetinne', 'B': 'desetinne', 'C': 'desetinne'},
+                      encoding='utf-8') as csvwriter, \
+            otevri_zapis(metody_path, ['Nazev podsložky', 'Nazev souboru', 'Metoda', 'Stranky', 'Cas (s)'],
+                         output_format, {'Metoda': 'kategorie', 'Cas (s)': 'desetinne'},
+                         encoding='utf-8') as metody_writer:
+        for index, stav, vysledek, trvani in zpracuj_paralelne(soubory, max(1, args.workers), args.timeout, False,
+                                                                 None if args.bez_cache else args.pdf_cache,
+                                                                 zpracuj_soubor):
+            folder_name, pdf_path = soubory[index]
+            filename = os.path.basename(pdf_path)
+            if stav == 'ok':
+                metoda, indexy, radky = vysledek
+                stranky = ' '.join(str(i + 1) for i in indexy)
+                for row in radky:
+                    csvwriter.writerow([folder_name, filename, metoda] + row)
+            else:
+                metoda, stranky = stav, ''
+                if stav == 'chyba':
+                    print(f"Chyba při zpracování souboru {filename}: {vysledek}")
+            pocty[metoda] += 1
+            metody_writer.writerow([folder_name, filename, metoda, stranky, round(trvani, 3)])
+            print(f"Zpracován soubor: {filename} v podsložce: {folder_name}, metoda: {metoda} ({trvani:.1f} s)")
+
+    for metoda in METODY + ('nenalezeno', 'chyba', 'timeout'):
+        print(f"{metoda}: {pocty[metoda]} souborů")
+
+
+if __name__ == "__main__":
+    main()
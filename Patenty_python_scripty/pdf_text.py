@@ -0,0 +1,312 @@
+"""
+Cílené čtení textu z PDF výročních zpráv. Řádek "Příjmy z licenčních smluv" je v tabulce (obvykle
+v příloze) na jedné nebo dvou stránkách z desítek až stovek, plná extrakce textu (`extract_text`
+z PyPDF2) všech stránek je přitom nejpomalejší část zpracování.
+
+### Jak to funguje:
+1. **Sonda (`najdi_stranky`):** Pro každou stránku se vezme surový obsahový proud (po dekompresi) a jeho
+   řetězce u operátorů `Tj`, `TJ`, `'` a `"` se převedou na text přes kódování a `ToUnicode` mapy fontů
+   stránky (stejné mapy jako `extract_text`, `PyPDF2._cmap.build_char_map`). Bez pozic, matic a mezer,
+   jen regulární výrazy nad bajty, takže je to řádově rychlejší než plná extrakce.
+   - Formuláře (`/XObject` typu `/Form`) volané ze stránky se prohledají také.
+   - Stránka je kandidát, pokud text bez mezer obsahuje všechna `KLICOVA_SLOVA`.
+   - Stránka, kterou sonda neumí přečíst (chyba fontu, poškozený proud), je kandidát vždy.
+2. **Plná extrakce (`extrahuj_text`):** `extract_text` se zavolá jen pro kandidátní stránky. Text
+   navazujících stránek se spojí bez oddělovače jako dřív, mezi nenavazujícími se vloží konec řádku.
+
+### Funkce:
+- `najdi_stranky(reader, klicova_slova)`: Indexy kandidátních stránek.
+- `extrahuj_text(pdf_path, klicova_slova, cela=False)`: Text kandidátních stránek, s `cela=True` text
+  všech stránek (původní chování).
+- `text_stranek(reader, indexy)`: Text vybraných stránek spojený seznamem (ne opakovaným `+=`).
+- `texty_stranek(pdf_path, klicova_slova, cela, cache)`: Indexy kandidátních stránek a jejich text
+  (pro zpracování po stránkách, `pdf_engine.py`).
+- `tabulky_stranek(pdf_path, cache, stranky)`: Tabulky všech nebo vybraných stránek přes `pdfplumber`
+  (`2_pdf_extrakce.py`, `pdf_engine.py`).
+
+### Cache (`pdf_cache.py`):
+- S `cache=PdfCache(...)` se text sondy každé stránky (bez mezer, malými písmeny) i plný text
+  kandidátních stránek uloží podle otisku PDF. Další běh se změněným regulárním výrazem nebo jinými
+  klíčovými slovy PDF vůbec neotevře, pokud jsou všechny potřebné stránky v cache.
+- Extraktory v klíči obsahují verzi PyPDF2 / pdfplumber a `VERZE_SONDY` / `VERZE_TABULEK`.
+
+### Poznámky:
+- Pokud `PyPDF2._cmap` chybí (jiná verze knihovny), sonda vrátí všechny stránky a extrakce je stejná
+  jako dřív.
+- Text v obrázcích (skenované zprávy) nenajde sonda ani plná extrakce.
+"""
+
+import json
+import re
+
+import PyPDF2
+from PyPDF2 import PdfReader
+
+from pdf_cache import otisk_souboru
+
+try:
+    from PyPDF2._cmap import build_char_map
+except ImportError:
+    build_char_map = None
+
+# Slova, která musí kandidátní stránka obsahovat (malými písmeny, bez diakritiky u rozdělených slov)
+KLICOVA_SLOVA = ('licen', 'smluv')
+
+# Verze sondy a zpracování tabulek, zvýšit při změně, která mění jejich výstup (záznamy v cache se
+# pak nepoužijí)
+VERZE_SONDY = 1
+VERZE_TABULEK = 1
+EXTRAKTOR_SONDY = f'pypdf2-{PyPDF2.__version__}-sonda-{VERZE_SONDY}'
+EXTRAKTOR_TEXTU = f'pypdf2-{PyPDF2.__version__}-text'
+
+# Nejvyšší hloubka vnoření formulářů (`Do`), která se prohledává
+MAX_HLOUBKA = 3
+
+# Řetězce a operátory obsahového proudu: literál `( )`, hexadecimální `< >`, výběr fontu `Tf`,
+# volání formuláře `Do`, uložení a obnovení stavu `q` / `Q` (font je jeho součástí);
+# vložené obrázky `BI ... EI` se předem vypustí
+_TOKENY = re.compile(
+    rb'\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)'   # literál, jedna úroveň vnořených závorek
+    rb'|<[0-9A-Fa-f\s]*>'                           # hexadecimální řetězec
+    rb'|/([^\s/\[\]()<>{}%]+)\s+[-+\d.]+\s+Tf'       # font
+    rb'|/([^\s/\[\]()<>{}%]+)\s+Do\b'                # formulář nebo obrázek
+    rb'|(?<![\w/])([qQ])(?!\w)',                     # uložení / obnovení stavu
+    re.DOTALL)
+_OBRAZKY = re.compile(rb'\bBI\b.*?\bEI\b', re.DOTALL)
+_ESCAPE = re.compile(rb'\\([nrtbf()\\]|[0-7]{1,3}|\r?\n)')
+_ESCAPE_ZNAKY = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+                 b'(': b'(', b')': b')', b'\\': b'\\'}
+_MEZERY = re.compile(r'\s+')
+
+
+def _rozbal_literal(token):
+    """Bajty literálového řetězce `( ... )` po zpracování escape sekvencí."""
+    def nahrad(nalez):
+        kod = nalez.group(1)
+        if kod in _ESCAPE_ZNAKY:
+            return _ESCAPE_ZNAKY[kod]
+        if kod[:1] in b'\r\n':
+            return b''
+        return bytes((int(kod, 8) & 0xFF,))
+    obsah = token[1:-1]
+    return _ESCAPE.sub(nahrad, obsah) if b'\\' in obsah else obsah
+
+
+def _rozbal_hex(token):
+    cislice = token[1:-1].decode('ascii')
+    try:
+        return bytes.fromhex(cislice)
+    except ValueError:
+        # Lichý počet číslic, poslední se doplní nulou
+        cislice = re.sub(r'\s', '', cislice)
+        return bytes.fromhex(cislice + '0')
+
+
+def _dekoduj(retezec, font):
+    """Převede bajty řetězce na text stejně jako `extract_text` (kódování fontu, pak `ToUnicode`)."""
+    if font is None:
+        return retezec.decode('latin-1')
+    kodovani, mapa = font[2], font[3]
+    if isinstance(kodovani, str):
+        try:
+            text = retezec.decode(kodovani, 'surrogatepass')
+        except Exception:
+            text = retezec.decode('utf-16-be' if kodovani == 'charmap' else 'charmap', 'surrogatepass')
+    else:
+        text = ''.join(kodovani[x] if x in kodovani else chr(x) for x in retezec)
+    return ''.join(mapa.get(znak, znak) for znak in text)
+
+
+def _obsah(objekt):
+    """Dekomprimovaný obsahový proud stránky nebo formuláře (i složený z více proudů)."""
+    if '/Contents' in objekt:
+        obsah = objekt['/Contents'].get_object()
+    elif hasattr(objekt, 'get_data'):
+        obsah = objekt
+    else:
+        return b''
+    if obsah is None:
+        return b''
+    if isinstance(obsah, list):
+        return b'\n'.join(cast.get_object().get_data() for cast in obsah)
+    return obsah.get_data()
+
+
+def _fonty(objekt, fonty_cache):
+    """Mapy fontů objektu (stránky nebo formuláře) podle jména zdroje, sdílené fonty se čtou jednou."""
+    fonty = {}
+    try:
+        zdroje = objekt['/Resources'].get_object()
+        seznam = zdroje['/Font'].get_object() if '/Font' in zdroje else {}
+    except (KeyError, AttributeError):
+        return fonty
+    for jmeno, odkaz in seznam.items():
+        klic = (odkaz.idnum, odkaz.generation) if hasattr(odkaz, 'idnum') else id(odkaz.get_object())
+        if klic not in fonty_cache:
+            fonty_cache[klic] = build_char_map(jmeno, 200.0, objekt)
+        fonty[jmeno.encode('latin-1')] = fonty_cache[klic]
+    return fonty
+
+
+def rychly_text(objekt, fonty_cache, hloubka=0, fonty=None, font=None):
+    """
+    Přibližný text stránky nebo formuláře: řetězce za sebou, bez rozložení a mezer. Formulář bez
+    vlastních `/Resources` používá fonty a aktuální font volajícího (`fonty`, `font`).
+    """
+    if fonty is None or '/Resources' in objekt:
+        fonty = _fonty(objekt, fonty_cache)
+    casti = []
+    zasobnik = []
+    # Řetězce stejným fontem se dekódují najednou
+    davka = []
+    for token in _TOKENY.finditer(_OBRAZKY.sub(b' ', _obsah(objekt))):
+        if token.lastindex is None:
+            retezec = token.group(0)
+            davka.append(_rozbal_literal(retezec) if retezec[:1] == b'(' else _rozbal_hex(retezec))
+            continue
+        if davka:
+            casti.append(_dekoduj(b''.join(davka), font))
+            davka = []
+        jmeno_fontu, jmeno_objektu, stav = token.group(1, 2, 3)
+        if stav == b'q':
+            zasobnik.append(font)
+        elif stav == b'Q':
+            font = zasobnik.pop() if zasobnik else font
+        elif jmeno_fontu is not None:
+            font = fonty.get(b'/' + jmeno_fontu)
+        elif hloubka < MAX_HLOUBKA:
+            casti.append(_formular(objekt, '/' + jmeno_objektu.decode('latin-1'), fonty_cache, hloubka,
+                                   fonty, font))
+    if davka:
+        casti.append(_dekoduj(b''.join(davka), font))
+    return ''.join(casti)
+
+
+def _formular(objekt, jmeno, fonty_cache, hloubka, fonty, font):
+    try:
+        xobjekt = objekt['/Resources'].get_object()['/XObject'].get_object()[jmeno].get_object()
+    except (KeyError, AttributeError):
+        return ''
+    if xobjekt.get('/Subtype') != '/Form':
+        return ''
+    return rychly_text(xobjekt, fonty_cache, hloubka + 1, fonty, font)
+
+
+def texty_sondy(reader):
+    """
+    Text sondy pro každou stránku (bez mezer, malými písmeny), None pro stránku, kterou sonda neumí
+    přečíst. Bez `PyPDF2._cmap` jsou všechny None.
+    """
+    if build_char_map is None:
+        return [None] * len(reader.pages)
+    fonty_cache = {}
+    texty = []
+    for page in reader.pages:
+        try:
+            texty.append(_MEZERY.sub('', rychly_text(page, fonty_cache)).lower())
+        except Exception:
+            texty.append(None)
+    return texty
+
+
+def vyber_stranky(texty, klicova_slova=KLICOVA_SLOVA):
+    """Indexy stránek, jejichž text sondy obsahuje všechna klíčová slova nebo chybí."""
+    return [index for index, text in enumerate(texty)
+            if text is None or all(slovo in text for slovo in klicova_slova)]
+
+
+def najdi_stranky(reader, klicova_slova=KLICOVA_SLOVA):
+    """Indexy stránek, jejichž surový obsah obsahuje všechna klíčová slova (nebo ho nelze přečíst)."""
+    return vyber_stranky(texty_sondy(reader), klicova_slova)
+
+
+def spoj_stranky(texty, indexy):
+    """Text vybraných stránek, navazující stránky bez oddělovače, mezi ostatními konec řádku."""
+    casti = []
+    predchozi = None
+    for index in indexy:
+        if predchozi is not None and index != predchozi + 1:
+            casti.append('\n')
+        casti.append(texty[index])
+        predchozi = index
+    return ''.join(casti)
+
+
+def text_stranek(reader, indexy):
+    """Text vybraných stránek, navazující stránky bez oddělovače, mezi ostatními konec řádku."""
+    return spoj_stranky({index: reader.pages[index].extract_text() for index in indexy}, indexy)
+
+
+def texty_stranek(pdf_path, klicova_slova=KLICOVA_SLOVA, cela=False, cache=None):
+    """
+    Indexy stránek vybraných sondou (s `cela=True` všech stránek) a slovník {index: text stránky}.
+    S `cache` (`PdfCache`) se text sondy i plný text stránek berou z cache a PDF se otevře jen kvůli
+    chybějícím stránkám.
+    """
+    if cache is None:
+        reader = PdfReader(pdf_path)
+        indexy = list(range(len(reader.pages))) if cela else najdi_stranky(reader, klicova_slova)
+        return indexy, {index: reader.pages[index].extract_text() for index in indexy}
+
+    otisk = otisk_souboru(pdf_path)
+    reader = None
+    pocet_stran = cache.pocet_stran(otisk)
+    if cela:
+        if pocet_stran is None:
+            reader = PdfReader(pdf_path)
+            pocet_stran = len(reader.pages)
+        indexy = list(range(pocet_stran))
+    else:
+        sonda = cache.nacti(otisk, EXTRAKTOR_SONDY)
+        if pocet_stran is None or len(sonda) < pocet_stran:
+            reader = PdfReader(pdf_path)
+            pocet_stran = len(reader.pages)
+            sonda = dict(enumerate(texty_sondy(reader)))
+            cache.uloz(otisk, EXTRAKTOR_SONDY, sonda, pocet_stran)
+        indexy = vyber_stranky([sonda[index] for index in range(pocet_stran)], klicova_slova)
+
+    texty = cache.nacti(otisk, EXTRAKTOR_TEXTU, indexy)
+    chybi = [index for index in indexy if index not in texty]
+    if chybi:
+        if reader is None:
+            reader = PdfReader(pdf_path)
+        nove = {index: reader.pages[index].extract_text() for index in chybi}
+        cache.uloz(otisk, EXTRAKTOR_TEXTU, nove, pocet_stran)
+        texty.update(nove)
+    return indexy, texty
+
+
+def extrahuj_text(pdf_path, klicova_slova=KLICOVA_SLOVA, cela=False, cache=None):
+    """Text PDF, jen ze stránek vybraných sondou, s `cela=True` ze všech stránek (viz `texty_stranek`)."""
+    indexy, texty = texty_stranek(pdf_path, klicova_slova, cela, cache)
+    return spoj_stranky(texty, indexy)
+
+
+def tabulky_stranek(pdf_path, cache=None, stranky=None):
+    """
+    Tabulky stránek (`pdfplumber`, `page.extract_tables()`) jako slovník {index stránky: tabulky}
+    v pořadí stránek, s `stranky` jen z vybraných stránek. S `cache` se tabulky ukládají jako JSON
+    a PDF se otevře jen kvůli chybějícím stránkám.
+    """
+    import pdfplumber
+
+    ulozene = {}
+    if cache is not None:
+        otisk = otisk_souboru(pdf_path)
+        extraktor = f'pdfplumber-{pdfplumber.__version__}-tabulky-{VERZE_TABULEK}'
+        pocet_stran = cache.pocet_stran(otisk)
+        if pocet_stran is not None:
+            indexy = range(pocet_stran) if stranky is None else stranky
+            ulozene = {index: json.loads(obsah) for index, obsah in cache.nacti(otisk, extraktor, indexy).items()}
+            if len(ulozene) == len(indexy):
+                return ulozene
+
+    with pdfplumber.open(pdf_path) as pdf:
+        indexy = range(len(pdf.pages)) if stranky is None else stranky
+        nove = {index: pdf.pages[index].extract_tables() for index in indexy if index not in ulozene}
+        pocet_stran = len(pdf.pages)
+    if cache is not None:
+        cache.uloz(otisk, extraktor, {index: json.dumps(obsah, ensure_ascii=False) for index, obsah in nove.items()},
+                   pocet_stran)
+    ulozene.update(nove)
+    return {index: ulozene[index] for index in indexy}
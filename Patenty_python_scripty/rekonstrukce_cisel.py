@@ -0,0 +1,264 @@
+"""
+Rekonstrukce čísel A, B, C (A + B = C) z řádku tabulky příjmů, kde jsou čísla i jejich skupiny tisíců
+oddělené stejnými mezerami (např. `740 1 336 2 076` je 740 + 1 336 = 2 076). Nahrazuje původní
+`find_combination` z `parse_pdf_s_matematikou.py` a `3_Ivca_fungujici.py`.
+
+### Původní postup a jeho problémy:
+- Pro každé rozdělení (i, j) znovu skládal řetězce přes `''.join(map(lambda x: str(int(x)), ...))` a převáděl
+  na float, tj. O(n) práce pro každé rozdělení.
+- Převod tokenu přes `float` a `int` ztrácí úvodní nuly skupin tisíců (`1 092` se složilo jako `192`)
+  i desetinnou část (`0,50` jako `0`).
+- Dvojice A = C (B = 0) se hledala jen pro přesně dva tokeny, `1 039 1 039` se tak nenašlo.
+
+### Jak to funguje:
+- Token je celé číslo (`1039`), skupina tisíců (`039`), číslo s desetinnou čárkou (`12,5`), číslo s tečkami
+  mezi tisíci (`2.109`), nebo pomlčka (nula, `770 – 770`).
+- Číslo tvoří první token (bez úvodní nuly, kromě samotné `0`) a za ním libovolně skupin přesně tří číslic
+  (pak má první token nejvýš tři číslice). Desetinnou čárku může mít jen poslední token čísla.
+- `_hodnoty` předpočítá hodnotu každého úseku tokenů [a, b) jako celé číslo v setinách (nebo jemnějších
+  jednotkách podle nejdelší desetinné části): hodnota úseku [a, b + 1) vznikne z [a, b) vynásobením
+  1000 a přičtením skupiny, bez skládání řetězců. Neplatný úsek má hodnotu None.
+- `najdi_kombinaci` pak projde rozdělení (i, j) na A = [0, i), B = [i, j), C = [j, n) a porovná
+  A + B = C v celých číslech, celkem O(n²). Když žádné nevyjde, zkusí dvojici A = C s B = 0.
+- Pořadí zkoušení rozdělení je stejné jako dřív (nejkratší A, pak nejkratší B), výsledek se vrací jako
+  tři desetinná čísla (float).
+
+### Benchmark a fuzz test:
+- `python rekonstrukce_cisel.py --radky <csv> [...]` porovná nový a původní postup na řádcích ze sloupce
+  `Matching Line` (výstupy `parse_pdf_s_matematikou.py`, `3_Ivca_fungujici.py`), `--pdf-cache <soubor>`
+  vezme řádky z textu stránek v cache `pdf_cache.py`. Vypíše řádky s rozdílným výsledkem a časy.
+- Časy obou postupů na náhodných řádcích podle počtu číslic: původní roste s třetí mocninou počtu tokenů
+  (skládání řetězců pro každé rozdělení), nový s druhou.
+- Fuzz test (`--fuzz <počet>`, výchozí 20000) skládá náhodné řádky A B C s mezerami mezi tisíci
+  a desetinnými čárkami a ověřuje, že nalezená trojice dává A + B = C a po zformátování stejné tokeny.
+"""
+
+import argparse
+import csv
+import random
+import re
+import time
+
+from vzor_licence import VZOR_ZA_POPISEM, najdi_radky
+
+# Pomlčky, které v tabulkách znamenají nulu
+POMLCKY = ('-', '–', '—')
+
+# Token: číslice s desetinnou čárkou, číslo s tečkami mezi tisíci, nebo pomlčka
+_TOKEN = re.compile(r'(\d+)(?:,(\d+))?|(\d{1,3}(?:\.\d{3})+)|[-–—]')
+
+
+def rozloz_token(token):
+    """
+    Token jako (číslice celé části, číslice desetinné části, může pokračovat skupinou tisíců),
+    pomlčka jako nula, jinak None.
+    """
+    nalez = _TOKEN.fullmatch(token)
+    if nalez is None:
+        return None
+    cele, zlomek, tecky = nalez.groups()
+    if cele is None:
+        # Pomlčka nebo číslo s tečkami nepokračuje další skupinou
+        return (tecky.replace('.', '') if tecky else '0'), '', False
+    return cele, zlomek or '', not zlomek and len(cele) <= 3
+
+
+def _hodnoty(casti, desetiny):
+    """
+    Hodnoty všech úseků tokenů: `hodnoty[a][b]` je celé číslo v jednotkách 10^-desetiny pro úsek
+    tokenů [a, b), nebo None, pokud úsek netvoří platné číslo.
+    """
+    n = len(casti)
+    meritko = 10 ** desetiny
+    hodnoty = [[None] * (n + 1) for _ in range(n)]
+    for a, (cele, zlomek, pokracuje) in enumerate(casti):
+        if cele[0] == '0' and len(cele) > 1:
+            continue
+        zaklad = int(cele)
+        radek = hodnoty[a]
+        radek[a + 1] = zaklad * meritko + (int(zlomek) * 10 ** (desetiny - len(zlomek)) if zlomek else 0)
+        if not pokracuje or zaklad == 0:
+            continue
+        # Skupiny tisíců: přesně tři číslice, desetinná část jen u poslední
+        for b in range(a + 1, n):
+            cele, zlomek, _ = casti[b]
+            if len(cele) != 3:
+                break
+            zaklad = zaklad * 1000 + int(cele)
+            radek[b + 1] = zaklad * meritko + (int(zlomek) * 10 ** (desetiny - len(zlomek)) if zlomek else 0)
+            if zlomek:
+                break
+    return hodnoty
+
+
+def najdi_kombinaci(tokeny):
+    """
+    Rozdělí tokeny (řetězce oddělené mezerami) na čísla A, B, C s A + B = C, nebo A = C (B = 0).
+    Vrací trojici desetinných čísel, nebo None, pokud tokeny nejsou čísla nebo žádné rozdělení nesedí.
+    """
+    casti = [rozloz_token(token) for token in tokeny]
+    if not casti or None in casti:
+        return None
+    desetiny = max(len(cast[1]) for cast in casti)
+    hodnoty = _hodnoty(casti, desetiny)
+    n = len(casti)
+    meritko = 10 ** desetiny
+
+    for i in range(1, n - 1):
+        a = hodnoty[0][i]
+        if a is None:
+            continue
+        for j in range(i + 1, n):
+            b, c = hodnoty[i][j], hodnoty[j][n]
+            if b is not None and c is not None and a + b == c:
+                return a / meritko, b / meritko, c / meritko
+    for i in range(1, n):
+        a, c = hodnoty[0][i], hodnoty[i][n]
+        if a is not None and a == c:
+            return a / meritko, 0, c / meritko
+    return None
+
+
+# --- benchmark a fuzz test ---
+
+def _puvodni_kombinace(numbers):
+    """Původní `find_combination` (pro srovnání v benchmarku), `numbers` jsou floaty tokenů."""
+    if len(numbers) == 2:
+        A, C = numbers
+        if A == C:
+            return A, 0, C
+    for i in range(1, len(numbers)):
+        try:
+            A = float(''.join(map(lambda x: str(int(x)), numbers[:i])))
+            for j in range(i + 1, len(numbers) + 1):
+                B = float(''.join(map(lambda x: str(int(x)), numbers[i:j])))
+                C = float(''.join(map(lambda x: str(int(x)), numbers[j:])))
+                if A + B == C:
+                    return A, B, C
+        except ValueError:
+            continue
+    return None
+
+
+def _puvodni(tokeny):
+    try:
+        return _puvodni_kombinace([float(token.replace(',', '.')) for token in tokeny])
+    except ValueError:
+        return None
+
+
+def tokeny_za_popisem(line):
+    """Tokeny za textem "smluv" / "smluv (2)" na řádku (stejně jako `process_line_for_numbers`)."""
+    nalez = VZOR_ZA_POPISEM.search(line)
+    return nalez.group(1).split() if nalez else []
+
+
+def nacti_radky(soubory_csv=(), pdf_cache=None):
+    """Řádky ze sloupce `Matching Line` CSV souborů a/nebo řádky s příjmy z licencí z cache textu PDF."""
+    radky = []
+    for cesta in soubory_csv:
+        with open(cesta, newline='', encoding='utf-8-sig') as soubor:
+            radky.extend(radek['Matching Line'] for radek in csv.DictReader(soubor) if radek.get('Matching Line'))
+    if pdf_cache:
+        from pdf_cache import PdfCache
+        cache = PdfCache(pdf_cache)
+        for (text,) in cache.db.execute("SELECT obsah FROM stranky WHERE extraktor LIKE '%-text' AND obsah IS NOT NULL"):
+            radky.extend(najdi_radky(text))
+        cache.zavri()
+    return radky
+
+
+def _formatuj(hodnota, desetiny):
+    """Číslo s mezerami mezi tisíci a desetinnou čárkou, jako v tabulkách výročních zpráv."""
+    cele, zlomek = divmod(hodnota, 10 ** desetiny)
+    text = f"{cele:,}".replace(',', ' ')
+    return text + (f",{zlomek:0{desetiny}d}" if desetiny else '')
+
+
+def fuzz(pocet, seed=0):
+    """Náhodné řádky A B C, vrátí seznam (řádek, výsledek) s chybou. A + B = C musí sedět a tokeny souhlasit."""
+    nahoda = random.Random(seed)
+    chyby = []
+    for _ in range(pocet):
+        desetiny = nahoda.choice((0, 0, 0, 1, 2))
+        velikost = 10 ** nahoda.randint(1, 9 + desetiny)
+        a, b = nahoda.randrange(velikost), nahoda.randrange(velikost)
+        radek = ' '.join(_formatuj(x, desetiny) for x in (a, b, a + b))
+        vysledek = najdi_kombinaci(radek.split())
+        if vysledek is None:
+            chyby.append((radek, vysledek))
+            continue
+        # Víceznačný řádek může dát jinou trojici, ta ale musí sedět a složit stejné tokeny
+        ca, cb, cc = (round(x * 10 ** desetiny) for x in vysledek)
+        if ca + cb != cc or ' '.join(_formatuj(x, desetiny) for x in (ca, cb, cc)) != radek:
+            chyby.append((radek, vysledek))
+    return chyby
+
+
+def _zmer(funkce, tokeny, opakovani):
+    """Nejlepší čas z `opakovani` průchodů všemi řádky (sekundy)."""
+    nejlepsi = None
+    for _ in range(opakovani):
+        zacatek = time.perf_counter()
+        for tok in tokeny:
+            funkce(tok)
+        trvani = time.perf_counter() - zacatek
+        nejlepsi = trvani if nejlepsi is None else min(nejlepsi, trvani)
+    return nejlepsi
+
+
+def benchmark_delky(opakovani=5, pocet=2000, seed=0):
+    """Časy obou postupů na náhodných řádcích A B C podle počtu číslic čísel (počtu tokenů)."""
+    nahoda = random.Random(seed)
+    for cislic in (3, 6, 9, 12):
+        tokeny = []
+        for _ in range(pocet):
+            a, b = nahoda.randrange(10 ** cislic), nahoda.randrange(10 ** cislic)
+            tokeny.append(' '.join(_formatuj(x, 0) for x in (a, b, a + b)).split())
+        casy = [_zmer(funkce, tokeny, opakovani) / pocet * 1e6 for funkce in (najdi_kombinaci, _puvodni)]
+        print(f"  {cislic:>2} číslic: nový {casy[0]:8.2f} µs/řádek, původní {casy[1]:8.2f} µs/řádek")
+
+
+def benchmark(radky, opakovani=5):
+    """Porovná výsledky a časy nového a původního postupu na řádcích, vrátí počet řádků s rozdílem."""
+    tokeny = [tokeny_za_popisem(line) for line in radky]
+    rozdilne = 0
+    for line, tok in zip(radky, tokeny):
+        novy, stary = najdi_kombinaci(tok), _puvodni(tok)
+        if (novy and tuple(map(float, novy))) != (stary and tuple(map(float, stary))):
+            rozdilne += 1
+            print(f"  {line!r}: nový {novy}, původní {stary}")
+    for nazev, funkce in (('nový', najdi_kombinaci), ('původní', _puvodni)):
+        nejlepsi = _zmer(funkce, tokeny, opakovani)
+        nalezeno = sum(1 for tok in tokeny if funkce(tok))
+        print(f"{nazev:<9}{nejlepsi / max(1, len(tokeny)) * 1e6:8.2f} µs/řádek, nalezeno {nalezeno} z {len(tokeny)}")
+    return rozdilne
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a fuzz test rekonstrukce čísel A + B = C.")
+    parser.add_argument('--radky', nargs='*', default=[], help="CSV soubory se sloupcem 'Matching Line'")
+    parser.add_argument('--pdf-cache', help="cache pdf_cache.py, ze které se vezmou řádky textu stránek")
+    parser.add_argument('--fuzz', type=int, default=20000, help="počet náhodných řádků (výchozí 20000)")
+    parser.add_argument('--opakovani', type=int, default=5, help="počet opakování měření (výchozí 5)")
+    args = parser.parse_args()
+
+    radky = nacti_radky(args.radky, args.pdf_cache)
+    if radky:
+        print(f"Řádků ze zpráv: {len(radky)}, rozdílné výsledky:")
+        rozdilne = benchmark(radky, max(1, args.opakovani))
+        print(f"Řádků s rozdílným výsledkem: {rozdilne}")
+
+    print("Délka řádku:")
+    benchmark_delky(max(1, args.opakovani))
+
+    chyby = fuzz(args.fuzz)
+    for radek, vysledek in chyby[:20]:
+        print(f"  fuzz: {radek!r} -> {vysledek}")
+    print(f"Fuzz test: {args.fuzz} řádků, chyb {len(chyby)}")
+    if chyby:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,39 +5,112 @@ zalogovány do CSV souboru.
 
 ### Funkce:
 1. `download_zip(url, download_folder)`: Stahuje ZIP soubory ze zadané URL do složky.
+   - Stahuje se po blocích (`CHUNK_SIZE`), celý archiv se nedrží v paměti. Rozpracované stahování
+     se ukládá jako `.part` a přejmenuje se až po dokončení.
 2. `extract_zip(zip_path, extract_to)`: Extrahuje obsah ZIP souboru do určené složky.
 3. `move_xml_files(extract_folder, target_folder)`: Přesouvá XML soubory do cílové složky
    a maže ostatní soubory.
-4. `create_log(csv_file, zip_filename, xml_files)`: Ukládá informace o zpracování do CSV souboru.
+4. `iteruj_xml_z_archivu(zip_path)`: Postupně vrací XML členy archivu jako otevřené soubory
+   přímo ze `ZipFile`, nic se nerozbaluje na disk.
+5. `uloz_xml_z_archivu(zip_path, target_folder)`: Zapíše do cílové složky jen XML členy archivu.
+6. `extrahuj_z_archivu(zip_path, ...)`: Předá XML členy archivu rovnou extraktoru z `MPT_xml_extrakce.py`.
+7. `create_log(csv_file, zip_filename, xml_files)`: Ukládá informace o zpracování do CSV souboru.
+8. `stahni_archiv(url, download_folder, zaznam)`: Stáhne archiv s navázáním a podmíněným dotazem (viz níže).
+9. `stahni_archivy(urls, download_folder, katalog, workers)`: Stahuje archivy souběžně (`ThreadPoolExecutor`)
+   a vrací výsledky ve stejném pořadí jako `urls`.
 
-### Proces:
+### Proces (přepínač `--rezim`):
 - Stahování všech ZIP souborů z webové stránky.
-- Extrakce obsahu ZIP souborů.
-- Přesun XML souborů do cílové složky a mazání ostatních souborů.
+- `stream` (výchozí): z archivu se zapíšou jen XML soubory do cílové složky, archiv se pak smaže.
+  Výsledná složka je stejná jako u původního postupu, ale bez rozbalení celého archivu,
+  procházení `os.walk`, přesunů a mazání.
+- `extrahovat`: XML soubory se vůbec neukládají, jejich obsah jde přímo z archivu do extraktoru
+  a vzniknou rovnou tabulky z `MPT_xml_extrakce.py` (přepínač `--tabulky`, výstupy podle jeho `vystupy`).
+  S neprázdným katalogem se do výstupů připisuje (archivy z katalogu se znovu nezpracují, změněný archiv
+  nejdřív odstraní své dřívější řádky). Chybí-li některý výstup, katalog se nepoužije a zpracují se znovu
+  všechny archivy.
+- `rozbalit`: původní postup (extrakce celého archivu, přesun XML, smazání ostatních souborů a složky).
 - Zalogování výsledků zpracování do souboru `log.csv`.
 
+### Souběžné stahování, navázání a katalog:
+- Archivy se stahují ve `--workers` vláknech (výchozí 4), každé vlákno má vlastní `requests.Session`
+  se stálým spojením. Dopředu se stáhne nejvýše `2 * workers` archivů, aby se na disku nehromadily.
+  Zpracování (XML, log) probíhá v hlavním vlákně ve stejném pořadí jako odkazy na stránce.
+- Přerušené stahování zůstane jako `.part` s metadaty serveru (`.part.json`). Při dalším běhu se naváže
+  dotazem `Range` s `If-Range`, takže když se archiv na serveru mezitím změnil, stáhne se celý znovu.
+- Zpracované archivy se zapisují do katalogu `katalog.json` (ETag, Last-Modified, velikost, čas stažení).
+  Znovu stažený archiv se posílá s `If-None-Match` / `If-Modified-Since`, nezměněný archiv server odmítne
+  odpovědí 304 a nic se nepřenáší. Archiv v katalogu bez ETag i Last-Modified se považuje za neměnný
+  a znovu se nestahuje (jména týdenních archivů se neopakují).
+- `--base-url` a `--slozka` umožňují spustit stahování proti jinému serveru (např. lokálnímu testovacímu
+  `http.server`) a do jiné složky, odkazy na ZIP se skládají relativně k zadané stránce. Kontrola proti
+  takovému serveru je v `lokalni_server.py` (304, navázání 206/416, katalog, opakovaná extrakce).
+
+### Cache:
+- Stránka se seznamem archivů jde přes společnou cache (`http_cache.py`, platí hodinu).
+- Stažené archivy se ukládají do cache trvale, takže po změně extraktoru lze archivy zpracovat znovu
+  (např. s vymazaným katalogem a `--rezim extrahovat`) bez stahování, i v režimu `--offline`.
+  Navázání přerušeného stahování funguje i s cache, archiv se do ní převezme až celý.
+- Přepínače `--bez-cache`, `--offline` a `--cache <soubor>`.
+
 ### Výstup:
-- XML soubory v cílové složce.
+- XML soubory v cílové složce (režimy `stream` a `rozbalit`), nebo tabulky extraktoru (režim `extrahovat`).
 - Log CSV obsahující název ZIP souboru a seznam zpracovaných XML souborů.
 """
 
 
+import argparse
 import requests
 import zipfile
 import os
 import shutil
-import csv
+import json
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
+from http_cache import pridej_prepinace, vytvor_session
+from zapis_vystupu import otevri_zapis
+
+# Velikost bloku při stahování a kopírování (1 MiB)
+CHUNK_SIZE = 1024 * 1024
+
+REZIMY = ('stream', 'extrahovat', 'rozbalit')
+
+# Stránka se seznamem archivů a cílová složka
+BASE_URL = "https://isdv.upv.gov.cz/webapp/webapp.pubsrv.seznam?pid=41"
+DOWNLOAD_FOLDER = r"C:\Users\Lenovo\Desktop\PROJEKT DATA XML"
+
+# Časový limit spojení a čtení jednoho bloku (sekundy)
+TIMEOUT = (10, 60)
+
+# Každé vlákno stahování má vlastní Session (stálé spojení k serveru)
+_vlakno = threading.local()
+
+
+def _session():
+    if not hasattr(_vlakno, 'session'):
+        _vlakno.session = requests.Session()
+    return _vlakno.session
+
+
 # Funkce pro stažení souboru ze zadané URL
 def download_zip(url, download_folder):
     try:
         print(f"Stahuji soubor z: {url}")
-        response = requests.get(url)
-        response.raise_for_status()  # Ověří, zda nedošlo k chybě
         filename = os.path.join(download_folder, url.split("/")[-1])
-        with open(filename, "wb") as file:
-            file.write(response.content)
+        part_filename = filename + '.part'
+        # Stahujeme po blocích, archiv se tak nemusí celý vejít do paměti
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()  # Ověří, zda nedošlo k chybě
+            with open(part_filename, "wb") as file:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    file.write(chunk)
+        os.replace(part_filename, filename)
         print(f"Soubor stažen: {filename}")
         return filename
     except Exception as e:
@@ -75,11 +148,214 @@ def move_xml_files(extract_folder, target_folder):
         print(f"Chyba při přesunu XML souborů: {e}")
     return xml_files
 
+# Funkce pro postupné čtení XML souborů přímo z archivu
+def iteruj_xml_z_archivu(zip_path):
+    """
+    Vrací dvojice (název XML souboru bez cesty, otevřený člen archivu) v pořadí uložení v archivu.
+    Člen je platný jen do dalšího kroku iterace.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            file_name = os.path.basename(info.filename)
+            if info.is_dir() or not file_name.endswith('.xml'):
+                continue
+            with zip_ref.open(info) as xml_file:
+                yield file_name, xml_file
+
+# Funkce pro uložení jen XML souborů z archivu do cílové složky
+def uloz_xml_z_archivu(zip_path, target_folder):
+    xml_files = []
+    print(f"Ukládám XML soubory z archivu: {zip_path}")
+    try:
+        for file_name, xml_file in iteruj_xml_z_archivu(zip_path):
+            # Stejně jako u přesunu se adresářová struktura archivu zplošťuje
+            with open(os.path.join(target_folder, file_name), 'wb') as target:
+                shutil.copyfileobj(xml_file, target, CHUNK_SIZE)
+            xml_files.append(file_name)
+        print(f"Uloženo XML souborů: {xml_files}")
+    except Exception as e:
+        print(f"Chyba při ukládání XML souborů z archivu: {e}")
+    return xml_files
+
+# Funkce pro předání XML souborů z archivu přímo extraktoru
+def extrahuj_z_archivu(zip_path, zapisy, valid_application_numbers, spec, preskoceno, chyby, engine='stream',
+                       datum_podani=None):
+    """
+    Zpracuje XML členy archivu funkcí `zpracuj_soubor` z `MPT_xml_extrakce` a řádky zapíše do `zapisy`
+    ({tabulka: zapisovač}). Vrací seznam zpracovaných XML souborů. `datum_podani` (`DatumPodani`)
+    doplňuje dokumentům bez data podání datum předchozího dokumentu, i přes hranice archivů.
+    """
+    import MPT_xml_extrakce as extrakce
+
+    if datum_podani is None:
+        datum_podani = extrakce.DatumPodani()
+    xml_files = []
+    print(f"Extrahuji data z archivu: {zip_path}")
+    try:
+        for file_name, xml_file in iteruj_xml_z_archivu(zip_path):
+            xml_files.append(file_name)
+            try:
+                rows, duvod, data_podani = extrakce.zpracuj_soubor(xml_file, file_name, valid_application_numbers,
+                                                                   engine, spec)
+            except Exception as e:
+                chyby.append({'File Name': file_name, 'Typ': 'zpracovani', 'Chyba': f"{type(e).__name__}: {e}"})
+                continue
+            rows, duvod = datum_podani.dopln(rows, duvod, data_podani)
+            if duvod:
+                preskoceno[duvod] += 1
+                if duvod in ('chybne_datum', 'chybi_datum'):
+                    chyby.append({'File Name': file_name, 'Typ': duvod, 'Chyba': extrakce.DUVODY_PRESKOCENI[duvod]})
+            for tabulka, tabulka_rows in rows.items():
+                zapisy[tabulka].writerows(tabulka_rows)
+        print(f"Zpracováno XML souborů: {len(xml_files)}")
+    except Exception as e:
+        print(f"Chyba při čtení archivu: {e}")
+    return xml_files
+
+# Funkce pro odstranění řádků změněného archivu z výstupů extraktoru (upsert podle názvu XML souboru)
+def odstran_radky_archivu(zip_path, zapisy, cesty):
+    """
+    Zavře výstupy `zapisy` ({tabulka: zapisovač}), odstraní z nich řádky XML souborů archivu a vrátí
+    výstupy znovu otevřené pro připisování.
+    """
+    import MPT_xml_extrakce as extrakce
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        file_names = {os.path.basename(nazev) for nazev in zip_ref.namelist() if nazev.endswith('.xml')}
+    otevrene = {}
+    for tabulka, zapis in zapisy.items():
+        zapis.close()
+        extrakce.odstran_radky_souboru(cesty[tabulka], file_names, extrakce.TABULKY[tabulka]['sloupec_souboru'])
+        otevrene[tabulka] = otevri_zapis(cesty[tabulka], extrakce.TABULKY[tabulka]['hlavicka'], mode='a')
+    return otevrene
+
+# Funkce pro stažení archivu s navázáním přerušeného stahování a podmíněným dotazem
+def stahni_archiv(url, download_folder, zaznam=None, navazat=True, cache=None):
+    """
+    Stáhne archiv do `download_folder` a vrátí slovník s klíči `url`, `stav`, `soubor`, `etag`,
+    `last_modified`, `velikost` a `chyba`. Stav je `stazeno`, `beze_zmeny` (304 podle záznamu v katalogu)
+    nebo `chyba`. S `cache` (`HttpCache`) se archiv nejdřív hledá v cache a stažený archiv se do ní uloží.
+    """
+    filename = os.path.join(download_folder, url.split("/")[-1])
+    part_filename = filename + '.part'
+    meta_filename = part_filename + '.json'
+    vysledek = {'url': url, 'stav': 'chyba', 'soubor': filename, 'etag': None, 'last_modified': None,
+                'velikost': None, 'chyba': None}
+
+    pravidlo = cache.pravidlo(url) if cache is not None else None
+    klic = cache.klic('GET', url, pravidlo=pravidlo) if pravidlo else None
+    ulozeny = cache.zaznam(klic) if klic else None
+    if ulozeny:
+        # Archiv z cache: beze změny, pokud se shoduje s verzí v katalogu, jinak se zkopíruje ke zpracování
+        vysledek.update(etag=ulozeny['hlavicky'].get('ETag'), last_modified=ulozeny['hlavicky'].get('Last-Modified'))
+        if zaznam and ((zaznam.get('etag') and zaznam['etag'] == vysledek['etag'])
+                       or (zaznam.get('last_modified') and zaznam['last_modified'] == vysledek['last_modified'])):
+            vysledek['stav'] = 'beze_zmeny'
+            return vysledek
+        if ulozeny['soubor']:
+            shutil.copyfile(ulozeny['soubor'], filename)
+        else:
+            with open(filename, 'wb') as file:
+                file.write(ulozeny['telo'])
+        print(f"Soubor z cache: {filename}")
+        vysledek.update(stav='stazeno', velikost=os.path.getsize(filename))
+        return vysledek
+    if cache is not None and cache.offline:
+        vysledek['chyba'] = "archiv není v cache (offline režim)"
+        print(f"Archiv {url} není v cache (offline režim).")
+        return vysledek
+
+    headers = {}
+    if zaznam:
+        if zaznam.get('etag'):
+            headers['If-None-Match'] = zaznam['etag']
+        if zaznam.get('last_modified'):
+            headers['If-Modified-Since'] = zaznam['last_modified']
+
+    # Navázání: pokračujeme jen u stejné verze archivu (If-Range), jinak server pošle celý soubor
+    offset = 0
+    if navazat and os.path.exists(part_filename) and os.path.exists(meta_filename):
+        with open(meta_filename, encoding='utf-8') as f:
+            meta = json.load(f)
+        validator = meta.get('etag') or meta.get('last_modified')
+        if validator:
+            offset = os.path.getsize(part_filename)
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = validator
+
+    try:
+        print(f"Stahuji soubor z: {url}" + (f" (od bajtu {offset})" if offset else ""))
+        with _session().get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 304:
+                print(f"Soubor se nezměnil: {url}")
+                vysledek.update(stav='beze_zmeny', etag=zaznam.get('etag'), last_modified=zaznam.get('last_modified'))
+                return vysledek
+            if response.status_code == 416:
+                # Rozsah mimo soubor: rozpracovaná část neodpovídá, stáhneme archiv znovu celý
+                for cesta in (part_filename, meta_filename):
+                    if os.path.exists(cesta):
+                        os.remove(cesta)
+                return stahni_archiv(url, download_folder, zaznam, navazat=False, cache=cache)
+            response.raise_for_status()
+
+            vysledek['etag'] = response.headers.get('ETag')
+            vysledek['last_modified'] = response.headers.get('Last-Modified')
+            if response.status_code == 206:
+                mode = 'ab'
+            else:
+                # Celý soubor (nový, nebo se archiv od přerušení změnil)
+                mode = 'wb'
+                with open(meta_filename, 'w', encoding='utf-8') as f:
+                    json.dump({'etag': vysledek['etag'], 'last_modified': vysledek['last_modified']}, f)
+            with open(part_filename, mode) as file:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    file.write(chunk)
+        os.replace(part_filename, filename)
+        os.remove(meta_filename)
+        vysledek['stav'] = 'stazeno'
+        vysledek['velikost'] = os.path.getsize(filename)
+        print(f"Soubor stažen: {filename}")
+        if klic:
+            hlavicky = {'ETag': vysledek['etag'], 'Last-Modified': vysledek['last_modified']}
+            cache.zapis_soubor(klic, url, {k: v for k, v in hlavicky.items() if v}, pravidlo['ttl'], filename)
+    except Exception as e:
+        # Rozpracovaný .part zůstává, při dalším běhu se naváže
+        vysledek['chyba'] = f"{type(e).__name__}: {e}"
+        print(f"Chyba při stahování souboru: {e}")
+    return vysledek
+
+# Souběžné stahování archivů, výsledky ve stejném pořadí jako urls
+def stahni_archivy(urls, download_folder, katalog, workers=4, cache=None):
+    urls = iter(urls)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Dopředu se stahuje nejvýše 2 * workers archivů, zbytek čeká na zpracování předchozích
+        fronta = deque(executor.submit(stahni_archiv, url, download_folder, katalog.get(url), True, cache)
+                       for url in islice(urls, workers * 2))
+        while fronta:
+            vysledek = fronta.popleft().result()
+            for url in islice(urls, 1):
+                fronta.append(executor.submit(stahni_archiv, url, download_folder, katalog.get(url), True, cache))
+            yield vysledek
+
+# Katalog stažených a zpracovaných archivů
+def nacti_katalog(cesta):
+    if not os.path.exists(cesta):
+        return {}
+    with open(cesta, encoding='utf-8') as f:
+        return json.load(f)
+
+def uloz_katalog(cesta, katalog):
+    # Zápis přes dočasný soubor, aby přerušení nenechalo poškozený katalog
+    docasny = cesta + '.tmp'
+    with open(docasny, 'w', encoding='utf-8') as f:
+        json.dump(katalog, f, ensure_ascii=False, indent=1)
+    os.replace(docasny, cesta)
+
 # Funkce pro vytvoření CSV logu
 def create_log(csv_file, zip_filename, xml_files):
     try:
-        with open(csv_file, mode='a', newline='') as file:
-            writer = csv.writer(file)
+        # Log nemá hlavičku, řádky se jen připisují
+        with otevri_zapis(csv_file, [], mode='a', encoding='utf-8') as writer:
             writer.writerow([zip_filename] + xml_files)
         print(f"Log vytvořen pro soubor: {zip_filename}")
     except Exception as e:
@@ -87,56 +363,145 @@ def create_log(csv_file, zip_filename, xml_files):
 
 # Hlavní skript pro provedení celého procesu
 def main():
+    parser = argparse.ArgumentParser(description="Stažení ZIP archivů s XML soubory ST96.")
+    parser.add_argument('--rezim', choices=REZIMY, default='stream',
+                        help="stream: uložit jen XML z archivu (výchozí), extrahovat: XML rovnou do extraktoru, "
+                             "rozbalit: původní rozbalení celého archivu")
+    parser.add_argument('--tabulky', nargs='+', default=['mpt'],
+                        help="tabulky extraktoru pro režim extrahovat (výchozí mpt)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="počet souběžně stahovaných archivů (výchozí 4)")
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help="stránka se seznamem archivů (např. lokální testovací server)")
+    parser.add_argument('--slozka', default=DOWNLOAD_FOLDER,
+                        help="cílová složka pro archivy, XML soubory, log a katalog")
+    pridej_prepinace(parser)
+    args = parser.parse_args()
+    session = vytvor_session(args)
+
     # URL stránky
-    base_url = "https://isdv.upv.gov.cz/webapp/webapp.pubsrv.seznam?pid=41"
-    
+    base_url = args.base_url
+
     # Cílové složky
-    download_folder = r"C:\Users\Lenovo\Desktop\PROJEKT DATA XML"
+    download_folder = args.slozka
     xml_target_folder = os.path.join(download_folder, "XML")
     log_file = os.path.join(download_folder, "log.csv")
-    
+    katalog_file = os.path.join(download_folder, "katalog.json")
+
     # Vytvoření složek, pokud neexistují
     os.makedirs(download_folder, exist_ok=True)
     os.makedirs(xml_target_folder, exist_ok=True)
-    
+
+    # V režimu extrahovat se otevřou výstupy extraktoru na celý běh
+    katalog = nacti_katalog(katalog_file)
+    zapisy = {}
+    preskoceno = Counter()
+    chyby = []
+    if args.rezim == 'extrahovat':
+        import MPT_xml_extrakce as extrakce
+
+        tabulky = list(dict.fromkeys(args.tabulky))
+        neznama = [tabulka for tabulka in tabulky if tabulka not in extrakce.TABULKY]
+        if neznama:
+            parser.error(f"neznámé tabulky: {', '.join(neznama)}")
+        spec = extrakce.priprav_specifikaci(tabulky)
+        datum_podani = extrakce.DatumPodani()
+        valid_application_numbers = None
+        if any(extrakce.TABULKY[tabulka]['filtr_seznam'] for tabulka in tabulky):
+            valid_application_numbers = extrakce.nacti_platna_cisla(extrakce.excel_file_path)
+        cesty = {tabulka: extrakce.vystupy[tabulka] for tabulka in tabulky}
+        if katalog and not all(os.path.exists(cesta) for cesta in cesty.values()):
+            # Řádky archivů z katalogu by ve výstupech chyběly, zpracují se proto znovu všechny archivy
+            print("Výstupy extraktoru chybí, archivy z katalogu se stáhnou a zpracují znovu.")
+            katalog = {}
+        # Archivy z katalogu se přeskočí, jejich řádky ve výstupech zůstanou a nové se připíšou
+        mode = 'a' if katalog else 'w'
+        for tabulka in tabulky:
+            zapisy[tabulka] = otevri_zapis(cesty[tabulka], extrakce.TABULKY[tabulka]['hlavicka'], mode=mode)
+
     # Stáhneme stránku a zpracujeme odkazy na ZIP soubory
     try:
         print(f"Stahuji stránku: {base_url}")
-        response = requests.get(base_url)
+        response = session.get(base_url, timeout=TIMEOUT)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
-        
+
         # Hledání všech .zip odkazů
         zip_links = [link['href'] for link in soup.find_all('a') if link['href'].endswith('.zip')]
         if not zip_links:
             print("Nebyl nalezen žádný odkaz na ZIP soubor.")
             return
-        
+
+        zip_urls = []
         for zip_link in zip_links:
-            full_zip_url = f"https://isdv.upv.gov.cz{zip_link}"
-            
-            # Stažení ZIP souboru
-            zip_file = download_zip(full_zip_url, download_folder)
-            if not zip_file:
+            full_zip_url = urljoin(base_url, zip_link)
+            zaznam = katalog.get(full_zip_url)
+            if zaznam and not zaznam.get('etag') and not zaznam.get('last_modified'):
+                # Bez validátorů nelze změnu ověřit, zpracovaný archiv se považuje za neměnný
                 continue
-            
-            # Extrakce ZIP souboru
-            extract_folder = os.path.splitext(zip_file)[0]  # Cílová složka pro extrakci
-            os.makedirs(extract_folder, exist_ok=True)
-            extract_zip(zip_file, extract_folder)
-            
-            # Přesun XML souborů a smazání ostatních
-            xml_files = move_xml_files(extract_folder, xml_target_folder)
-            
+            zip_urls.append(full_zip_url)
+        print(f"Archivů ke kontrole nebo stažení: {len(zip_urls)} z {len(zip_links)}")
+
+        stavy = Counter()
+        for vysledek in stahni_archivy(zip_urls, download_folder, katalog, args.workers, session.cache):
+            stavy[vysledek['stav']] += 1
+            if vysledek['stav'] != 'stazeno':
+                continue
+            zip_file = vysledek['soubor']
+
+            if args.rezim == 'stream':
+                # Z archivu se zapíšou jen XML soubory
+                xml_files = uloz_xml_z_archivu(zip_file, xml_target_folder)
+            elif args.rezim == 'extrahovat':
+                if vysledek['url'] in katalog:
+                    # Archiv se od zpracování změnil, jeho staré řádky se nahradí
+                    zapisy = odstran_radky_archivu(zip_file, zapisy, cesty)
+                # XML soubory jdou z archivu rovnou do extraktoru
+                xml_files = extrahuj_z_archivu(zip_file, zapisy, valid_application_numbers, spec, preskoceno, chyby,
+                                               datum_podani=datum_podani)
+            else:
+                # Extrakce ZIP souboru
+                extract_folder = os.path.splitext(zip_file)[0]  # Cílová složka pro extrakci
+                os.makedirs(extract_folder, exist_ok=True)
+                extract_zip(zip_file, extract_folder)
+
+                # Přesun XML souborů a smazání ostatních
+                xml_files = move_xml_files(extract_folder, xml_target_folder)
+
+                # Smazání extrahované složky
+                shutil.rmtree(extract_folder)
+
             # Logování výsledků
             create_log(log_file, os.path.basename(zip_file), xml_files)
-            
-            # Smazání extrahované složky a původního ZIP souboru
-            shutil.rmtree(extract_folder)
+
+            # Smazání původního ZIP souboru
             os.remove(zip_file)
-    
+
+            # Zápis do katalogu až po zpracování, přerušený archiv se tak příště stáhne znovu
+            katalog[vysledek['url']] = {
+                'soubor': os.path.basename(zip_file),
+                'etag': vysledek['etag'],
+                'last_modified': vysledek['last_modified'],
+                'velikost': vysledek['velikost'],
+                'stazeno': datetime.now().isoformat(timespec='seconds'),
+                'xml_souboru': len(xml_files),
+            }
+            uloz_katalog(katalog_file, katalog)
+
+        print(f"Staženo: {stavy['stazeno']}, beze změny: {stavy['beze_zmeny']}, chyba: {stavy['chyba']}")
+
     except Exception as e:
         print(f"Chyba při zpracování stránky nebo souborů: {e}")
+    finally:
+        for zapis in zapisy.values():
+            zapis.close()
+
+    if args.rezim == 'extrahovat':
+        extrakce.vypis_souhrn_preskoceni(preskoceno)
+        if chyby:
+            chyby_csv = os.path.join(download_folder, "chyby.csv")
+            extrakce.uloz_chyby(chyby, chyby_csv)
+            print(f"Souborů s chybou: {len(chyby)}, seznam je uložen v {chyby_csv}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
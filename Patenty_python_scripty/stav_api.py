@@ -2,9 +2,9 @@
 Tento skript slouží ke stažení a uložení stavu dokumentů z veřejné databáze pomocí API.
 Funkce skriptu krok za krokem:
 
-1. Načtení dat z Excelového souboru `Results.xlsx` ze zvoleného listu `skoly data` a z vybraných sloupců Application_Number a 
-    API.
-   
+1. Načtení dat z Excelového souboru `Results.xlsx` ze zvoleného listu `skoly data` a z vybraných sloupců Application_Number a
+    API (`nacitani_dat.nacti`, list se po prvním načtení čte z Parquet cache).
+
 2. Pro každý záznam v sloupci `API`:
    - Sestaví URL pro získání stavu dokumentu.
    - Odešle požadavek (HTTP GET) na server API.
@@ -13,7 +13,18 @@ Funkce skriptu krok za krokem:
 
 3. Přidání výsledného seznamu stavů jako nový sloupec `STAV` do datového rámce `output_data`.
 
-4. Uložení `output_data` do souboru CSV `vysledekstav.csv`.
+4. Uložení `output_data` do souboru CSV `vysledekstav.csv` (nebo do Parquet / Arrow podle `output_format`,
+   sloupec `STAV` jako kategorie, modul `zapis_vystupu`).
+
+Souběžné dotazy:
+- Dotazy běží souběžně v `--workers` vláknech (výchozí 8) přes jednu `requests.Session` se sdíleným
+  poolem stálých spojení (`HTTPAdapter`, velikost poolu = počet vláken), takže se nenavazuje nové
+  TCP/TLS spojení pro každý řádek.
+- `--interval` je nejkratší odstup mezi začátky dvou dotazů napříč všemi vlákny (ohleduplnost k serveru,
+  výchozí 0.1 s). Každý dotaz má časový limit `TIMEOUT`.
+- Stavy se vrací ve stejném pořadí jako řádky Excelu, výstup je tak stejný jako při postupném stahování.
+- Odpovědi se ukládají do společné cache (`http_cache.py`, stav platí den), opakovaný běh je tak bez
+  dotazů na server. Přepínače `--bez-cache`, `--offline` a `--cache <soubor>`.
 
 Poznámky:
 - Kód ošetřuje chyby při volání API (např. nedostupný server nebo špatná odpověď) a místo toho vrací odpovídající zprávu.
@@ -23,30 +34,40 @@ Poznámky:
 Výstup:
 - CSV soubor `vysledekstav.csv` obsahující sloupce `Application_Number`, `API` a přidaný sloupec `STAV` s výslednými stavy dokumentů.
 """
-import pandas as pd
-import requests
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 import xml.etree.ElementTree as ET
 
-data=pd.read_excel("Results.xlsx", sheet_name="skoly data")
-statuses=[]
-output_data = data[["Application_Number", "API"]]
+from http_cache import pridej_prepinace, vytvor_session
+from nacitani_dat import nacti
+from zapis_vystupu import cesta_pro_format, uloz_dataframe
+
+# Formát výstupu (csv, parquet, arrow nebo sqlite = tabulka v `patenty.sqlite`)
+output_format = 'csv'
+
+STATUS_URL = "https://isdv.upv.gov.cz/webapp/resdb.ipr.status"
+
+# Časový limit spojení a odpovědi (sekundy)
+TIMEOUT = (10, 30)
+
+
+def nacti_stav(session, line):
+    """Vrátí český název stavu pro identifikátor z `API`, nebo popis chyby."""
+    url = f"{STATUS_URL}?pspis={line}"
 
-for line in data["API"]:
-    
-    url=f"https://isdv.upv.gov.cz/webapp/resdb.ipr.status?pspis={line}"
-    
     try:
         # Send a GET request to the URL
-        response = requests.get(url)
-        
+        response = session.get(url, timeout=TIMEOUT)
+
         # Check if the request was successful
         if response.status_code == 200:
             # Parse the XML content of the response
             root = ET.fromstring(response.content)
-            
+
             # Find the <Name> element with lang="cs"
             status_name_cs = root.find(".//Name[@lang='cs']")
-            
+
             # Extract the text if the element is found, else set a default message
             status = status_name_cs.text if status_name_cs is not None else "Status not found"
         else:
@@ -54,12 +75,39 @@ for line in data["API"]:
 
     except Exception as e:
         status = f"Request failed: {e}"
-   
-    # Append the status to the list
-    statuses.append(status)
 
-# Add the statuses to the output dataframe as a new column "STAV"
-output_data["STAV"] = statuses
+    return status
+
+
+def nacti_stavy(api_values, workers=8, interval=0.1, args=None):
+    """Stáhne stavy pro všechny identifikátory souběžně, výsledky jsou ve stejném pořadí jako vstup."""
+    # Pool stálých spojení pro všechna vlákna, odpovědi z cache se intervalem nebrzdí
+    with vytvor_session(args, interval, pool=workers) as session, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda line: nacti_stav(session, line), api_values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stažení stavů dokumentů z API ÚPV.")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="počet souběžných dotazů (výchozí 8)")
+    parser.add_argument('--interval', type=float, default=0.1,
+                        help="nejkratší odstup mezi začátky dotazů v sekundách (výchozí 0.1)")
+    pridej_prepinace(parser)
+    args = parser.parse_args()
+
+    data = nacti("Results.xlsx", list="skoly data")
+    output_data = data[["Application_Number", "API"]].copy()
+
+    statuses = nacti_stavy(data["API"].tolist(), max(1, args.workers), args.interval, args)
+
+    # Add the statuses to the output dataframe as a new column "STAV"
+    output_data["STAV"] = statuses
+
+    # Save the output dataframe to a new CSV file (or a columnar file)
+    uloz_dataframe(output_data, cesta_pro_format("vysledekstav.csv", output_format), output_format,
+                   {'STAV': 'kategorie'}, encoding='utf-8')
+
 
-# Save the output dataframe to a new CSV file
-output_data.to_csv("vysledekstav.csv", index=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Rychlé hledání řádků s příjmy z licenčních smluv ("Příjmy z licenčních smluv", "v tom příjmy z licenčních
+smluv (2)", rozsypané mezery z extrakce PDF) v textu výročních zpráv. Nahrazuje regulární výraz `pattern`
+z `parse_pdf_s_matematikou.py` (vnořené `.+` a řada `(\\s.)?` skupin, které se zkouší na každém řádku
+a hodně backtrackují).
+
+### Jak to funguje:
+- `normalizuj(text)`: Text celé stránky se jednou převede na malá písmena a bajty UTF-8 bez bílých znaků
+  kromě konců řádků (`str.lower`, `str.replace`, `bytes.translate`, vše v C).
+  `v tom Příjmy z l icenčních  smluv` je tak `vtompříjmyzlicenčníchsmluv`.
+- `najdi_radky(text)`: V normalizovaném textu se hledá `VZOR_KLICE` (`licenčníchsmluv`, č a í i bez
+  diakritiky). Výraz začíná pevným `licen`, prohledává se tedy lineárně bez backtrackingu. Jen u nalezených
+  míst se určí řádek a ověří, že před klíčem je na řádku `p` … `y` … `z` (stejně jako `[Pp].+y.+z`
+  v původním výrazu, tedy "příjmy z").
+- `odpovida(text)`: Stejný test pro jeden řádek nebo buňku tabulky (`pdf_engine.py`).
+- Řádky se vrací oříznuté a ve stejném pořadí jako `find_lines_with_pattern`.
+- `VZOR_ZA_POPISEM`: Předkompilovaný výraz pro čísla za popisem (dřív nekompilovaný `re.search` pro každý řádek).
+
+### Rozdíly proti původnímu výrazu:
+- Najdou se i řádky bez diakritiky v klíči nebo s mezerami uvnitř slov (`licencnich smluv`, `licenč ních`),
+  velkými písmeny a bez mezery mezi slovy (`licenčníchsmluv`), které původní výraz vynechal.
+- Mezi `z` a `licenčních` smí být jen bílé znaky nebo jeden další znak (`z(.)?l` v původním výrazu).
+
+### Benchmark:
+- `python vzor_licence.py --pdf-cache <soubor>` změří původní výraz a nový postup na textu stránek z cache
+  `pdf_cache.py` a vypíše řádky, které najde jen jeden z nich.
+"""
+
+import argparse
+import bisect
+import re
+import time
+
+# Hledaný klíč po normalizaci (malá písmena, bez mezer, s diakritikou i bez ní), jako bajty UTF-8
+VZOR_KLICE = re.compile('licen(?:č|c)n(?:í|i)chsmluv'.encode('utf-8'))
+
+# Čísla na řádku za textem "smluv" nebo "smluv (x)" (`process_line_for_numbers`)
+VZOR_ZA_POPISEM = re.compile(r"smluv(?:\s*\(\d*\))?\s*(.*)")
+
+# Původní regulární výraz (`parse_pdf_s_matematikou.pattern`) pro srovnání v benchmarku
+PUVODNI_VZOR = re.compile(r'[Pp].+y.+z(.)?l(\s.)?i(\s.)?c(\s.)?e(\s.)?n(\s.)?č(\s.)?n(\s.)?í(\s.)?ch(\s.)? s(\s.)?m(\s.)?l(\s.)?u(\s.)?v( \(2\))?')
+
+# Bílé znaky kromě konce řádku: ASCII se mažou v bajtech (`bytes.translate`), ostatní (nezlomitelné
+# a úzké mezery, nulová mezera, měkké dělení slov z PDF) v textu před převodem na bajty
+_MEZERY_ASCII = b' \t\r\x0b\x0c'
+_MEZERY_UNICODE = ('\xa0', '\u2009', '\u200a', '\u200b', '\u202f', '\ufeff', '\xad')
+
+
+def normalizuj(text):
+    """Text jako bajty UTF-8, malými písmeny a bez bílých znaků kromě `\\n`."""
+    text = text.lower()
+    for mezera in _MEZERY_UNICODE:
+        if mezera in text:
+            text = text.replace(mezera, '')
+    return text.encode('utf-8').translate(None, _MEZERY_ASCII)
+
+
+def _prijmy_pred(normalizovany, zacatek, konec):
+    """Je mezi `zacatek` a klíčem na pozici `konec` postupně `p`, `y` a `z` jako v `[Pp].+y.+z(.)?`?"""
+    # `z` nejvýš jeden znak (v UTF-8 až dva bajty) před klíčem
+    z = normalizovany.rfind(b'z', max(zacatek, konec - 3), konec)
+    if z < 0:
+        return False
+    p = normalizovany.find(b'p', zacatek, z)
+    # Mezi `p` a `y` alespoň jeden znak, `y` a `z` mohly oddělovat jen mezery
+    return p >= 0 and normalizovany.find(b'y', p + 2, z) >= 0
+
+
+def odpovida(text):
+    """Obsahuje řádek (buňka tabulky) příjmy z licenčních smluv?"""
+    normalizovany = normalizuj(text)
+    return any(_prijmy_pred(normalizovany, 0, nalez.start()) for nalez in VZOR_KLICE.finditer(normalizovany))
+
+
+def najdi_radky(text):
+    """Oříznuté řádky textu s příjmy z licenčních smluv, v pořadí výskytu (každý řádek jednou)."""
+    radky = text.splitlines()
+    normalizovany = normalizuj('\n'.join(radky))
+    nalezene = []
+    zacatky = None
+    for nalez in VZOR_KLICE.finditer(normalizovany):
+        if zacatky is None:
+            # Začátky řádků v normalizovaném textu (konce řádků se zachovají), jen když je co hledat
+            zacatky = [0] + [m.end() for m in re.finditer(b'\n', normalizovany)]
+        cislo = bisect.bisect_right(zacatky, nalez.start()) - 1
+        if (not nalezene or nalezene[-1] != cislo) and _prijmy_pred(normalizovany, zacatky[cislo], nalez.start()):
+            nalezene.append(cislo)
+    return [radky[cislo].strip() for cislo in nalezene]
+
+
+# --- benchmark ---
+
+def puvodni_radky(text):
+    """Původní `find_lines_with_pattern(text, pattern)`."""
+    return [line.strip() for line in text.splitlines() if PUVODNI_VZOR.search(line)]
+
+
+def nacti_texty(pdf_cache):
+    """Texty stránek uložené v cache `pdf_cache.py` (plná extrakce, ne sonda)."""
+    from pdf_cache import PdfCache
+    cache = PdfCache(pdf_cache)
+    texty = [text for (text,) in cache.db.execute(
+        "SELECT obsah FROM stranky WHERE extraktor LIKE '%-text' AND obsah IS NOT NULL")]
+    cache.zavri()
+    return texty
+
+
+def benchmark(texty, opakovani=5):
+    """Porovná nalezené řádky a časy původního výrazu a `najdi_radky`, vrátí {název: sekundy}."""
+    for text in texty:
+        puvodni, nove = puvodni_radky(text), najdi_radky(text)
+        if puvodni != nove:
+            for line in nove:
+                if line not in puvodni:
+                    print(f"  jen nový:    {line[:100]!r}")
+            for line in puvodni:
+                if line not in nove:
+                    print(f"  jen původní: {line[:100]!r}")
+    vysledky = {}
+    for nazev, funkce in (('původní', puvodni_radky), ('nový', najdi_radky)):
+        nejlepsi = None
+        for _ in range(opakovani):
+            zacatek = time.perf_counter()
+            nalezeno = sum(len(funkce(text)) for text in texty)
+            trvani = time.perf_counter() - zacatek
+            nejlepsi = trvani if nejlepsi is None else min(nejlepsi, trvani)
+        vysledky[nazev] = nejlepsi
+        print(f"{nazev:<9}{nejlepsi * 1000:9.1f} ms celkem, {nejlepsi / len(texty) * 1e6:8.1f} µs/stránka, "
+              f"nalezeno řádků {nalezeno}")
+    print(f"Zrychlení: {vysledky['původní'] / vysledky['nový']:.1f}x")
+    return vysledky
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hledání řádků s příjmy z licenčních smluv.")
+    parser.add_argument('--pdf-cache', required=True, help="cache pdf_cache.py s textem stránek")
+    parser.add_argument('--opakovani', type=int, default=5, help="počet opakování měření (výchozí 5)")
+    args = parser.parse_args()
+
+    texty = nacti_texty(args.pdf_cache)
+    if not texty:
+        parser.error("V cache nejsou žádné texty stránek, nejdřív spusťte parse_pdf_s_matematikou.py.")
+    znaku = sum(map(len, texty))
+    print(f"Stránek: {len(texty)}, znaků: {znaku}, řádky nalezené jen jedním postupem:")
+    benchmark(texty, max(1, args.opakovani))
+
+
+if __name__ == "__main__":
+    main()
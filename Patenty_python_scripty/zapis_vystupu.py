@@ -0,0 +1,334 @@
+"""
+Společná výstupní vrstva pro extraktory a scrapery. Tabulky se zapisují po řádcích stejně jako dřív
+přes `csv.writer`, nebo do typovaného komprimovaného sloupcového formátu (Parquet / Arrow IPC),
+který pandas, notebooky i import do BI načtou mnohem rychleji.
+
+### Formáty:
+- `csv`: původní chování (`csv.writer`, UTF-8 s BOM), podporuje i připisování (`mode='a'`). Jiné kódování
+  než UTF-8 (`encoding` jen `utf-8-sig` nebo `utf-8`) skončí chybou, výchozí kódování Windows (cp1250)
+  poškodilo `vysledekstav.csv`.
+- `parquet`: Parquet s kompresí zstd, zapisuje se po dávkách (row groups), paměť zůstává konstantní.
+- `arrow`: Arrow IPC (Feather v2) s kompresí zstd, lze číst přes `pd.read_feather`.
+- `sqlite`: tabulka v místní databázi `patenty.sqlite` (`databaze.py`) ve stejné složce jako výstup, název
+  tabulky je název souboru bez přípony (`vysledekstav.sqlite` je tabulka `vysledekstav`). Tabulky z datového
+  modelu (`databaze.TABULKY`) mají primární klíč a řádek se stejným klíčem nahradí starý, ostatní se
+  vytvoří podle hlavičky (s `mode='w'` znovu). Zapisuje se po dávkách, každá v jedné transakci, s odvozenými
+  sloupci tabulky (`odvozene_sloupce.py`, např. `API` a `TYP` přihlašovatelů z názvu souboru).
+
+### Typy sloupců (`typy`, pro sloupcové formáty):
+- `text`: řetězec (výchozí pro sloupce bez typu),
+- `kategorie`: slovníkově kódovaný řetězec (MPT kódy, stavy, popisy událostí), jeden slovník na celý soubor,
+- `datum`: datum (`date32`, `nacti_tabulku` ho načte jako `datetime64`), přijímá `RRRR-MM-DD` i `DD.MM.RRRR`,
+- `cele`: celé číslo s prázdnými hodnotami,
+- `desetinne`: desetinné číslo (přijímá i desetinnou čárku).
+- Hodnota, kterou nelze převést, se uloží jako prázdná.
+- Texty se ve všech formátech ukládají normalizované na NFC (`kodovani.nfc`), stejné jméno s rozloženou
+  diakritikou (z PDF nebo XML) je pak stejná hodnota. Opravu již zapsaných souborů dělá `kodovani.py`.
+
+### Funkce:
+- `otevri_zapis(cesta, hlavicka, format, typy, mode)`: vrátí zapisovač s metodami `writerow`, `writerows`, `close`
+  (lze použít i jako `with`).
+- `cesta_pro_format(cesta, format)`: upraví příponu souboru podle formátu.
+- `uloz_dataframe(df, cesta, format, typy)`: uloží pandas DataFrame ve zvoleném formátu.
+- `nacti_tabulku(cesta)`: načte tabulku do pandas podle přípony (csv, parquet, arrow/feather, sqlite).
+
+### Poznámky:
+- Sloupcové formáty vyžadují knihovnu `pyarrow`, CSV funguje bez ní.
+- Sloupcové soubory nelze doplňovat, `mode='a'` je povolen jen pro CSV a `sqlite`.
+"""
+
+import csv
+import os
+from datetime import date, datetime
+
+from kodovani import nfc
+
+FORMATY = ('csv', 'parquet', 'arrow', 'sqlite')
+PRIPONY = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow', 'sqlite': '.sqlite'}
+
+# Povolená kódování CSV výstupů
+KODOVANI = ('utf-8-sig', 'utf-8')
+
+# Počet řádků v jedné dávce sloupcového zápisu
+VELIKOST_DAVKY = 50000
+
+
+def cesta_pro_format(cesta, format):
+    """Vrátí cestu s příponou odpovídající formátu."""
+    return os.path.splitext(cesta)[0] + PRIPONY[format]
+
+
+def _prazdna(hodnota):
+    """None, prázdný řetězec nebo NaN z pandas."""
+    return hodnota is None or hodnota == '' or (isinstance(hodnota, float) and hodnota != hodnota)
+
+
+def _na_datum(hodnota):
+    if _prazdna(hodnota):
+        return None
+    if hasattr(hodnota, 'to_pydatetime'):
+        hodnota = hodnota.to_pydatetime()
+    if isinstance(hodnota, datetime):
+        return hodnota.date()
+    if isinstance(hodnota, date):
+        return hodnota
+    for vzor in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(str(hodnota).strip(), vzor).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _na_cele(hodnota):
+    if _prazdna(hodnota):
+        return None
+    if isinstance(hodnota, (int, float)):
+        return int(hodnota) if hodnota == int(hodnota) else None
+    try:
+        return int(str(hodnota).replace(' ', '').replace('\xa0', ''))
+    except ValueError:
+        return None
+
+
+def _na_desetinne(hodnota):
+    if _prazdna(hodnota):
+        return None
+    if isinstance(hodnota, (int, float)):
+        return float(hodnota)
+    try:
+        return float(str(hodnota).replace(' ', '').replace('\xa0', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _na_text(hodnota):
+    return None if _prazdna(hodnota) else nfc(str(hodnota))
+
+
+def _nfc_hodnota(hodnota):
+    return nfc(hodnota) if isinstance(hodnota, str) else hodnota
+
+
+def _nfc_radek(row):
+    return [_nfc_hodnota(hodnota) for hodnota in row]
+
+
+def _over_kodovani(encoding):
+    if encoding.lower().replace('_', '-') not in KODOVANI:
+        raise ValueError(f"Výstupy se zapisují jen v UTF-8 (povolené: {', '.join(KODOVANI)}), ne {encoding}.")
+
+
+# Převod hodnot podle typu sloupce
+PREVODY = {
+    'text': _na_text,
+    'kategorie': _na_text,
+    'datum': _na_datum,
+    'cele': _na_cele,
+    'desetinne': _na_desetinne,
+}
+
+
+def _nacti_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Pro formát parquet/arrow je potřeba nainstalovat pyarrow (pip install pyarrow).")
+    return pyarrow
+
+
+def arrow_schema(hlavicka, typy):
+    """Sestaví pyarrow schéma z hlavičky a slovníku typů sloupců."""
+    pa = _nacti_pyarrow()
+    arrow_typy = {
+        'text': pa.string(),
+        'kategorie': pa.dictionary(pa.int32(), pa.string()),
+        'datum': pa.date32(),
+        'cele': pa.int64(),
+        'desetinne': pa.float64(),
+    }
+    return pa.schema([pa.field(sloupec, arrow_typy[typy.get(sloupec, 'text')]) for sloupec in hlavicka])
+
+
+class ZapisCSV:
+    """Zápis tabulky do CSV po řádcích (původní chování skriptů)."""
+
+    def __init__(self, cesta, hlavicka, mode='w', encoding='utf-8-sig'):
+        _over_kodovani(encoding)
+        self.soubor = open(cesta, mode=mode, newline='', encoding=encoding)
+        self.writer = csv.writer(self.soubor)
+        if mode == 'w':
+            self.writerow(hlavicka)
+
+    def writerow(self, row):
+        self.writer.writerow(_nfc_radek(row))
+
+    def writerows(self, rows):
+        self.writer.writerows(_nfc_radek(row) for row in rows)
+
+    def close(self):
+        self.soubor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ZapisSloupcovy:
+    """Zápis tabulky do Parquet nebo Arrow IPC po dávkách s typy sloupců."""
+
+    def __init__(self, cesta, hlavicka, format, typy=None):
+        self.pa = _nacti_pyarrow()
+        self.hlavicka = list(hlavicka)
+        self.typy = typy or {}
+        self.schema = arrow_schema(self.hlavicka, self.typy)
+        self.prevody = [PREVODY[self.typy.get(sloupec, 'text')] for sloupec in self.hlavicka]
+        # Kategorie mají jeden slovník na celý soubor, který s dávkami jen roste (soubor Arrow IPC nedovoluje
+        # slovník nahradit, jen doplnit): {index sloupce: {hodnota: kód}}
+        self.slovniky = {index: {} for index, pole in enumerate(self.schema) if self.pa.types.is_dictionary(pole.type)}
+        self.davka = []
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(cesta, self.schema, compression='zstd')
+        else:
+            moznosti = self.pa.ipc.IpcWriteOptions(compression='zstd', emit_dictionary_deltas=True)
+            self.writer = self.pa.ipc.new_file(cesta, self.schema, options=moznosti)
+
+    def _kategorie(self, index, hodnoty):
+        slovnik = self.slovniky[index]
+        kody = [None if hodnota is None else slovnik.setdefault(hodnota, len(slovnik)) for hodnota in hodnoty]
+        return self.pa.DictionaryArray.from_arrays(self.pa.array(kody, type=self.pa.int32()),
+                                                   self.pa.array(list(slovnik), type=self.pa.string()))
+
+    def _zapis_davku(self):
+        if not self.davka:
+            return
+        sloupce = []
+        for index, (pole, prevod) in enumerate(zip(self.schema, self.prevody)):
+            hodnoty = [prevod(row[index]) for row in self.davka]
+            if index in self.slovniky:
+                sloupce.append(self._kategorie(index, hodnoty))
+            else:
+                sloupce.append(self.pa.array(hodnoty, type=pole.type))
+        self.writer.write_table(self.pa.Table.from_arrays(sloupce, schema=self.schema))
+        self.davka = []
+
+    def writerow(self, row):
+        self.davka.append(row)
+        if len(self.davka) >= VELIKOST_DAVKY:
+            self._zapis_davku()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def close(self):
+        self._zapis_davku()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ZapisSQLite:
+    """Zápis tabulky do místní databáze (`databaze.py`) po dávkách."""
+
+    def __init__(self, cesta, hlavicka, typy=None, mode='w'):
+        from databaze import DATABAZE, Databaze
+        from odvozene_sloupce import ODVOZENI
+
+        self.odvozeni = ODVOZENI
+        slozka, soubor = os.path.split(cesta)
+        self.db = Databaze(os.path.join(slozka, DATABAZE))
+        self.typy = {sloupec.strip().replace(' ', '_'): typ for sloupec, typ in (typy or {}).items()}
+        self.tabulka, self.sloupce = self.db.priprav_tabulku(os.path.splitext(soubor)[0], hlavicka, typy,
+                                                             nahradit=mode == 'w')
+        self.davka = []
+
+    def _zapis_davku(self):
+        if not self.davka:
+            return
+        sloupce, radky = self.sloupce, self.davka
+        if self.tabulka in self.odvozeni:
+            from odvozene_sloupce import odvod_radky
+            sloupce, radky = odvod_radky(self.tabulka, sloupce, radky)
+        self.db.zapis(self.tabulka, sloupce, radky, self.typy)
+        self.davka = []
+
+    def writerow(self, row):
+        self.davka.append(row)
+        if len(self.davka) >= VELIKOST_DAVKY:
+            self._zapis_davku()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def close(self):
+        self._zapis_davku()
+        self.db.zavri()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def otevri_zapis(cesta, hlavicka, format='csv', typy=None, mode='w', encoding='utf-8-sig'):
+    """
+    Otevře zapisovač tabulky ve zvoleném formátu, hlavička se u nového souboru zapíše hned.
+    `encoding` se použije jen pro CSV a musí být UTF-8 (`KODOVANI`).
+    """
+    if format not in FORMATY:
+        raise ValueError(f"Neznámý formát výstupu: {format} (povolené: {', '.join(FORMATY)})")
+    if format == 'csv':
+        return ZapisCSV(cesta, hlavicka, mode, encoding)
+    if format == 'sqlite':
+        return ZapisSQLite(cesta, hlavicka, typy, mode)
+    if mode != 'w':
+        raise ValueError(f"Formát {format} nelze doplňovat, připisování je možné jen do CSV.")
+    return ZapisSloupcovy(cesta, hlavicka, format, typy)
+
+
+def uloz_dataframe(df, cesta, format='csv', typy=None, encoding='utf-8-sig'):
+    """Uloží pandas DataFrame ve zvoleném formátu se stejnými typy sloupců jako `otevri_zapis`."""
+    if format == 'csv':
+        _over_kodovani(encoding)
+        df = df.copy()
+        for sloupec in df.select_dtypes(include=['object', 'string']).columns:
+            df[sloupec] = df[sloupec].map(_nfc_hodnota)
+        df.to_csv(cesta, index=False, encoding=encoding)
+        return
+    with otevri_zapis(cesta, list(df.columns), format, typy) as zapis:
+        zapis.writerows(df.itertuples(index=False, name=None))
+
+
+def nacti_tabulku(cesta, **kwargs):
+    """Načte tabulku do pandas podle přípony souboru (csv, parquet, arrow/feather, sqlite)."""
+    import pandas as pd
+
+    pripona = os.path.splitext(cesta)[1].lower()
+    if pripona == '.sqlite':
+        from databaze import DATABAZE, Databaze, najdi_tabulku
+
+        slozka, soubor = os.path.split(cesta)
+        nazev = os.path.splitext(soubor)[0]
+        db = Databaze(os.path.join(slozka, DATABAZE))
+        try:
+            return pd.read_sql_query(f'SELECT * FROM "{najdi_tabulku(nazev) or nazev}"', db.db, **kwargs)
+        finally:
+            db.zavri()
+    # Sloupce `datum` (date32) jako datetime64, pandas by je jinak načetl jako objekty `date`
+    if pripona == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(cesta, **kwargs).to_pandas(date_as_object=False)
+    if pripona in ('.arrow', '.feather'):
+        import pyarrow.feather as feather
+        return feather.read_table(cesta, **kwargs).to_pandas(date_as_object=False)
+    return pd.read_csv(cesta, **kwargs)
@@ -1,12 +1,19 @@
 import pdfplumber
-import csv
 import os
 import re
+import sys
+
+# Sdílený zápis výstupů (složka Patenty_python_scripty)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Patenty_python_scripty'))
+from zapis_vystupu import otevri_zapis
 
 # Vstupni a vystupni slozky
 input_folder = r"C:\Users\beata\OneDrive\Dokumenty\Others\IT\Digitální akademie Czechitas\Projekt_DA_patenty\Patenty_vyrocni_zpravy\25_VUTtest"
 output_file = r"C:\Users\beata\OneDrive\Dokumenty\Others\IT\Digitální akademie Czechitas\Projekt_DA_patenty\Patenty_python\vystup.csv"
 
+# Extrakce posledniho cisla v radku (zkompilovano jednou, ne pro kazdy radek)
+vzor_cisla = re.compile(r"A\.1\s+Příjmy z licenčních smluv (?:\(2\))?\s+(?:\d{1,3}(?: \d{3})*(?:,\d+)?)?\s+(?:\d{1,3}(?: \d{3})*(?:,\d+)?)?\s+(\d{1,3}(?: \d{3})*(?:,\d+)?)*")
+
 # Inicializace listu pro ukladani vysledku
 results = []
 
@@ -26,7 +33,7 @@ for filename in os.listdir(input_folder):
                     for line in text.split('\n'):
                         if "Příjmy z licenčních smluv" in line:
                             # Extrakce posledniho cisla v radku
-                            numbers = re.search(r"A\.1\s+Příjmy z licenčních smluv (?:\(2\))?\s+(?:\d{1,3}(?: \d{3})*(?:,\d+)?)?\s+(?:\d{1,3}(?: \d{3})*(?:,\d+)?)?\s+(\d{1,3}(?: \d{3})*(?:,\d+)?)*", line)
+                            numbers = vzor_cisla.search(line)
                             if numbers:
                                 print(numbers.group(1))
                                 # found_number = numbers[-1].replace(" ", "")
@@ -36,10 +43,9 @@ for filename in os.listdir(input_folder):
 # Serazeni vysledku podle roku sestupne
 # results.sort(key=lambda x: x[2], reverse=True)
 
-# Ulozeni vysledku do CSV souboru
-with open(output_file, mode="w", newline="", encoding="utf-8") as file:
-    writer = csv.writer(file)
-    writer.writerow(["Cislo Univerzity", "Nazev Univerzity", "Rok", "Nalezene Cislo", "Cislo Stranky"])
+# Ulozeni vysledku do CSV souboru (hlavicka se zapise hned, text v NFC)
+with otevri_zapis(output_file, ["Cislo Univerzity", "Nazev Univerzity", "Rok", "Nalezene Cislo", "Cislo Stranky"],
+                  encoding="utf-8") as writer:
     writer.writerows(results)
 
 print(f"Skript byl úspěšně dokončen. Výsledky jsou uloženy v souboru: {output_file}")
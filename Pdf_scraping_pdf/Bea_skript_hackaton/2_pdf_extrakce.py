@@ -1,12 +1,20 @@
-import pdfplumber
-import csv
 import os
 import re
+import sys
+
+# Sdílené moduly pro čtení PDF, cache tabulek a zápis výstupů (složka Patenty_python_scripty)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Patenty_python_scripty'))
+from pdf_cache import PdfCache
+from pdf_text import tabulky_stranek
+from zapis_vystupu import otevri_zapis
 
 # Vstupni a vystupni slozky
 input_folder = r"C:\Users\beata\OneDrive\Dokumenty\Others\IT\Digitální akademie Czechitas\Projekt_DA_patenty\Patenty_vyrocni_zpravy\21_VSCHT"
 output_file = r"C:\Users\beata\OneDrive\Dokumenty\Others\IT\Digitální akademie Czechitas\Projekt_DA_patenty\Patenty_python\vystup.csv"
 
+# Cache tabulek podle otisku PDF: pri uprave logiky nize se PDF uz znovu necte
+cache = PdfCache()
+
 # Inicializace listu pro ukladani vysledku
 
 # Pruchod vsemi PDF soubory ve slozce
@@ -20,17 +28,15 @@ for filename in os.listdir(input_folder):
         year_match = re.search(r'\d{4}', filename)
         year = year_match.group() if year_match else None
 
-        with pdfplumber.open(filepath) as pdf:
-            for page_number, page in enumerate(pdf.pages, start=1):
-
-        # Extract tables from each page
-                tables = page.extract_tables()
-                for table in tables:
-                    for row in table:
-                        if row[0] == "A.1":
-                            last_number = next((x for x in reversed(row) if x is not None), None)
-                            # results.append([numbers.group(1), page_number])
-                            results.append([university_number, university_name, year, last_number, page_number])
+        # Extract tables from each page (z cache, pokud uz bylo PDF zpracovano)
+        for page_index, tables in tabulky_stranek(filepath, cache).items():
+            page_number = page_index + 1
+            for table in tables:
+                for row in table:
+                    if row[0] == "A.1":
+                        last_number = next((x for x in reversed(row) if x is not None), None)
+                        # results.append([numbers.group(1), page_number])
+                        results.append([university_number, university_name, year, last_number, page_number])
         if len(results) == 0:
             print("A.1 record was not found!")
             with open("unprocessed.txt", mode="a", newline="", encoding="utf-8") as file:
@@ -38,12 +44,13 @@ for filename in os.listdir(input_folder):
         else :
             print("Success")
             
-        with open(output_file, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            if os.path.getsize(output_file) == 0:#
-                writer.writerow(["Cislo Univerzity", "Nazev Univerzity", "Rok", "Nalezene Cislo", "Cislo Stranky"])
+        # Do prazdneho nebo chybejiciho souboru se zapise i hlavicka, jinak se pripisuje
+        mode = "a" if os.path.exists(output_file) and os.path.getsize(output_file) > 0 else "w"
+        with otevri_zapis(output_file, ["Cislo Univerzity", "Nazev Univerzity", "Rok", "Nalezene Cislo", "Cislo Stranky"],
+                          mode=mode, encoding="utf-8") as writer:
             writer.writerows(results)
 
+cache.zavri()
 print(f"Skript byl úspěšně dokončen. Výsledky jsou uloženy v souboru: {output_file}")
                          
 
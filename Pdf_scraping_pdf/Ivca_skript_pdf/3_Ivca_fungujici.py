@@ -1,7 +1,13 @@
 import os
 import re
-import csv
-from PyPDF2 import PdfReader
+import sys
+
+# Sdílená rekonstrukce čísel A + B = C (složka Patenty_python_scripty)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Patenty_python_scripty'))
+from rekonstrukce_cisel import najdi_kombinaci
+from vzor_licence import VZOR_ZA_POPISEM
+from zapis_vystupu import otevri_zapis
+from pdf_text import extrahuj_text
 
 # Cesta k složce s PDF soubory
 pdf_folder = r"C:\Users\beata\OneDrive\Dokumenty\Others\IT\Digitální akademie Czechitas\Projekt_DA_patenty\Patenty_vyrocni_zpravy\14_UK"
@@ -12,13 +18,9 @@ output_file = r"C:\Users\beata\OneDrive\Dokumenty\Others\IT\Digitální akademie
 # Regulární výraz pro hledání řádků s textem "Příjmy z licenčních smluv" s volitelným "(2)"
 pattern = re.compile(r'Příjmy z licenčních smluv( \(2\))?')
 
-# Funkce pro načtení textu z PDF
+# Funkce pro načtení textu z PDF, jen ze stránek s klíčovými slovy (modul `pdf_text`)
 def extract_text_from_pdf(pdf_path):
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page_num in range(len(reader.pages)):
-        text += reader.pages[page_num].extract_text()
-    return text
+    return extrahuj_text(pdf_path)
 
 # Funkce pro hledání odpovídajících řádků
 def find_lines_with_pattern(text, pattern):
@@ -26,53 +28,23 @@ def find_lines_with_pattern(text, pattern):
     matching_lines = [line.strip() for line in lines if pattern.search(line)]  # Odstranit prázdné znaky pomocí strip()
     return matching_lines
 
-# Funkce pro převod čísla s čárkou na desetinné číslo
-def parse_number(number_str):
-    # Nahraď čárku tečkou pro správný převod na číslo
-    return float(number_str.replace(",", "."))
-
-# Funkce pro nalezení správné kombinace A + B = C
+# Funkce pro nalezení správné kombinace A + B = C z tokenů řádku (modul `rekonstrukce_cisel`)
 def find_combination(numbers):
-    # Pokud máme pouze 2 čísla, může se jednat o A = C a B = 0
-    if len(numbers) == 2:
-        A, C = numbers
-        B = 0
-        if A == C:
-            return A, B, C
-    
-    # Pokud máme více než 2 čísla, hledáme kombinaci A + B = C
-    for i in range(1, len(numbers)):
-        A = float(''.join(map(lambda x: str(int(x)), numbers[:i])))  # Spojíme první část
-        for j in range(i+1, len(numbers)+1):
-            B = float(''.join(map(lambda x: str(int(x)), numbers[i:j])))  # Spojíme druhou část
-            C = float(''.join(map(lambda x: str(int(x)), numbers[j:])))  # Spojíme zbytek
-            if A + B == C:
-                return A, B, C
-    return None
+    return najdi_kombinaci(numbers)
 
 # Funkce pro zpracování řádku a nalezení čísel A, B, C
 def process_line_for_numbers(line):
     # Najdi čísla na konci řádku po textu "smluv" nebo "smluv (x)"
-    match = re.search(r"smluv(?:\s*\(\d*\))?\s*(.*)", line)
+    match = VZOR_ZA_POPISEM.search(line)
     if match:
         numbers_str = match.group(1).strip()
         if numbers_str:
-            # Rozděl čísla podle mezer
-            numbers = [parse_number(num) for num in numbers_str.split()]
-
-            # Najdi kombinaci A + B = C
-            result = find_combination(numbers)
-            if result:
-                A, B, C = result
-                return A, B, C
+            # Rozděl čísla podle mezer a najdi kombinaci A + B = C
+            return find_combination(numbers_str.split())
     return None
 
-# Otevřít výstupní CSV soubor pro zápis (přepíše existující soubor)
-with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-    csvwriter = csv.writer(csvfile)
-    
-    # Zapsat hlavičku do CSV
-    csvwriter.writerow(['Filename', 'Matching Line', 'A', 'B', 'C'])
+# Otevřít výstupní CSV soubor pro zápis (přepíše existující soubor, hlavička se zapíše hned, text v NFC)
+with otevri_zapis(output_file, ['Filename', 'Matching Line', 'A', 'B', 'C'], encoding='utf-8') as csvwriter:
 
     # Projít všechny PDF soubory ve složce a hledat odpovídající řádky
     for filename in os.listdir(pdf_folder):